@@ -0,0 +1,61 @@
+# analysis/cascade.py
+import numpy as np
+from utils.config_loader import CONFIG
+
+
+def mpnet_uncertainty(probabilities):
+    """
+    Returns (entropy, margin) for an (N x 3) array of MPNet class probabilities.
+    Entropy is normalized to [0, 1]; margin is top-1 minus top-2 probability.
+    """
+    p = np.clip(np.asarray(probabilities, dtype=float), 1e-12, 1.0)
+    p = p / p.sum(axis=1, keepdims=True)
+    entropy = -(p * np.log(p)).sum(axis=1) / np.log(p.shape[1])
+
+    top2 = np.sort(p, axis=1)[:, -2:]
+    margin = top2[:, 1] - top2[:, 0]
+    return entropy, margin
+
+
+def select_for_escalation(mpnet_results, max_entropy=None, min_margin=None):
+    """
+    Boolean mask of articles MPNet is unsure about and that should go to the LLM:
+    normalized entropy above `max_entropy` or top-2 margin below `min_margin`.
+    """
+    if not mpnet_results:
+        return np.zeros(0, dtype=bool)
+
+    cfg = CONFIG.get("cascade", {})
+    max_entropy = cfg.get("max_entropy", 0.6) if max_entropy is None else max_entropy
+    min_margin = cfg.get("min_margin", 0.3) if min_margin is None else min_margin
+
+    entropy, margin = mpnet_uncertainty([r["raw_probabilities"] for r in mpnet_results])
+    return (entropy > max_entropy) | (margin < min_margin)
+
+
+class CascadeStats:
+    """
+    Counters for one cascade run.
+    Agreement is measured for free on cache hits: for every article that already
+    has an LLM score and that the cascade would NOT have escalated, compare the
+    MPNet stand-in score with the real LLM score.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.candidates = 0
+        self.escalated = 0
+        self.diffs = []
+
+    def record_agreement(self, mpnet_score, llm_score):
+        self.diffs.append(abs(mpnet_score - llm_score))
+
+    def as_dict(self):
+        return {
+            "enabled": self.enabled,
+            "uncached_articles": self.candidates,
+            "escalated": self.escalated,
+            "escalation_rate": (self.escalated / self.candidates) if self.candidates else 0.0,
+            "agreement_samples": len(self.diffs),
+            "mean_abs_diff_vs_llm": float(np.mean(self.diffs)) if self.diffs else None
+        }
@@ -1,11 +1,11 @@
 # analysis/fundamentals.py
-import yfinance as yf
 import numpy as np
-from data.reference_data import sector_tickers_map, sector_etf_map, sector_pe_avg
+from data.reference_data import sector_pe_avg
+from data.analysis_context import AnalysisContext
+from data.sector_cache import SECTOR_CACHE
 
 # Earnings Growth (E)
-def calc_earnings_growth(stock):
-    info = stock.info
+def calc_earnings_growth(stock, info):
     E_raw = info.get("earningsGrowth", 0) or 0
     E_capped = np.clip(E_raw, -0.2, 0.3)
     E = np.interp(E_capped, [-0.2, 0.3], [0, 1])
@@ -20,9 +20,7 @@ def calc_earnings_growth(stock):
     return E_combined
 
 # Valuation (V)
-def calc_valuation(stock, sector, sector_peer_pes: list):
-    info = stock.info
-    
+def calc_valuation(info, sector, sector_peer_pes: list):
     sector_pes = [pe for pe in sector_peer_pes if pe and pe > 0]
     dynamic_sector_pe = np.mean(sector_pes) if sector_pes else 25
     
@@ -38,34 +36,47 @@ def calc_valuation(stock, sector, sector_peer_pes: list):
     return V
 
 def fetch_sector_peer_pes(sector: str) -> list:
-    """Fetches trailing P/E ratios for all peer tickers in the sector."""
-    sector_pes = []
-    for t in sector_tickers_map.get(sector, []):
-        try:
-            info_t = yf.Ticker(t).info
-            pe_t = info_t.get("trailingPE")
-            if pe_t and pe_t > 0:
-                sector_pes.append(pe_t)
-        except:
-            continue
-    return sector_pes
+    """
+    Returns trailing P/E ratios for all peer tickers in the sector.
+    Served from the shared sector snapshot cache (refreshed in the background once stale).
+    """
+    return SECTOR_CACHE.get_peer_pes(sector)
 
 # Momentum Stability (M)
-def calc_momentum(hist, hist_etf):
-    hist["Close"] = hist["Close"].ffill()
-    hist_etf["Close"] = hist_etf["Close"].ffill()
+def _ffill(values):
+    """Forward-fills NaNs in a 1-D array (leading NaNs are kept)."""
+    mask = np.isnan(values)
+    if not mask.any():
+        return values
+    idx = np.where(~mask, np.arange(len(values)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    filled = values[idx]
+    filled[:np.argmax(~mask)] = np.nan
+    return filled
+
+def _pct_change(values, periods=1):
+    """Equivalent of pandas pct_change(periods).dropna() on a NumPy array."""
+    if len(values) <= periods:
+        return values[:0]
+    change = values[periods:] / values[:-periods] - 1
+    return change[~np.isnan(change)]
+
+def calc_momentum(close, close_etf):
+    # Inputs are read-only views from the price store; _ffill only copies when NaNs exist
+    close = _ffill(close)
+    close_etf = _ffill(close_etf)
     
-    vol_1m = np.std(hist["Close"].pct_change(21).dropna()) if len(hist) > 21 else 0.02
-    vol_3m = np.std(hist["Close"].pct_change(63).dropna()) if len(hist) > 63 else 0.02
-    vol_1y = np.std(hist["Close"].pct_change(252).dropna()) if len(hist) > 252 else 0.02
+    vol_1m = np.std(_pct_change(close, 21)) if len(close) > 21 else 0.02
+    vol_3m = np.std(_pct_change(close, 63)) if len(close) > 63 else 0.02
+    vol_1y = np.std(_pct_change(close, 252)) if len(close) > 252 else 0.02
     volatility = np.nanmean([vol_1m, vol_3m, vol_1y])
     
-    vol_sector = np.std(hist_etf["Close"].pct_change().dropna())
+    vol_sector = np.std(_pct_change(close_etf))
     rel_volatility = volatility / vol_sector
     
-    rolling_max = hist["Close"].cummax()
-    drawdowns = (rolling_max - hist["Close"]) / rolling_max
-    max_drawdown = drawdowns.max()
+    rolling_max = np.fmax.accumulate(close)
+    drawdowns = (rolling_max - close) / rolling_max
+    max_drawdown = np.nanmax(drawdowns)
     
     M_vol = np.interp(rel_volatility, [0.5, 1.5], [1, 0])
     M_dd = 1 - np.clip(max_drawdown / 0.5, 0, 1)
@@ -74,8 +85,7 @@ def calc_momentum(hist, hist_etf):
     return np.clip(M, 0, 1)
 
 # Analyst Sentiment (A)
-def calc_analyst_sentiment(stock):
-    info = stock.info
+def calc_analyst_sentiment(info):
     mean_rating = info.get("recommendationMean")
     if mean_rating:
         A = np.clip((mean_rating - 1) / 4, 0, 1)
@@ -88,8 +98,8 @@ def calc_analyst_sentiment(stock):
     return A
 
 # Sector Health (S)
-def calc_sector_health(hist_etf):
-    sector_health = (hist_etf["Close"][-1] - hist_etf["Close"][0]) / hist_etf["Close"][0]
+def calc_sector_health(close_etf):
+    sector_health = (close_etf[-1] - close_etf[0]) / close_etf[0]
     S = np.clip((sector_health + 0.5)/1.5, 0, 1)
     return S
 
@@ -99,9 +109,10 @@ def calc_company_maturity(market_cap):
 
 
 
-def get_fundamentals(ticker: str):
-    stock = yf.Ticker(ticker)
-    info = stock.info
+def get_fundamentals(ticker: str, ctx: AnalysisContext = None):
+    ctx = ctx or AnalysisContext()
+    stock = ctx.ticker(ticker)
+    info = ctx.info(ticker)
 
     # Sector handling
     sector = info.get("sector", None)
@@ -111,23 +122,19 @@ def get_fundamentals(ticker: str):
     # CRITICAL ADDITION: Pre-fetch peer P/E ratios once
     sector_peer_pes = fetch_sector_peer_pes(sector)
 
-    # Load sector ETF
-    etf_ticker = sector_etf_map.get(sector, None)
-    if etf_ticker:
-        hist_etf = yf.Ticker(etf_ticker).history(period="1y")
-    else:
-        hist_etf = yf.Ticker("SPY").history(period="1y")  # fallback
+    # Load sector ETF (falls back to SPY for unmapped sectors)
+    hist_etf = ctx.etf_history(sector, period="1y")
 
     # Load stock history
-    hist = stock.history(period="1y")
+    hist = ctx.history(ticker, period="1y")
 
     # Calculate all components
-    E = calc_earnings_growth(stock)
+    E = calc_earnings_growth(stock, info)
     # MODIFIED CALL: Pass pre-fetched peer data
-    V = calc_valuation(stock, sector, sector_peer_pes) 
-    M = calc_momentum(hist, hist_etf)
-    A = calc_analyst_sentiment(stock)
-    S = calc_sector_health(hist_etf)
+    V = calc_valuation(info, sector, sector_peer_pes) 
+    M = calc_momentum(hist.close, hist_etf.close)
+    A = calc_analyst_sentiment(info)
+    S = calc_sector_health(hist_etf.close)
     C = calc_company_maturity(info.get("marketCap", 1e9))
 
     # Return with SHORT KEYS for scoring
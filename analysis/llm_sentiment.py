@@ -1,18 +1,25 @@
 # analysis/llm_sentiment.py
 import json
-import re
+import numpy as np
 from models.llm_handler import load_llm
+from models.prefix_cache import get_prefix_cache
+from models.json_grammar import SENTIMENT_SCHEMA, array_schema, build_grammar, max_tokens_for_schema, LLM_METRICS
+from utils.config_loader import CONFIG
 
-class LLMSentimentAnalyzer:
-    def __init__(self, llm_instance):
-        self.llm = llm_instance
+# 'error' marks results that must not be cached, so the article is retried next run
+ERROR_RESULT = {
+    "sentiment_label": "Neutral",
+    "sentiment_score": 0.0,
+    "confidence": 0.0,
+    "rationale": "Error",
+    "error": True
+}
 
-    def analyze_single_article(self, article):
-        title = article.get("title", "")
-        desc = article.get("description", "")
-        text = f"{title}. {desc}".replace('"', "'").replace('\n', ' ')
+SINGLE_MAX_TOKENS = max_tokens_for_schema(SENTIMENT_SCHEMA)
 
-        prompt = f"""Below is an instruction that describes a task, paired with an input that provides further context.
+# The instruction blocks are identical for every article, so they are kept as
+# prompt prefixes whose KV state is evaluated once (see models/prefix_cache.py).
+SINGLE_PROMPT_HEADER = """Below is an instruction that describes a task, paired with an input that provides further context.
 Write a response that appropriately completes the request.
 
 ### Instruction:
@@ -23,40 +30,150 @@ Act as a financial analyst. Analyze the news headline.
 Return ONLY a JSON object.
 
 ### Input:
-{text}
+"""
+
+BATCH_PROMPT_HEADER = """Below is an instruction that describes a task, paired with an input that provides further context.
+Write a response that appropriately completes the request.
+
+### Instruction:
+Act as a financial analyst. Analyze each numbered news headline below.
+For every headline:
+1. Provide a brief rationale.
+2. Classify as "Bullish", "Bearish", or "Neutral".
+3. Assign a score (-1.0 to 1.0).
+Return ONLY a JSON array with exactly one object per headline, in the same order.
 
-### Response:
+### Input:
 """
-        
+
+
+def article_text(article):
+    title = article.get("title", "")
+    desc = article.get("description", "")
+    return f"{title}. {desc}".replace('"', "'").replace('\n', ' ')
+
+
+def _normalize_result(result):
+    return {
+        "sentiment_score": float(np.clip(float(result.get("sentiment_score", 0.0)), -1.0, 1.0)),
+        "confidence": float(np.clip(float(result.get("confidence", 1.0)), 0.0, 1.0)),
+        "sentiment_label": result.get("sentiment_label", "Neutral"),
+        "rationale": result.get("rationale", "")
+    }
+
+
+class LLMSentimentAnalyzer:
+    def __init__(self, llm_instance):
+        self.llm = llm_instance
+        llm_cfg = CONFIG.get("llm", {})
+        self.batch_max_articles = llm_cfg.get("batch_max_articles", 8)
+        # Per-headline output budget derived from the output schema
+        self.batch_output_tokens = SINGLE_MAX_TOKENS
+
+    def analyze_single_article(self, article):
+        text = article_text(article)
+        suffix = f"{text}\n\n### Response:\n"
+
         try:
-            response = self.llm(
-                prompt,
-                max_tokens=128,
-                stop=["}"],      
-                temperature=0.1, 
-                echo=False 
+            # Grammar-constrained: the output is exactly one SENTIMENT_SCHEMA object
+            response = get_prefix_cache(self.llm, SINGLE_PROMPT_HEADER)(
+                suffix,
+                max_tokens=SINGLE_MAX_TOKENS,
+                grammar=build_grammar(SENTIMENT_SCHEMA),
+                temperature=0.1,
+                echo=False
             )
-            
-            raw_output = response['choices'][0]['text']
-            
-            json_match = re.search(r'\{.*\}', raw_output, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group(0))
-            else:
-                result = json.loads("{" + raw_output + "}")
-
-            return {
-                "sentiment_score": float(result.get("sentiment_score", 0.0)),
-                "confidence": float(result.get("confidence", 1.0)), 
-                "sentiment_label": result.get("sentiment_label", "Neutral"),
-                "rationale": result.get("rationale", "")
-            }
-
         except Exception as e:
             print(f"[Model Error] {e}")
-            return {
-                "sentiment_label": "Neutral",
-                "sentiment_score": 0.0,
-                "confidence": 0.0,
-                "rationale": "Error"
-            }
\ No newline at end of file
+            return dict(ERROR_RESULT)
+
+        tokens = response.get('usage', {}).get('completion_tokens', 0)
+        try:
+            result = _normalize_result(json.loads(response['choices'][0]['text']))
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            print(f"[Parse Error] {e}")
+            LLM_METRICS.record("sentiment", tokens, parse_failed=True)
+            return dict(ERROR_RESULT)
+
+        LLM_METRICS.record("sentiment", tokens)
+        return result
+
+    # ------------------------------------------------------------------
+    # Batched scoring
+    # ------------------------------------------------------------------
+
+    def _n_tokens(self, text):
+        return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def pack_batches(self, articles):
+        """
+        Greedily groups articles so that each packed prompt plus its expected
+        output fits in the model's n_ctx. Returns a list of index lists.
+        """
+        n_ctx = self.llm.n_ctx()
+        # Leave headroom for the numbering and response marker
+        budget = int(n_ctx * 0.9) - self._n_tokens(BATCH_PROMPT_HEADER + "\n### Response:\n")
+
+        batches, current, used = [], [], 0
+        for i, article in enumerate(articles):
+            cost = self._n_tokens(f"{len(current) + 1}. {article_text(article)}\n") + self.batch_output_tokens
+            if current and (used + cost > budget or len(current) >= self.batch_max_articles):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _analyze_packed(self, articles):
+        """Scores one packed group; returns a list of results or None if the output can't be parsed."""
+        lines = "\n".join(f"{n}. {article_text(a)}" for n, a in enumerate(articles, start=1))
+        suffix = f"{lines}\n\n### Response:\n"
+        schema = array_schema(SENTIMENT_SCHEMA, len(articles))
+
+        try:
+            # Grammar-constrained: exactly len(articles) SENTIMENT_SCHEMA objects
+            response = get_prefix_cache(self.llm, BATCH_PROMPT_HEADER)(
+                suffix,
+                max_tokens=max_tokens_for_schema(schema),
+                grammar=build_grammar(schema),
+                temperature=0.1,
+                echo=False
+            )
+        except Exception as e:
+            print(f"[Model Error] batch of {len(articles)}: {e}")
+            return None
+
+        tokens = response.get('usage', {}).get('completion_tokens', 0)
+        try:
+            results = json.loads(response['choices'][0]['text'])
+            if not isinstance(results, list) or len(results) != len(articles):
+                raise ValueError(f"expected {len(articles)} results")
+            results = [_normalize_result(r) for r in results]
+        except (json.JSONDecodeError, TypeError, ValueError, AttributeError) as e:
+            print(f"[Parse Error] batch of {len(articles)}: {e}")
+            LLM_METRICS.record("sentiment_batch", tokens, items=len(articles), parse_failed=True)
+            return None
+
+        LLM_METRICS.record("sentiment_batch", tokens, items=len(articles))
+        return results
+
+    def analyze_batch(self, articles):
+        """
+        Scores many articles with K headlines per prompt (K adapted to n_ctx).
+        Groups whose output can't be parsed back into K results fall back to
+        per-article scoring. Results are returned in input order.
+        """
+        if self.llm is None:
+            return [self.analyze_single_article(a) for a in articles]
+
+        results = [None] * len(articles)
+        for group in self.pack_batches(articles):
+            group_articles = [articles[i] for i in group]
+            group_results = self._analyze_packed(group_articles) if len(group) > 1 else None
+            if group_results is None:
+                group_results = [self.analyze_single_article(a) for a in group_articles]
+            for i, res in zip(group, group_results):
+                results[i] = res
+        return results
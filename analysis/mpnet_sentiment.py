@@ -1,9 +1,22 @@
 # analysis/mpnet_sentiment.py
 import numpy as np
+from data.embedding_store import get_embedding_store
+from models.mpnet_embedder import DEFAULT_MODEL_NAME, encode_batched
+
+def embedder_name(embedder):
+    return getattr(embedder, "model_name", DEFAULT_MODEL_NAME)
+
+def article_embeddings(texts, embedder):
+    """MPNet embeddings of `texts`, served from the embedding store where possible."""
+    # Only texts not yet in the embedding store are encoded, in bounded, length-bucketed batches
+    store = get_embedding_store(embedder_name(embedder))
+    return store.embed(texts, lambda missing: encode_batched(embedder, missing))
 
 def mpnet_analyzer(news_articles, clf, embedder, label_map):
+    if not news_articles:
+        return []
     texts = [a.get('title','') + ". " + a.get('description','') for a in news_articles]
-    numbers = embedder.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    numbers = article_embeddings(texts, embedder)
     probs = clf.predict_proba(numbers)
 
     results = []
@@ -1,28 +1,124 @@
 # analysis/score_calculator.py
 import numpy as np
-import os
-import json
 from datetime import datetime
-from analysis.mpnet_sentiment import mpnet_analyzer
+from analysis.mpnet_sentiment import mpnet_analyzer, article_embeddings, embedder_name
 from analysis.llm_sentiment import LLMSentimentAnalyzer
-from data.sentiment_cache import get_cached_sentiment, update_cache 
+from analysis.cascade import select_for_escalation, CascadeStats
+from data.sentiment_cache import get_many_cached_sentiments, update_cache_many
+from data.near_duplicates import representatives
+from data.semantic_cache import semantic_cache_enabled, get_semantic_cache
 from utils.config_loader import CONFIG
+from utils.segment_log import SegmentLog
 
-MASTER_LOG_FILE = "logs/sentiment_master.json"
+LEGACY_MASTER_LOG_FILE = "logs/sentiment_master.json"
+
+_log_cfg = CONFIG.get("sentiment_log", {})
+MASTER_LOG = SegmentLog(
+    _log_cfg.get("dir", "logs/sentiment_master"),
+    max_bytes=_log_cfg.get("max_mb", 50) * 1024 * 1024,
+    max_age_hours=_log_cfg.get("max_age_hours", 24),
+    compress=_log_cfg.get("compress", True)
+)
+MASTER_LOG.import_legacy_json(LEGACY_MASTER_LOG_FILE)
+
+# Order of the fundamental component columns in every (N x 6) component matrix
+FUND_COMPONENTS = ("E", "V", "M", "A", "C", "S")
+_DEFAULT_FUND_WEIGHTS = {"E": 0.4, "V": 0.2, "M": 0.15, "A": 0.1, "C": 0.05, "S": 0.1}
+
+_SCORING_WEIGHTS = None
+
+
+def scoring_weights(refresh=False):
+    """
+    Scoring weights and thresholds from config, read once and kept as arrays.
+    Pass refresh=True after config.json has been changed in-process.
+    """
+    global _SCORING_WEIGHTS
+    if _SCORING_WEIGHTS is None or refresh:
+        fw = CONFIG.get("fund_weights", {})
+        weights = CONFIG.get("weights", {})
+        split = CONFIG.get("sentiment_split", {"mpnet": 0.5, "llm": 0.5})
+        thresholds = CONFIG.get("thresholds", {})
+        _SCORING_WEIGHTS = {
+            "fund": np.array([fw.get(c, _DEFAULT_FUND_WEIGHTS[c]) for c in FUND_COMPONENTS]),
+            "fundamentals": weights.get("fundamentals", 0.6),
+            "sentiment": weights.get("sentiment", 0.4),
+            "mpnet_split": split.get("mpnet", 0.5),
+            "llm_split": split.get("llm", 0.5),
+            "buy": thresholds.get("buy", 0.3),
+            "sell": thresholds.get("sell", -0.3)
+        }
+    return _SCORING_WEIGHTS
+
+
+def component_matrix(fundamentals_list):
+    """Stacks fundamentals dicts into an (N x 6) matrix in FUND_COMPONENTS order (missing = 0)."""
+    return np.array([[f.get(c, 0) for c in FUND_COMPONENTS] for f in fundamentals_list], dtype=float).reshape(-1, 6)
+
+
+# ----------------------------------------------------------------------
+# Array kernels
+# ----------------------------------------------------------------------
+
+def calculate_fundamental_scores(components, fund_weights=None):
+    """
+    Weighted fundamental scores of an (N x 6) component matrix.
+    fund_weights is a (6,) vector (default: config) giving (N,) scores, or a
+    (K x 6) matrix of candidate weights giving an (N x K) score matrix.
+    """
+    if fund_weights is None:
+        fund_weights = scoring_weights()["fund"]
+    return np.asarray(components, dtype=float) @ np.asarray(fund_weights, dtype=float).T
+
+
+def combine_sentiment(mpnet_scores, llm_scores, mpnet_split=None, llm_split=None):
+    """MPNet/LLaMA sentiment blend; splits may be scalars or broadcastable arrays."""
+    w = scoring_weights()
+    mpnet_split = w["mpnet_split"] if mpnet_split is None else mpnet_split
+    llm_split = w["llm_split"] if llm_split is None else llm_split
+    return np.asarray(mpnet_scores) * mpnet_split + np.asarray(llm_scores) * llm_split
+
+
+def calculate_final_scores(components, news_sentiment, fund_weights=None, w_fundamentals=None, w_sentiment=None):
+    """
+    Final multi-factor scores for a whole universe in one pass.
+    With candidate weights ((K x 6) fund_weights, (K,) w_fundamentals/w_sentiment)
+    it returns an (N x K) matrix; news_sentiment may then be (N,) or (N x K).
+    """
+    w = scoring_weights()
+    w_fundamentals = w["fundamentals"] if w_fundamentals is None else np.asarray(w_fundamentals)
+    w_sentiment = w["sentiment"] if w_sentiment is None else np.asarray(w_sentiment)
+
+    fund_scores = calculate_fundamental_scores(components, fund_weights)
+    sentiment = np.asarray(news_sentiment, dtype=float)
+    if fund_scores.ndim == 2 and sentiment.ndim == 1:
+        sentiment = sentiment[:, None]
+    return np.clip(w_fundamentals * fund_scores + w_sentiment * sentiment, -1, 1)
+
+
+def get_recommendation_labels(scores, buy_th=None, sell_th=None):
+    """Vectorized get_recommendation_label: an array of 'Buy'/'Hold'/'Sell'."""
+    w = scoring_weights()
+    buy_th = w["buy"] if buy_th is None else buy_th
+    sell_th = w["sell"] if sell_th is None else sell_th
+    scores = np.asarray(scores)
+    return np.select([scores > buy_th, scores < sell_th], ["Buy", "Sell"], default="Hold")
+
+
+# ----------------------------------------------------------------------
+# Single-ticker wrappers
+# ----------------------------------------------------------------------
 
 def get_recommendation_label(score: float) -> str:
     """
     Centralized logic for converting a numerical score (-1 to 1) 
     into a text label using thresholds from config.
     """
-    # Load thresholds from config (safely)
-    thresholds = CONFIG.get("thresholds", {})
-    buy_th = thresholds.get("buy", 0.3)
-    sell_th = thresholds.get("sell", -0.3)
+    w = scoring_weights()
 
-    if score > buy_th:
+    if score > w["buy"]:
         return "Buy"
-    elif score < sell_th:
+    elif score < w["sell"]:
         return "Sell"
     else:
         return "Hold"
@@ -32,75 +128,118 @@ def calculate_fundamental_score(fundamentals: dict) -> float:
     Calculates the weighted fundamental score.
     Separated for cleaner architecture and logging.
     """
-    # FIX: 'fund_weights' is at the top level of config.json
-    fw = CONFIG.get("fund_weights", {})
-    
-    score = (
-        fundamentals.get("E", 0) * fw.get("E", 0.4) +
-        fundamentals.get("V", 0) * fw.get("V", 0.2) +
-        fundamentals.get("M", 0) * fw.get("M", 0.15) +
-        fundamentals.get("A", 0) * fw.get("A", 0.1) +
-        fundamentals.get("C", 0) * fw.get("C", 0.05) +
-        fundamentals.get("S", 0) * fw.get("S", 0.1)
-    )
-    return score
+    return float(calculate_fundamental_scores(component_matrix([fundamentals]))[0])
 
 def calculate_final_score(fundamentals: dict, news_sentiment: float) -> float:
     """
     Calculates the final multi-factor score.
     Returns a SINGLE float (fixing the multiplication error).
     """
-    weights = CONFIG.get("weights", {})
-    
-    fund_score = calculate_fundamental_score(fundamentals)
-    
-    final_score = (
-        weights.get("fundamentals", 0.6) * fund_score + 
-        weights.get("sentiment", 0.4) * news_sentiment 
-    )
-    
-    return np.clip(final_score, -1, 1)
+    return float(calculate_final_scores(component_matrix([fundamentals]), [news_sentiment])[0])
+
+def get_hybrid_sentiment(raw_news, ticker, clf, embedder, llm_instance, mpnet_weight=0.7, cascade=None):  
+    """
+    Combines MPNet and LLaMA article sentiment.
+    With `cascade` enabled (default from config), uncached articles that MPNet
+    is already confident about use the MPNet score instead of an LLM call.
+    Near-duplicate articles (tagged at ingestion, see data/near_duplicates.py)
+    are scored once per cluster; the other members reuse the representative's
+    score with the configured duplicate weight in the means.
+    With the semantic cache enabled, an exact-cache miss whose embedding is
+    close enough to an already LLM-scored article reuses that result.
+    """
+    # 0. One representative per near-duplicate cluster is scored
+    rep_idx, owner, weights = representatives(raw_news)
+    rep_news = [raw_news[i] for i in rep_idx]
 
-def get_hybrid_sentiment(raw_news, ticker, clf, embedder, llm_instance, mpnet_weight=0.7):  
     # 1. MPNet Sentiment
     label_map = {0: "Negative", 1: "Neutral", 2: "Positive"}
-    mpnet_results = mpnet_analyzer(raw_news, clf, embedder, label_map)
-    mpnet_score = np.mean([n["sentiment_score"] for n in mpnet_results]) if mpnet_results else 0
+    rep_mpnet = mpnet_analyzer(rep_news, clf, embedder, label_map)
+    mpnet_results = []
+    for i, article in enumerate(raw_news):
+        result = dict(rep_mpnet[owner[i]], article_index=i, title=article.get('title', ''), description=article.get('description', ''))
+        if rep_idx[owner[i]] != i:
+            result["duplicate_of"] = rep_idx[owner[i]]
+        mpnet_results.append(result)
+    mpnet_score = np.average([n["sentiment_score"] for n in mpnet_results], weights=weights) if mpnet_results else 0
 
     # 2. LLaMA Sentiment (With Caching)
     llm_analyzer = LLMSentimentAnalyzer(llm_instance)
-    llm_scores = []
     
-    print(f"Processing {len(raw_news)} articles for LLaMA sentiment...")
+    print(f"Processing {len(rep_news)} stories ({len(raw_news)} articles) for LLaMA sentiment...")
     
-    for article in raw_news:
-        text_key = f"{article.get('title','')}. {article.get('description','')}"
-        
-        # Check Cache
-        cached_data = get_cached_sentiment(text_key)
-        
-        if cached_data:
-            score = cached_data['score']
-            conf = cached_data['confidence']
+    # Check Cache (one batched lookup for all representatives)
+    text_keys = [f"{a.get('title','')}. {a.get('description','')}" for a in rep_news]
+    cached_entries = get_many_cached_sentiments(text_keys)
+
+    # Semantic tier: nearest already-scored article by MPNet embedding
+    semantic = get_semantic_cache(embedder_name(embedder)) if semantic_cache_enabled() else None
+    semantic_hits, audits, vectors = {}, set(), {}
+    misses = [i for i, c in enumerate(cached_entries) if not c]
+    if semantic is not None and misses:
+        miss_vectors = article_embeddings([text_keys[i] for i in misses], embedder)
+        for i, vector, (entry, _, audit) in zip(misses, miss_vectors, semantic.lookup(miss_vectors)):
+            vectors[i] = vector
+            if entry is not None:
+                semantic_hits[i] = entry
+            if audit:
+                audits.add(i)
+
+    if cascade is None:
+        cascade = CONFIG.get("cascade", {}).get("enabled", False)
+    escalate = select_for_escalation(rep_mpnet)
+    cascade_stats = CascadeStats(cascade)
+
+    llm_scores = [None] * len(rep_news)
+    to_llm = []
+    failed_audits = 0
+
+    for i, cached_data in enumerate(cached_entries):
+        if i in semantic_hits and i not in audits:
+            hit = semantic_hits[i]
+            llm_scores[i] = hit['score'] * hit['confidence']
+        elif i in audits:
+            # Audited semantic hit: score it anyway to measure agreement
+            to_llm.append(i)
+        elif cached_data:
+            llm_scores[i] = cached_data['score'] * cached_data['confidence']
+            if not escalate[i]:
+                cascade_stats.record_agreement(rep_mpnet[i]["sentiment_score"], llm_scores[i])
+        elif cascade and not escalate[i]:
+            # MPNet is confident: skip the LLM and use its score as the stand-in
+            cascade_stats.candidates += 1
+            llm_scores[i] = rep_mpnet[i]["sentiment_score"]
         else:
-            print(f"  [LLaMA Running] {article.get('title')[:30]}...")
-            llm_result = llm_analyzer.analyze_single_article(article)
-            
-            update_cache(text_key, llm_result)
-            
-            score = llm_result['sentiment_score']
-            conf = llm_result.get('confidence', 1.0)
-            
-        llm_scores.append(score * conf)
-    
-    final_llm_score = np.mean(llm_scores) if llm_scores else 0
-    
-    sentiment_split = CONFIG.get("sentiment_split", {"mpnet": 0.5, "llm": 0.5})
+            cascade_stats.candidates += 1
+            cascade_stats.escalated += 1
+            to_llm.append(i)
+
+    if to_llm:
+        print(f"  [LLaMA Running] {len(to_llm)} uncached articles (batched)...")
+        llm_results = llm_analyzer.analyze_batch([rep_news[i] for i in to_llm])
+        # Failed generations are not cached so they get retried on the next run
+        update_cache_many([(text_keys[i], res) for i, res in zip(to_llm, llm_results) if not res.get("error")])
+        for i, res in zip(to_llm, llm_results):
+            if i in audits and res.get("error"):
+                # Failed audit: keep the semantic result the article already had
+                hit = semantic_hits[i]
+                llm_scores[i] = hit['score'] * hit['confidence']
+                failed_audits += 1
+            else:
+                llm_scores[i] = res['sentiment_score'] * res.get('confidence', 1.0)
+
+        if semantic is not None:
+            for i, res in zip(to_llm, llm_results):
+                if i in audits:
+                    # None marks the audit as inconclusive
+                    semantic.record_audit(semantic_hits[i], None if res.get("error") else res)
+            scored = [(i, res) for i, res in zip(to_llm, llm_results) if not res.get("error")]
+            fresh = [(i, res) for i, res in scored if i not in audits]
+            semantic.add([text_keys[i] for i, _ in fresh], [vectors[i] for i, _ in fresh], [res for _, res in fresh])
+
+    final_llm_score = np.average(np.asarray(llm_scores, dtype=float)[owner], weights=weights) if llm_scores else 0
     
-    combined_score = (
-        sentiment_split["mpnet"] * mpnet_score + 
-        sentiment_split["llm"] * final_llm_score
-    )    
+    combined_score = float(combine_sentiment(mpnet_score, final_llm_score))
 
     # 4. Logging
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -111,28 +250,23 @@ def get_hybrid_sentiment(raw_news, ticker, clf, embedder, llm_instance, mpnet_we
             "mpnet_score": mpnet_score,
             "llm_score": final_llm_score,
             "combined_score": combined_score,
-            "combined_label": get_recommendation_label(combined_score)
+            "combined_label": get_recommendation_label(combined_score),
+            "unique_stories": len(rep_news),
+            "semantic_hits": len(semantic_hits) - len(audits) + failed_audits,
+            "cascade": cascade_stats.as_dict()
         },
         "articles": mpnet_results
     }
     
-    if os.path.exists(MASTER_LOG_FILE):
-        try:
-            with open(MASTER_LOG_FILE, "r") as f:
-                master_data = json.load(f)
-                if not isinstance(master_data, list): master_data = []
-        except:
-            master_data = []
-    else:
-        master_data = []
-        
-    master_data.append(log_entry)
-    with open(MASTER_LOG_FILE, "w") as f:
-        json.dump(master_data, f, indent=4)
+    # Append-only: the background writer handles disk I/O and rotation
+    MASTER_LOG.append(log_entry)
     
     return {
         "mpnet_score": mpnet_score,
         "llm_score": final_llm_score,
         "combined_score": combined_score,
-        "combined_label": "Positive" if combined_score > 0.1 else "Negative" if combined_score < -0.1 else "Neutral"
+        "combined_label": "Positive" if combined_score > 0.1 else "Negative" if combined_score < -0.1 else "Neutral",
+        "unique_stories": len(rep_news),
+        "semantic_hits": len(semantic_hits) - len(audits) + failed_audits,
+        "cascade": cascade_stats.as_dict()
     }
\ No newline at end of file
@@ -1,105 +1,264 @@
 # analysis/train_weights.py
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+import argparse
 import json
 import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from analysis.score_calculator import calculate_final_scores, combine_sentiment
+from data.training_store import TRAINING_STORE, COMPONENT_COLUMNS
 
-DATA_FILE = "data/training_data.csv"
 CONFIG_FILE = "config/config.json"
+REPORT_FILE = "data/weight_search_report.csv"
+
+SENTIMENT_COLUMNS = ["mpnet_score", "llm_score"]
+BUY_GRID = [0.1, 0.2, 0.3, 0.4, 0.5]
+SELL_GRID = [-0.1, -0.2, -0.3, -0.4, -0.5]
+
+# Candidates are scored this many at a time to bound the (rows x candidates) matrices
+_CHUNK = 256
+
+
+def load_training_matrix():
+    """Labeled rows that carry the fundamental components, sorted by date."""
+    df = TRAINING_STORE.load(
+        columns=COMPONENT_COLUMNS + SENTIMENT_COLUMNS + ["fund_score", "target_return"], labeled_only=True
+    )
+    df = df.dropna(subset=COMPONENT_COLUMNS + SENTIMENT_COLUMNS + ["target_return"])
+    return df.sort_values("date").reset_index(drop=True)
+
+
+def current_candidate():
+    """The weights currently in config.json, as a candidate row."""
+    with open(CONFIG_FILE, "r") as f:
+        config = json.load(f)
+    fw = config.get("fund_weights", {})
+    weights = config.get("weights", {})
+    split = config.get("sentiment_split", {"mpnet": 0.5, "llm": 0.5})
+    return (
+        np.array([fw.get(c, 0.0) for c in COMPONENT_COLUMNS]),
+        weights.get("fundamentals", 0.6),
+        weights.get("sentiment", 0.4),
+        split.get("mpnet", 0.5)
+    )
+
+
+def generate_candidates(n_candidates, seed=0):
+    """
+    Random weight candidates; the current config is always candidate 0.
+    Returns fund weights (K x 6), fundamentals/sentiment weights (K,) and the MPNet split (K,).
+    """
+    rng = np.random.default_rng(seed)
+    fund_w, w_fund, w_sent, split = current_candidate()
+
+    fund = np.vstack([fund_w, rng.dirichlet(np.ones(len(COMPONENT_COLUMNS)), n_candidates - 1)])
+    wf = np.concatenate(([w_fund], rng.uniform(0.2, 0.9, n_candidates - 1)))
+    ws = np.concatenate(([w_sent], 1.0 - wf[1:]))
+    mp = np.concatenate(([split], rng.uniform(0.0, 1.0, n_candidates - 1)))
+    return fund, wf, ws, mp
+
+
+def candidate_scores(X, mpnet, llm, fund, wf, ws, mp):
+    """Final scores of every row under every candidate, as one (N x K) matrix operation."""
+    sentiment = combine_sentiment(mpnet[:, None], llm[:, None], mp[None, :], 1.0 - mp[None, :])
+    return calculate_final_scores(X, sentiment, fund, wf, ws)
+
+
+def evaluate_candidates(X, mpnet, llm, y, fund, wf, ws, mp, thresholds):
+    """
+    Metrics of every (weights, thresholds) candidate on one set of rows.
+    Positions are +1 above the buy threshold, -1 below the sell threshold and 0
+    otherwise. Returns arrays of shape (K, T):
+    strategy return per row, hit rate of the taken positions, and coverage;
+    plus the information coefficient (K,) of the raw score against returns.
+    """
+    K, T = len(wf), len(thresholds)
+    ret = np.empty((K, T))
+    hit = np.empty((K, T))
+    cov = np.empty((K, T))
+    ic = np.empty(K)
+
+    y_c = y - y.mean()
+    y_norm = np.sqrt((y_c ** 2).sum()) or 1.0
+    for lo in range(0, K, _CHUNK):
+        hi = min(lo + _CHUNK, K)
+        scores = candidate_scores(X, mpnet, llm, fund[lo:hi], wf[lo:hi], ws[lo:hi], mp[lo:hi])
+
+        s_c = scores - scores.mean(axis=0)
+        s_norm = np.sqrt((s_c ** 2).sum(axis=0))
+        s_norm[s_norm == 0] = np.inf
+        ic[lo:hi] = (s_c * y_c[:, None]).sum(axis=0) / (s_norm * y_norm)
+
+        for t, (buy, sell) in enumerate(thresholds):
+            pos = (scores > buy).astype(float) - (scores < sell)
+            pnl = pos * y[:, None]
+            taken = np.abs(pos).sum(axis=0)
+            ret[lo:hi, t] = pnl.mean(axis=0)
+            cov[lo:hi, t] = taken / len(y)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                hit[lo:hi, t] = np.where(taken > 0, (pnl > 0).sum(axis=0) / taken, np.nan)
+    return ret, hit, cov, ic
+
+
+def walk_forward_folds(dates, n_folds):
+    """
+    Expanding-window folds over the sorted unique dates: fold k trains on
+    blocks 0..k and tests on block k+1, so no fold ever tests on the past.
+    Returns a list of (train_mask, test_mask).
+    """
+    blocks = np.array_split(np.unique(dates), n_folds + 1)
+    folds = []
+    for k in range(n_folds):
+        train = np.isin(dates, np.concatenate(blocks[:k + 1]))
+        test = np.isin(dates, blocks[k + 1])
+        folds.append((train, test))
+    return folds
+
 
-def train_and_update_weights():
+def _evaluate_fold(args):
+    """Worker: train and test metrics of all candidates for one fold."""
+    X, mpnet, llm, y, train, test, candidates, thresholds = args
+    return (
+        evaluate_candidates(X[train], mpnet[train], llm[train], y[train], *candidates, thresholds),
+        evaluate_candidates(X[test], mpnet[test], llm[test], y[test], *candidates, thresholds)
+    )
+
+
+def search_weights(df, n_candidates=2000, n_folds=4, max_workers=None, seed=0):
+    """
+    Evaluates every weight/threshold candidate on walk-forward folds (one fold
+    per worker process) and returns (ranked report, walk-forward summary).
+    The report is ranked by mean out-of-sample strategy return per row.
+    """
+    X = df[COMPONENT_COLUMNS].to_numpy(dtype=float)
+    mpnet = df["mpnet_score"].to_numpy(dtype=float)
+    llm = df["llm_score"].to_numpy(dtype=float)
+    y = df["target_return"].to_numpy(dtype=float)
+    dates = df["date"].to_numpy()
+
+    candidates = generate_candidates(n_candidates, seed)
+    thresholds = [(b, s) for b in BUY_GRID for s in SELL_GRID]
+    folds = walk_forward_folds(dates, n_folds)
+
+    tasks = [(X, mpnet, llm, y, train, test, candidates, thresholds) for train, test in folds]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_evaluate_fold, tasks))
+
+    # (folds, K, T) stacks
+    train_ret = np.stack([r[0][0] for r in results])
+    test_ret = np.stack([r[1][0] for r in results])
+    test_hit = np.stack([r[1][1] for r in results])
+    test_cov = np.stack([r[1][2] for r in results])
+    test_ic = np.stack([r[1][3] for r in results])
+
+    fund, wf, ws, mp = candidates
+    K, T = len(wf), len(thresholds)
+    k_idx, t_idx = np.divmod(np.arange(K * T), T)
+    report = pd.DataFrame(fund[k_idx], columns=COMPONENT_COLUMNS)
+    report["w_fundamentals"] = wf[k_idx]
+    report["w_sentiment"] = ws[k_idx]
+    report["mpnet_split"] = mp[k_idx]
+    report["buy"] = [thresholds[t][0] for t in t_idx]
+    report["sell"] = [thresholds[t][1] for t in t_idx]
+    report["is_current"] = k_idx == 0
+    report["oos_return"] = test_ret.mean(axis=0).ravel()
+    report["oos_return_std"] = test_ret.std(axis=0).ravel()
+    with warnings.catch_warnings():
+        # Candidates that never trade have no hit rate in any fold
+        warnings.simplefilter("ignore", RuntimeWarning)
+        report["oos_hit_rate"] = np.nanmean(test_hit, axis=0).ravel()
+    report["oos_coverage"] = test_cov.mean(axis=0).ravel()
+    report["oos_ic"] = test_ic.mean(axis=0)[k_idx]
+    report["train_return"] = train_ret.mean(axis=0).ravel()
+    report = report.sort_values(["oos_return", "oos_ic"], ascending=False).reset_index(drop=True)
+
+    # Honest estimate: pick the best candidate on each fold's training rows, score it on the test block
+    picks = train_ret.reshape(len(folds), -1).argmax(axis=1)
+    summary = {
+        "rows": len(df),
+        "folds": len(folds),
+        "candidates": K * T,
+        "selected_oos_returns": [float(test_ret[f].ravel()[p]) for f, p in enumerate(picks)],
+    }
+    summary["selected_oos_mean"] = float(np.mean(summary["selected_oos_returns"]))
+    return report, summary
+
+
+def fit_regression_baseline(df):
+    """The original three-column regression, printed for comparison."""
+    feature_cols = ['fund_score', 'mpnet_score', 'llm_score']
+    data = df.dropna(subset=feature_cols)
+    if data.empty:
+        return
+    # Positive coefficients only: "good news = sell" is illogical for this system
+    model = LinearRegression(positive=True)
+    model.fit(data[feature_cols], data['target_return'])
+    print("\n--- Regression Baseline ---")
+    print(f"Base Return (Intercept): {model.intercept_:.4f}")
+    for name, coef in zip(feature_cols, model.coef_):
+        print(f"Weight: {name:<12} {coef:.4f}")
+
+
+def apply_candidate(row):
+    """Writes a report row's weights and thresholds into config.json."""
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+
+    config['fund_weights'] = {c: round(float(row[c]), 3) for c in COMPONENT_COLUMNS}
+    config['weights']['fundamentals'] = round(float(row['w_fundamentals']), 2)
+    config['weights']['sentiment'] = round(float(row['w_sentiment']), 2)
+    config['sentiment_split'] = {
+        "mpnet": round(float(row['mpnet_split']), 2),
+        "llm": round(1 - float(row['mpnet_split']), 2)
+    }
+    config['thresholds'] = {"buy": float(row['buy']), "sell": float(row['sell'])}
+
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(config, f, indent=2)
+    print("✅ config.json updated.")
+
+
+def train_and_update_weights(n_candidates=2000, n_folds=4, max_workers=None, top=10, apply=False):
     print("--- Starting Quant Analysis ---")
-    
-    # 1. Load Data
-    if not os.path.exists(DATA_FILE):
-        print("❌ No training data found.")
+
+    # 1. Load Data (only rows with a label and the stored components)
+    df = load_training_matrix()
+    if df.empty or df["date"].nunique() < n_folds + 1:
+        print("❌ Not enough labeled training rows with fundamental components.")
         return
-    
-    df = pd.read_csv(DATA_FILE)
     print(f"Loaded {len(df)} rows of trading data.")
-    
-    # 2. Prepare Features (X) and Target (y)
-    # We ignore Macro for now because it's constant (0.5) in our backfill
-    feature_cols = ['fund_score', 'mpnet_score', 'llm_score']
-    X = df[feature_cols]
-    y = df['target_return']
-    
-    # 3. Train the Model
-    # We force positive coefficients (weights) because negative weights 
-    # would mean "Good news = Sell", which is illogical for this system.
-    model = LinearRegression(positive=True) 
-    model.fit(X, y)
-    
-    # 4. Extract Weights
-    raw_weights = model.coef_
-    intercept = model.intercept_
-    
-    w_fund = raw_weights[0]
-    w_mpnet = raw_weights[1]
-    w_llm = raw_weights[2]
-    
-    print("\n--- Regression Results ---")
-    print(f"Base Return (Intercept): {intercept:.4f}")
-    print(f"Weight: Fundamentals:    {w_fund:.4f}")
-    print(f"Weight: MPNet Sentiment: {w_mpnet:.4f}")
-    print(f"Weight: LLaMA Sentiment: {w_llm:.4f}")
-    
-    # 5. Normalize to sum to 1.0 (for Config)
-    # We want weights that fit into: Score = w_f*Fund + w_s*Sent + w_m*Macro
-    # Since Macro was constant, we'll keep its config weight fixed (e.g. 0.1) 
-    # and distribute the rest (0.9) based on what we learned.
-    
-    total_learned_weight = w_fund + w_mpnet + w_llm
-    
-    if total_learned_weight == 0:
-        print("❌ Model could not find a signal. Using defaults.")
-        return
 
-    # Let's say we reserve 0.1 for Macro (fixed)
-    available_weight = 0.9 
-    
-    # Normalize learned weights
-    norm_fund = (w_fund / total_learned_weight) * available_weight
-    norm_total_sent = ((w_mpnet + w_llm) / total_learned_weight) * available_weight
-    
-    # Calculate the internal split for sentiment (MPNet vs LLaMA)
-    if (w_mpnet + w_llm) > 0:
-        mpnet_split = w_mpnet / (w_mpnet + w_llm)
-    else:
-        mpnet_split = 0.5 # Default if both are 0
-        
-    print(f"\n--- Suggested Config Configuration ---")
-    print(f"Fundamentals: {norm_fund:.2f}")
-    print(f"Sentiment:    {norm_total_sent:.2f}")
-    print(f"Macro:        0.10 (Fixed)")
-    print(f"MPNet Split:  {mpnet_split:.2f}")
-    print(f"LLaMA Split:  {1-mpnet_split:.2f}")
-
-    # 6. Update Config (Optional: Auto-save)
-    save = input("\nDo you want to update config.json with these values? (y/n): ")
-    if save.lower() == 'y':
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-        
-        # Update Weights
-        config['weights']['fundamentals'] = round(norm_fund, 2)
-        config['weights']['sentiment'] = round(norm_total_sent, 2)
-        config['weights']['macro'] = 0.1
-        
-        # We need to save the MPNet/LLaMA split. 
-        # Currently config.json doesn't store this (it's hardcoded 0.7 in code).
-        # Let's add it to config.
-        config['sentiment_split'] = {
-            "mpnet": round(mpnet_split, 2),
-            "llm": round(1-mpnet_split, 2)
-        }
-        
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=4)
-        print("✅ config.json updated.")
+    fit_regression_baseline(df)
+
+    # 2. Walk-forward search
+    report, summary = search_weights(df, n_candidates, n_folds, max_workers)
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    report.to_csv(REPORT_FILE, index=False)
+
+    # 3. Report
+    print(f"\n--- Weight Search ({summary['candidates']} candidates, {summary['folds']} walk-forward folds) ---")
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.precision", 4):
+        print(report.head(top).to_string())
+    current = report[report["is_current"]].iloc[0]
+    print(f"\nCurrent config weights (best threshold pair): oos_return {current['oos_return']:.5f}, oos_ic {current['oos_ic']:.4f}")
+    print(f"Select-on-train, score-on-test return per fold: "
+          f"{', '.join(f'{r:.5f}' for r in summary['selected_oos_returns'])} (mean {summary['selected_oos_mean']:.5f})")
+    print(f"Full report: {REPORT_FILE}")
+
+    # 4. Update Config (only when asked for)
+    if apply:
+        apply_candidate(report.iloc[0])
+
 
 if __name__ == "__main__":
-    train_and_update_weights()
\ No newline at end of file
+    # Run from the project root: python -m analysis.train_weights [--apply]
+    parser = argparse.ArgumentParser(description="Walk-forward search of scoring weights and thresholds.")
+    parser.add_argument("--candidates", type=int, default=2000, help="Random weight candidates (x threshold grid)")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--apply", action="store_true", help="Write the top-ranked candidate to config.json")
+    args = parser.parse_args()
+    train_and_update_weights(args.candidates, args.folds, args.workers, args.top, args.apply)
@@ -1,8 +1,15 @@
 # api/api_main.py
+import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 from service.stock_service import StockAnalysisService 
 from models import clf_handler, mpnet_embedder, llm_handler
+from models.json_grammar import LLM_METRICS
+from utils.executors import run_io, run_analysis, executor_stats
+from data.semantic_cache import semantic_cache_stats
+from data.news_handler import pager_stats, page_cap
+from data.news_store import NEWS_STORE
 
 models = {}
 
@@ -47,15 +54,30 @@ async def root():
             "/macro",
             "/sentiment/{symbol}",
             "/score/{symbol}",
-            "/analyze/{symbol}"
+            "/analyze/{symbol}",
+            "/screen?sector=...|tickers=...",
+            "/metrics/llm",
+            "/metrics/news"
         ]
     }
 
 
+@app.get("/metrics/llm")
+async def llm_metrics_endpoint():
+    """Completion tokens per item and parse-failure rate per LLM prompt kind, plus semantic cache hit rate."""
+    return {"llm": LLM_METRICS.snapshot(), "executors": executor_stats(), "semantic_cache": semantic_cache_stats()}
+
+
+@app.get("/metrics/news")
+async def news_metrics_endpoint():
+    """Finnhub pager counters per ticker (calls, splits, articles) and news store size."""
+    return {"page_cap": page_cap(), "pager": pager_stats(), "store": await run_io(NEWS_STORE.stats)}
+
+
 @app.get("/fundamentals/{symbol}")
 async def fundamentals_endpoint(symbol: str):
     try:
-        data = ANALYSIS_SERVICE.get_fundamentals_only(symbol)
+        data = await run_io(ANALYSIS_SERVICE.get_fundamentals_only, symbol)
         return {"symbol": symbol.upper(), "fundamentals": data}
     except Exception as e:
         raise HTTPException(
@@ -67,7 +89,7 @@ async def fundamentals_endpoint(symbol: str):
 @app.get("/macro")
 async def macro_endpoint():
     try:
-        macro_data = ANALYSIS_SERVICE.get_macro_data()
+        macro_data = await run_io(ANALYSIS_SERVICE.get_macro_data)
         return {
             "macro": macro_data["indicators"],
             "macro_score": macro_data["score"]
@@ -82,7 +104,7 @@ async def macro_endpoint():
 @app.get("/sentiment/{symbol}")
 async def sentiment_endpoint(symbol: str):
     try:
-        sentiment_result = ANALYSIS_SERVICE.get_sentiment_result(symbol)
+        sentiment_result = await run_analysis(ANALYSIS_SERVICE.get_sentiment_result, symbol)
         return {
             "symbol": symbol.upper(),
             "sentiment": sentiment_result
@@ -97,7 +119,7 @@ async def sentiment_endpoint(symbol: str):
 @app.get("/score/{symbol}")
 async def score_endpoint(symbol: str):
     try:
-        score_data = ANALYSIS_SERVICE.get_score_data(symbol)
+        score_data = await run_analysis(ANALYSIS_SERVICE.get_score_data, symbol)
         
         return {
             "symbol": symbol.upper(),
@@ -118,7 +140,7 @@ async def analyze_endpoint(symbol: str):
     Full analysis pipeline - uses the centralized service.
     """
     try:
-        full_analysis = ANALYSIS_SERVICE.analyze_stock(symbol)
+        full_analysis = await run_analysis(ANALYSIS_SERVICE.analyze_stock, symbol)
         
         return {
             "symbol": symbol.upper(),
@@ -129,10 +151,44 @@ async def analyze_endpoint(symbol: str):
             "fundamentals": full_analysis["fundamentals"],
             "macro": full_analysis["macro"],
             "sentiment": full_analysis["sentiment"],
-            "raw_data": full_analysis["raw_data"]
+            "raw_data": full_analysis["raw_data"],
+            "timings": full_analysis["timings"]
         }
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Error analyzing {symbol}: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@app.get("/screen")
+async def screen_endpoint(sector: str = None, tickers: str = None, concurrency: int = 4, sentiment: bool = True):
+    """
+    Scores a whole sector (from reference_data) or a comma-separated ticker list.
+    Streams NDJSON: one "result" line per ticker as it completes (with its rank
+    so far), "error" lines for failed tickers, then a final "summary" ranking.
+    """
+    ticker_list = tickers.split(",") if tickers else None
+    if not ticker_list and not sector:
+        raise HTTPException(status_code=400, detail="Pass either 'sector' or 'tickers'.")
+    try:
+        ANALYSIS_SERVICE.screen_universe(sector, ticker_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    records = ANALYSIS_SERVICE.screen(sector, ticker_list, max_concurrency=max(1, min(concurrency, 16)),
+                                      with_sentiment=sentiment)
+
+    async def ndjson():
+        # Each step of the blocking generator runs on the analysis pool
+        try:
+            while True:
+                record = await run_analysis(next, records, None)
+                if record is None:
+                    break
+                yield json.dumps(record, default=float) + "\n"
+        finally:
+            # On client disconnect this stops the screen from starting further tickers
+            await run_analysis(records.close)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
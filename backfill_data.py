@@ -1,189 +1,430 @@
 # backfill_data.py
-import yfinance as yf
-import pandas as pd
 import numpy as np
 import os
+import json
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 import pytz
 
 from data.news_handler import fetch_company_news
-from data.sentiment_cache import get_cached_sentiment, update_cache
+from data.near_duplicates import representatives
+from data.sentiment_cache import get_many_cached_sentiments, update_cache_many
 from analysis.llm_sentiment import LLMSentimentAnalyzer
 from analysis.mpnet_sentiment import mpnet_analyzer
 from models import clf_handler, mpnet_embedder, llm_handler
-from analysis.score_calculator import calculate_fundamental_score 
+from analysis.score_calculator import calculate_fundamental_score
 from analysis.fundamentals import get_fundamentals
+from data.analysis_context import AnalysisContext
+from data.price_store import PRICE_STORE
+from data.reference_data import sector_tickers_map
+from data.training_store import TRAINING_STORE, COMPONENT_COLUMNS
+from utils.config_loader import CONFIG
 
 # --- CONFIGURATION ---
+_BACKFILL_CFG = CONFIG.get("backfill", {})
 TICKER = "AAPL"
-LOOKBACK_DAYS = 365    
-HOLDING_PERIOD = 14    
-STEP_DAYS = 7  
-DATA_FILE = "data/training_data.csv"        
+DEFAULT_TICKERS = ["AAPL", "MSFT", "GOOG", "TSLA", "NVDA"]
+LOOKBACK_DAYS = _BACKFILL_CFG.get("lookback_days", 365)
+HOLDING_PERIOD = _BACKFILL_CFG.get("holding_period", 14)
+STEP_DAYS = _BACKFILL_CFG.get("step_days", 7)
+WINDOW_DAYS = _BACKFILL_CFG.get("window_days", 30)
+IO_WORKERS = _BACKFILL_CFG.get("io_workers", 4)
+CPU_WORKERS = _BACKFILL_CFG.get("cpu_workers", 2)
+CHECKPOINT_FILE = "data/backfill_checkpoint.json"
 
-def get_trading_dates(hist, start_date):
-    """Finds the next valid trading day and the exit day."""
-    try:
-        start_idx = hist.index.get_indexer([start_date], method='bfill')[0]
-    except:
-        return None, None
+LABEL_MAP = {0: "Negative", 1: "Neutral", 2: "Positive"}
+
+def get_trading_dates(hist, start_date, holding_period=HOLDING_PERIOD):
+    """
+    Finds the next valid trading day and the exit day.
+    Returns bar indices into the PriceHistory, or (None, None).
+    """
+    # Bars are stamped at midnight, so the first bar after an intraday start_date
+    # is the first bar whose day is strictly later.
+    start_idx = np.searchsorted(hist.dates, np.datetime64(start_date.date(), "D"), side="right")
 
     entry_idx = start_idx + 1
-    exit_idx = entry_idx + HOLDING_PERIOD
-    
+    exit_idx = entry_idx + holding_period
+
     if exit_idx >= len(hist):
-        return None, None 
-        
-    return hist.iloc[entry_idx], hist.iloc[exit_idx]
+        return None, None
+
+    return entry_idx, exit_idx
+
+def save_rows(rows):
+    """Appends a batch of rows to the partitioned training store; returns the number written."""
+    return TRAINING_STORE.append(rows)
 
 def save_incremental(new_row_dict):
+    """Saves a single row to the training store immediately."""
+    return save_rows([new_row_dict])
+
+def simulation_dates(end_date, lookback_days=LOOKBACK_DAYS, holding_period=HOLDING_PERIOD, step_days=STEP_DAYS):
+    """Weekly (every step_days) analysis dates from end_date - lookback_days up to end_date - holding_period."""
+    dates = []
+    current = end_date - timedelta(days=lookback_days)
+    while current < end_date - timedelta(days=holding_period):
+        dates.append(current)
+        current += timedelta(days=step_days)
+    return dates
+
+def mpnet_scores(articles, clf, embedder):
+    """MPNet sentiment score of every article, aligned with `articles` (near-duplicates share one)."""
+    rep_idx, owner, _ = representatives(articles)
+    mpnet_res = mpnet_analyzer([articles[i] for i in rep_idx], clf, embedder, LABEL_MAP)
+    return np.array([n["sentiment_score"] for n in mpnet_res], dtype=float)[owner]
+
+def llm_scores(articles, llm_analyzer):
     """
-    Saves a single row to the CSV immediately.
-    Handles reading, appending, deduplicating, and writing back.
+    Cached (or freshly computed) LLM score times confidence of every article.
+    Misses are scored K headlines per prompt; near-duplicates share one score.
     """
-    new_df = pd.DataFrame([new_row_dict])
-    
-    if os.path.exists(DATA_FILE):
-        try:
-            existing = pd.read_csv(DATA_FILE)
-            # Combine old and new
-            updated_df = pd.concat([existing, new_df], ignore_index=True)
-        except pd.errors.EmptyDataError:
-             updated_df = new_df
-    else:
-        updated_df = new_df
-    
-    # Remove duplicates to ensure clean data if we restart
-    updated_df.drop_duplicates(subset=['date', 'ticker'], keep='last', inplace=True)
-    
-    # Save back to disk
-    updated_df.to_csv(DATA_FILE, index=False)
-    return len(updated_df)
-
-def backfill_ticker(ticker):
+    rep_idx, owner, _ = representatives(articles)
+    articles = [articles[i] for i in rep_idx]
+    text_keys = [f"{a.get('title','')}. {a.get('description','')}" for a in articles]
+    cached_entries = get_many_cached_sentiments(text_keys)
+    scores = np.array([c['score'] * c.get('confidence', 1.0) if c else 0.0 for c in cached_entries])
+
+    misses = [i for i, c in enumerate(cached_entries) if not c]
+    if misses:
+        print(f"      [LLaMA Running] {len(misses)} uncached articles (batched)...")
+        results = llm_analyzer.analyze_batch([articles[i] for i in misses])
+        update_cache_many([(text_keys[i], res) for i, res in zip(misses, results) if not res.get("error")])
+        for i, res in zip(misses, results):
+            scores[i] = res['sentiment_score'] * res.get('confidence', 1.0)
+    return scores[owner]
+
+def score_articles(articles, clf, embedder, llm_analyzer):
+    """
+    Scores every article exactly once.
+    Returns (mpnet_scores, llm_scores) arrays aligned with `articles`.
+    """
+    return mpnet_scores(articles, clf, embedder), llm_scores(articles, llm_analyzer)
+
+def window_bounds(timestamps, sim_dates, window_days=WINDOW_DAYS):
+    """
+    [lo, hi) index range of the articles inside [sim - window_days, sim] for
+    every simulation date. `timestamps` must be sorted ascending.
+    """
+    ends = np.array([d.timestamp() for d in sim_dates])
+    starts = np.array([(d - timedelta(days=window_days)).timestamp() for d in sim_dates])
+    lo = np.searchsorted(timestamps, starts, side="left")
+    hi = np.searchsorted(timestamps, ends, side="right")
+    return lo, hi
+
+def window_means(values, lo, hi, weights=None):
+    """
+    (Weighted) mean of values[lo:hi] for every window via prefix sums (NaN for empty windows).
+    Near-duplicate articles carry a reduced weight, see data/near_duplicates.py;
+    a window whose weights sum to 0 gets the unweighted mean.
+    """
+    values = np.asarray(values, dtype=float)
+    plain = np.concatenate(([0.0], np.cumsum(values)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(hi > lo, (plain[hi] - plain[lo]) / (hi - lo), np.nan)
+        if weights is None:
+            return means
+        prefix = np.concatenate(([0.0], np.cumsum(values * weights)))
+        total = np.concatenate(([0.0], np.cumsum(weights)))
+        counts = total[hi] - total[lo]
+        # A window holding only zero-weight duplicates (their representative lies
+        # outside it) falls back to the unweighted mean instead of 0/0
+        return np.where(counts > 0, (prefix[hi] - prefix[lo]) / counts, means)
+
+# ----------------------------------------------------------------------
+# Stages: fetch (I/O), plan, score, rows
+# ----------------------------------------------------------------------
+
+def fetch_ticker_inputs(ticker):
+    """Downloads everything one ticker needs: price history, news and the fundamental score."""
+    ctx = AnalysisContext()
+    # Served from the local price store; only bars newer than the last stored day are downloaded
+    hist = PRICE_STORE.history(ticker, period="2y")
+    all_news = fetch_company_news(ticker, ticker, max_articles=1000)
+    if not all_news:
+        return {"ticker": ticker, "hist": hist, "news": [], "fund_score": None, "components": {}}
+
+    fund_data = get_fundamentals(ticker, ctx=ctx)
+    return {
+        "ticker": ticker,
+        "hist": hist,
+        "news": all_news,
+        "fund_score": calculate_fundamental_score(fund_data),
+        "components": {c: fund_data.get(c) for c in COMPONENT_COLUMNS}
+    }
+
+def plan_windows(hist, all_news, end_date, lookback_days=LOOKBACK_DAYS, holding_period=HOLDING_PERIOD,
+                 step_days=STEP_DAYS, window_days=WINDOW_DAYS):
+    """
+    Lays out the simulation: dates, trades and news windows.
+    Returns None when no date has both a trade and news, otherwise a dict with
+    the articles to score (each once, in time order) and window bounds into them.
+    """
+    sim_dates = simulation_dates(end_date, lookback_days, holding_period, step_days)
+    trades = [get_trading_dates(hist, d, holding_period) for d in sim_dates]
+
+    # Window membership is decided on epoch seconds, which is the same test as
+    # comparing the local-time datetimes the windows are built from.
+    timestamps = np.array([art.get('datetime', 0) for art in all_news], dtype=float)
+    order = np.argsort(timestamps, kind="stable")
+    lo, hi = window_bounds(timestamps[order], sim_dates, window_days)
+
+    # Only articles that fall inside at least one traded window are scored
+    active = [i for i, (e, _) in enumerate(trades) if e is not None and hi[i] > lo[i]]
+    if not active:
+        return None
+    first, last = min(lo[i] for i in active), max(hi[i] for i in active)
+    articles = [all_news[j] for j in order[first:last]]
+    return {
+        "sim_dates": sim_dates,
+        "trades": trades,
+        "active": active,
+        "articles": articles,
+        "weights": representatives(articles)[2],
+        # Windows of untraded dates may reach outside the scored span; clip them so
+        # the prefix sums stay in range (only active windows are ever read)
+        "lo": np.clip(lo - first, 0, last - first),
+        "hi": np.clip(hi - first, 0, last - first)
+    }
+
+def build_rows(ticker, hist, fund_score, plan, mpnet_values, llm_values, components=None):
+    """Turns per-article scores into one training row per traded simulation date."""
+    mp_means = window_means(mpnet_values, plan["lo"], plan["hi"], plan.get("weights"))
+    llm_means = window_means(llm_values, plan["lo"], plan["hi"], plan.get("weights"))
+
+    rows = []
+    for i in plan["active"]:
+        entry_idx, exit_idx = plan["trades"][i]
+        buy_price = hist.open[entry_idx]
+        sell_price = hist.open[exit_idx]
+
+        rows.append({
+            "date": plan["sim_dates"][i].strftime("%Y-%m-%d"),
+            "ticker": ticker,
+            "fund_score": fund_score,
+            **(components or {}),
+            "mpnet_score": mp_means[i],
+            "llm_score": llm_means[i],
+            "price_at_analysis": buy_price,
+            "target_return": (sell_price - buy_price) / buy_price
+        })
+    return rows
+
+# ----------------------------------------------------------------------
+# MPNet scoring worker processes
+# ----------------------------------------------------------------------
+
+_WORKER_MODELS = {}
+
+def _init_scoring_worker():
+    """Loads the classifier and embedder once per worker process."""
+    _WORKER_MODELS["clf"] = clf_handler.load_trained_clf()
+    _WORKER_MODELS["embedder"] = mpnet_embedder.get_embedder()
+
+def _score_mpnet_in_worker(articles):
+    return mpnet_scores(articles, _WORKER_MODELS["clf"], _WORKER_MODELS["embedder"])
+
+# ----------------------------------------------------------------------
+# Checkpoint
+# ----------------------------------------------------------------------
+
+def load_checkpoint(params, checkpoint_file=CHECKPOINT_FILE):
+    """Tickers already finished by an earlier run with the same parameters."""
+    if not os.path.exists(checkpoint_file):
+        return set()
+    try:
+        with open(checkpoint_file, "r") as f:
+            state = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"[Checkpoint Error] {e}")
+        return set()
+    if state.get("params") != params:
+        print("   ⚠️ Checkpoint was written with different parameters; starting over.")
+        return set()
+    return set(state.get("done", []))
+
+def save_checkpoint(params, done, checkpoint_file=CHECKPOINT_FILE):
+    tmp = checkpoint_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"params": params, "done": sorted(done), "updated_at": time.time()}, f, indent=2)
+    os.replace(tmp, checkpoint_file)
+
+# ----------------------------------------------------------------------
+# Runners
+# ----------------------------------------------------------------------
+
+def load_models(with_mpnet=True):
+    """Loads the models once for the whole run."""
+    print("   Loading AI Models...")
+    models = {"llm_analyzer": LLMSentimentAnalyzer(llm_handler.load_llm())}
+    if with_mpnet:
+        models["clf"] = clf_handler.load_trained_clf()
+        models["embedder"] = mpnet_embedder.get_embedder()
+    return models
+
+def backfill_ticker(ticker, lookback_days=LOOKBACK_DAYS, holding_period=HOLDING_PERIOD,
+                    step_days=STEP_DAYS, window_days=WINDOW_DAYS, models=None):
     print(f"\n🚀 Starting Time Machine for {ticker}...")
-    
+
     # 1. Initialize Models
-    print("   [1/5] Loading AI Models...")
-    clf = clf_handler.load_trained_clf()
-    embedder = mpnet_embedder.get_embedder()
-    llm = llm_handler.load_llm()
-    llm_analyzer = LLMSentimentAnalyzer(llm)
-
-    # 2. Fetch Market Data
-    print("   [2/5] Downloading Price History...")
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="2y") 
-    hist.index = hist.index.tz_localize(None)
-
-    # 3. Fetch News
-    print("   [3/5] Downloading News History (Chunked)...")
-    all_news = fetch_company_news(ticker, ticker, max_articles=1000)
-    
+    print("   [1/4] Loading AI Models...")
+    models = models or load_models()
+
+    # 2. Fetch Market Data, News and Fundamentals
+    print("   [2/4] Downloading Price History, News and Fundamentals...")
+    inputs = fetch_ticker_inputs(ticker)
+    all_news = inputs["news"]
+
     # Verify Date Range
     if all_news:
-        newest_date = all_news[0]['date']
-        oldest_date = all_news[-1]['date']
         print(f"         Found {len(all_news)} articles.")
-        print(f"         📅 Newest: {newest_date}")
-        print(f"         📅 Oldest: {oldest_date}")
+        print(f"         📅 Newest: {all_news[0]['date']}")
+        print(f"         📅 Oldest: {all_news[-1]['date']}")
     else:
         print("         ❌ ERROR: No news found!")
         return
 
-    # 4. Get Fundamentals
-    print("   [4/5] Loading Fundamentals...")
-    fund_data = get_fundamentals(ticker)
-    fund_score = calculate_fundamental_score(fund_data)
+    # 3. Score Each Article Once
+    print("   [3/4] Scoring News...")
+    plan = plan_windows(inputs["hist"], all_news, datetime.now(), lookback_days, holding_period, step_days, window_days)
+    if plan is None:
+        print(f"\n✅ Backfill complete for {ticker}")
+        return
+    mp, llm = score_articles(plan["articles"], models["clf"], models["embedder"], models["llm_analyzer"])
+
+    # 4. Build & Save Rows
+    print("   [4/4] Saving Simulation Rows...")
+    rows = build_rows(ticker, inputs["hist"], inputs["fund_score"], plan, mp, llm, inputs["components"])
+    save_rows(rows)
+    for row in rows:
+        print(f"   💾 {row['date']} | LLaMA: {row['llm_score']:.2f} | Return: {row['target_return']:.2%}")
+    print(f"\n✅ Backfill complete for {ticker} ({len(rows)} rows)")
 
-    # 5. The Time Loop
-    print("   [5/5] Running Simulation...")
-    
+def run_backfill(tickers, io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS, resume=True,
+                 checkpoint_file=CHECKPOINT_FILE, lookback_days=LOOKBACK_DAYS,
+                 holding_period=HOLDING_PERIOD, step_days=STEP_DAYS, window_days=WINDOW_DAYS):
+    """
+    Backfills a whole ticker universe.
+    - Price/news/fundamental downloads run on a thread pool (I/O bound).
+    - MPNet embedding runs on a pool of worker processes, each loading its
+      models once (CPU bound); every fetched ticker's job is submitted right
+      away. With cpu_workers=0 it runs in this process.
+    - The LLM stays in this process and is loaded once for the run.
+    - Finished tickers go to a checkpoint file, so an interrupted run resumes
+      with the tickers it had not finished.
+    """
+    params = {
+        "lookback_days": lookback_days, "holding_period": holding_period,
+        "step_days": step_days, "window_days": window_days
+    }
+    done = load_checkpoint(params, checkpoint_file) if resume else set()
+    pending = [t for t in dict.fromkeys(tickers) if t not in done]
+    print(f"\n🚀 Backfilling {len(pending)} tickers ({len(done)} already done)...")
+    if not pending:
+        return
+
+    models = load_models(with_mpnet=cpu_workers == 0)
     end_date = datetime.now()
-    current_sim_date = end_date - timedelta(days=LOOKBACK_DAYS)
-
-    while current_sim_date < end_date - timedelta(days=HOLDING_PERIOD):
-        
-        # --- A. Setup Dates ---
-        entry_row, exit_row = get_trading_dates(hist, current_sim_date)
-        
-        if entry_row is None:
-            current_sim_date += timedelta(days=STEP_DAYS)
-            continue
-
-        # --- B. Calculate Returns ---
-        buy_price = entry_row['Open']
-        sell_price = exit_row['Open']
-        pct_return = (sell_price - buy_price) / buy_price
-
-        # --- C. Filter News ---
-        window_start = current_sim_date - timedelta(days=30)
-        
-        relevant_news = []
-        for art in all_news:
-            art_ts = art.get('datetime', 0)
-            art_date = datetime.fromtimestamp(art_ts)
-            
-            if window_start <= art_date <= current_sim_date:
-                relevant_news.append(art)
-        
-        if not relevant_news:
-            current_sim_date += timedelta(days=STEP_DAYS)
-            continue
-
-        # --- D. Score News (Using Cache) ---
-        # MPNet
-        label_map = {0: "Negative", 1: "Neutral", 2: "Positive"}
-        mpnet_res = mpnet_analyzer(relevant_news, clf, embedder, label_map)
-        mp_score = np.mean([n["sentiment_score"] for n in mpnet_res]) if mpnet_res else 0
-
-        # LLaMA (Cached)
-        llm_scores = []
-        for article in relevant_news:
-            text_key = f"{article.get('title','')}. {article.get('description','')}"
-            cached = get_cached_sentiment(text_key)
-            
-            if cached:
-                llm_scores.append(cached['score'] * cached.get('confidence', 1.0))
-            else:
-                # MISS - Run LLaMA and Cache
-                print(f"      [LLaMA Running] {article['title'][:30]}...")
-                res = llm_analyzer.analyze_single_article(article)
-                update_cache(text_key, res)
-                llm_scores.append(res['sentiment_score'] * res.get('confidence', 1.0))
-        
-        llm_final = np.mean(llm_scores) if llm_scores else 0
-
-        # --- E. Log Data Point & INCREMENTAL SAVE ---
-        date_str = current_sim_date.strftime("%Y-%m-%d")
-        
-        row_data = {
-            "date": date_str,
-            "ticker": ticker,
-            "fund_score": fund_score,
-            "mpnet_score": mp_score,
-            "llm_score": llm_final,
-            "price_at_analysis": buy_price,
-            "target_return": pct_return
-        }
-        
-        # Save immediately
-        total_rows = save_incremental(row_data)
-        
-        print(f"   💾 Saved | {date_str} | LLaMA: {llm_final:.2f} | Return: {pct_return:.2%} | Total Rows: {total_rows}")
-        
-        current_sim_date += timedelta(days=STEP_DAYS)
-
-    print(f"\n✅ Backfill complete for {ticker}")
+
+    cpu_pool = None
+    if cpu_workers > 0:
+        # Spawned workers do not inherit the parent's model/thread state
+        cpu_pool = ProcessPoolExecutor(
+            max_workers=cpu_workers, mp_context=mp.get_context("spawn"), initializer=_init_scoring_worker
+        )
+
+    def finish(ticker, inputs, plan, mp_values, llm_values):
+        rows = build_rows(ticker, inputs["hist"], inputs["fund_score"], plan, mp_values, llm_values, inputs["components"])
+        save_rows(rows)
+        print(f"   💾 {ticker}: {len(rows)} rows saved")
+
+    def mark_done(ticker):
+        done.add(ticker)
+        save_checkpoint(params, done, checkpoint_file)
+
+    try:
+        with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="backfill-io") as io_pool:
+            fetches = {io_pool.submit(fetch_ticker_inputs, t): t for t in pending}
+            # MPNet jobs of every fetched ticker run side by side on the process pool;
+            # the LLM pass for a ticker runs here as soon as its MPNet job finishes
+            scoring = {}
+            while fetches or scoring:
+                finished, _ = wait(list(fetches) + list(scoring), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in fetches:
+                        ticker = fetches.pop(future)
+                        try:
+                            inputs = future.result()
+                            plan = None
+                            if inputs["news"]:
+                                plan = plan_windows(inputs["hist"], inputs["news"], end_date, **params)
+
+                            if plan is None:
+                                print(f"   ⏭️ {ticker}: no traded window with news")
+                                mark_done(ticker)
+                            elif cpu_pool is not None:
+                                scoring[cpu_pool.submit(_score_mpnet_in_worker, plan["articles"])] = (ticker, inputs, plan)
+                            else:
+                                mp_values, llm_values = score_articles(
+                                    plan["articles"], models["clf"], models["embedder"], models["llm_analyzer"]
+                                )
+                                finish(ticker, inputs, plan, mp_values, llm_values)
+                                mark_done(ticker)
+                        except Exception as e:
+                            # Not checkpointed, so the next run retries it
+                            print(f"Error processing {ticker}: {e}")
+                    else:
+                        ticker, inputs, plan = scoring.pop(future)
+                        try:
+                            mp_values = future.result()
+                            llm_values = llm_scores(plan["articles"], models["llm_analyzer"])
+                            finish(ticker, inputs, plan, mp_values, llm_values)
+                            mark_done(ticker)
+                        except Exception as e:
+                            print(f"Error processing {ticker}: {e}")
+    finally:
+        if cpu_pool is not None:
+            cpu_pool.shutdown(cancel_futures=True)
+
+    print(f"\n✅ Backfill complete: {len(done)} / {len(set(tickers))} tickers done")
+
+def resolve_tickers(args):
+    """Ticker universe from the command line: explicit tickers, sectors, or every sector."""
+    if args.all_sectors:
+        tickers = [t for sector_list in sector_tickers_map.values() for t in sector_list]
+    elif args.sectors:
+        tickers = [t for s in args.sectors for t in sector_tickers_map.get(s, [])]
+    else:
+        tickers = args.tickers or DEFAULT_TICKERS
+    return list(dict.fromkeys(t.upper() for t in tickers))
 
 if __name__ == "__main__":
-    # You can change this list or interrupt anytime
-    tickers = ["AAPL", "MSFT", "GOOG", "TSLA", "NVDA"]
-    for t in tickers:
-        try:
-            backfill_ticker(t)
-        except KeyboardInterrupt:
-            print("\n\n⚠️ Stopped by user. Data saved up to this point.")
-            break
-        except Exception as e:
-            print(f"Error processing {t}: {e}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Backfill training rows for a ticker universe.")
+    parser.add_argument("tickers", nargs="*", help=f"Tickers to backfill (default: {' '.join(DEFAULT_TICKERS)})")
+    parser.add_argument("--sectors", nargs="+", help="Backfill every ticker of these sectors")
+    parser.add_argument("--all-sectors", action="store_true", help="Backfill every ticker in sector_tickers_map")
+    parser.add_argument("--io-workers", type=int, default=IO_WORKERS)
+    parser.add_argument("--cpu-workers", type=int, default=CPU_WORKERS, help="MPNet worker processes (0 = in-process)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and redo every ticker")
+    parser.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS)
+    parser.add_argument("--holding-period", type=int, default=HOLDING_PERIOD)
+    parser.add_argument("--step-days", type=int, default=STEP_DAYS)
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS)
+    args = parser.parse_args()
+
+    try:
+        run_backfill(
+            resolve_tickers(args),
+            io_workers=args.io_workers,
+            cpu_workers=args.cpu_workers,
+            resume=not args.fresh,
+            lookback_days=args.lookback_days,
+            holding_period=args.holding_period,
+            step_days=args.step_days,
+            window_days=args.window_days
+        )
+    except KeyboardInterrupt:
+        print("\n\n⚠️ Stopped by user. Finished tickers are checkpointed; rerun to resume.")
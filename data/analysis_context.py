@@ -0,0 +1,56 @@
+# data/analysis_context.py
+import threading
+import yfinance as yf
+from data.sector_cache import SECTOR_CACHE
+from data.price_store import PRICE_STORE
+
+
+class AnalysisContext:
+    """
+    Per-request memoization layer for Yahoo Finance data.
+    Every fetch is keyed and performed at most once per context, even when
+    several pipeline stages ask for the same ticker concurrently.
+    Returned objects are shared, so callers must treat them as read-only.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.fetch_count = 0
+
+    def _memo(self, key, loader):
+        with self._guard:
+            if key in self._values:
+                return self._values[key]
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        # Per-key lock: concurrent callers for the same key wait for one fetch
+        with lock:
+            with self._guard:
+                if key in self._values:
+                    return self._values[key]
+            value = loader()
+            with self._guard:
+                self._values[key] = value
+                self.fetch_count += 1
+            return value
+
+    def ticker(self, symbol):
+        """Shared yf.Ticker handle (used for attributes other than info/history)."""
+        symbol = symbol.upper()
+        return self._memo(("ticker", symbol), lambda: yf.Ticker(symbol))
+
+    def info(self, symbol):
+        """Ticker info dict, fetched once."""
+        symbol = symbol.upper()
+        return self._memo(("info", symbol), lambda: self.ticker(symbol).info)
+
+    def history(self, symbol, period="1y"):
+        """PriceHistory view from the local price store, synced once per period."""
+        symbol = symbol.upper()
+        return self._memo(("history", symbol, period), lambda: PRICE_STORE.history(symbol, period))
+
+    def etf_history(self, sector, period="1y"):
+        """Price history of the sector ETF (SPY when the sector is unmapped), via the shared sector cache."""
+        return self._memo(("etf_history", sector, period), lambda: SECTOR_CACHE.get_etf_history(sector, period))
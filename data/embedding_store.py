@@ -0,0 +1,265 @@
+# data/embedding_store.py
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import numpy as np
+
+STORE_DIR = "data/embeddings"
+FORMAT_VERSION = 1
+_HASH_BYTES = 16
+
+
+def text_hash(text):
+    """16-byte MD5 digest of the embedded text (the content address)."""
+    return hashlib.md5(text.encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """
+    Content-addressed embedding store for one embedder model.
+    Layout (one directory per model name):
+    - vectors.<gen>.f16: float16 matrix, one row per text, memory-mapped for reads
+    - hashes.<gen>.bin:  16-byte MD5 per row, appended in lockstep with the vectors
+    - meta.json:         model name, dimension, format version and current generation
+    Vectors are written before their hashes, so a hash on disk always commits
+    a complete row; a torn append is trimmed on the next append. Compaction
+    writes a new generation and switches to it by atomically replacing
+    meta.json. Appends and compaction take an exclusive file lock, so several
+    processes can share the store. The lock is fcntl.flock, so the store is
+    POSIX-only (as is data/training_store.py). scripts/compact_embeddings.py
+    runs the compaction.
+    """
+
+    def __init__(self, model_name, dim=None, store_dir=STORE_DIR):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+        self.model_name = model_name
+        self.path = os.path.join(store_dir, slug)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.meta_file = os.path.join(self.path, "meta.json")
+        self.lock_file = os.path.join(self.path, ".lock")
+
+        self.dim = dim
+        self.generation = 0
+        self.index = {}
+        self.rows = 0
+        self._matrix = None
+        self._meta_mtime = None
+        self._lock = threading.Lock()
+        self._load_meta()
+        self._refresh()
+
+    @property
+    def vectors_file(self):
+        return os.path.join(self.path, f"vectors.{self.generation}.f16")
+
+    @property
+    def hashes_file(self):
+        return os.path.join(self.path, f"hashes.{self.generation}.bin")
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_file):
+            return
+        self._meta_mtime = os.stat(self.meta_file).st_mtime_ns
+        with open(self.meta_file, "r") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name or meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Embedding store at {self.path} was built for {meta.get('model')} v{meta.get('version')}")
+        if self.dim is not None and meta["dim"] != self.dim:
+            raise ValueError(f"Embedding store dim {meta['dim']} does not match embedder dim {self.dim}")
+        self.dim = meta["dim"]
+        self.generation = meta.get("generation", 0)
+
+    def _write_meta(self, generation=None):
+        meta = {
+            "model": self.model_name,
+            "dim": self.dim,
+            "dtype": "float16",
+            "version": FORMAT_VERSION,
+            "generation": self.generation if generation is None else generation
+        }
+        with open(self.meta_file + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(self.meta_file + ".tmp", self.meta_file)
+        self._meta_mtime = os.stat(self.meta_file).st_mtime_ns
+
+    def _file_lock(self):
+        handle = open(self.lock_file, "a")
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _refresh(self):
+        """Picks up rows appended (or a compaction done) by this or another process."""
+        if os.path.exists(self.meta_file) and os.stat(self.meta_file).st_mtime_ns != self._meta_mtime:
+            generation = self.generation
+            self._load_meta()
+            if self.generation != generation:
+                # Another process compacted the store: rebuild the index from the new generation
+                self.index, self.rows, self._matrix = {}, 0, None
+
+        if self.dim is None or not os.path.exists(self.hashes_file):
+            return
+        hash_rows = os.path.getsize(self.hashes_file) // _HASH_BYTES
+        vec_rows = os.path.getsize(self.vectors_file) // (self.dim * 2) if os.path.exists(self.vectors_file) else 0
+        rows = min(hash_rows, vec_rows)
+
+        if rows == self.rows:
+            return
+
+        with open(self.hashes_file, "rb") as f:
+            f.seek(self.rows * _HASH_BYTES)
+            tail = f.read((rows - self.rows) * _HASH_BYTES)
+        for i in range(rows - self.rows):
+            self.index[tail[i * _HASH_BYTES:(i + 1) * _HASH_BYTES]] = self.rows + i
+        self.rows = rows
+        self._matrix = None
+
+    def _trim(self):
+        """Drops a partially written tail so both files hold exactly self.rows rows."""
+        with open(self.vectors_file, "ab") as f:
+            f.truncate(self.rows * self.dim * 2)
+        with open(self.hashes_file, "ab") as f:
+            f.truncate(self.rows * _HASH_BYTES)
+
+    def matrix(self):
+        """Read-only float16 memmap of all rows."""
+        if self._matrix is None and self.rows:
+            self._matrix = np.memmap(self.vectors_file, dtype=np.float16, mode="r", shape=(self.rows, self.dim))
+        return self._matrix
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, hashes):
+        """Returns {hash: row_index} for the hashes already stored."""
+        with self._lock:
+            self._refresh()
+            return {h: self.index[h] for h in hashes if h in self.index}
+
+    def append(self, hashes, vectors):
+        """Appends new rows; hashes already present are skipped."""
+        vectors = np.asarray(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._write_meta()
+            handle = self._file_lock()
+            try:
+                self._refresh()
+                self._trim()
+                new = [(h, i) for i, h in enumerate(hashes) if h not in self.index]
+                # Duplicates inside the same call keep their first occurrence
+                seen = set()
+                new = [(h, i) for h, i in new if not (h in seen or seen.add(h))]
+                if not new:
+                    return
+                rows = vectors[[i for _, i in new]].astype(np.float16)
+                with open(self.vectors_file, "ab") as f:
+                    f.write(rows.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(self.hashes_file, "ab") as f:
+                    f.write(b"".join(h for h, _ in new))
+                self._refresh()
+            finally:
+                handle.close()
+
+    def embed(self, texts, encode_fn):
+        """
+        Returns float32 embeddings for `texts` in input order, calling
+        encode_fn(list_of_texts) only for texts not yet in the store.
+        """
+        hashes = [text_hash(t) for t in texts]
+        known = self.get(hashes)
+
+        missing, missing_pos = [], {}
+        for t, h in zip(texts, hashes):
+            if h not in known and h not in missing_pos:
+                missing_pos[h] = len(missing)
+                missing.append(t)
+
+        fresh = None
+        if missing:
+            fresh = np.asarray(encode_fn(missing))
+            self.append([text_hash(t) for t in missing], fresh)
+
+        # Resolve rows and read them under one generation: another process may
+        # have compacted (and renumbered) the store since get() or append()
+        dim = self.dim if self.dim is not None else fresh.shape[1]
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        lost = []
+        with self._lock:
+            self._refresh()
+            rows = {h: self.index[h] for h in hashes if h in self.index}
+            matrix = self.matrix() if rows else None
+            for i, h in enumerate(hashes):
+                if h in rows:
+                    out[i] = matrix[rows[h]]
+                elif h in missing_pos:
+                    # Round through float16 so stored and fresh vectors are identical
+                    out[i] = fresh[missing_pos[h]].astype(np.float16)
+                else:
+                    lost.append(i)
+        if lost:
+            # Dropped by a concurrent compaction after get(): encode them again
+            out[lost] = self.embed([texts[i] for i in lost], encode_fn)
+        return out
+
+    def compact(self, keep_hashes=None):
+        """
+        Rewrites the store keeping only `keep_hashes` (all rows if None),
+        reclaiming space from texts that are no longer needed.
+        """
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                self._refresh()
+                if not self.rows:
+                    return 0
+                if keep_hashes is None:
+                    keep = sorted(self.index.items(), key=lambda kv: kv[1])
+                else:
+                    keep = sorted(((h, self.index[h]) for h in set(keep_hashes) if h in self.index), key=lambda kv: kv[1])
+
+                matrix = np.memmap(self.vectors_file, dtype=np.float16, mode="r", shape=(self.rows, self.dim))
+                kept_vectors = np.ascontiguousarray(matrix[[r for _, r in keep]]) if keep else np.empty((0, self.dim), np.float16)
+                del matrix
+
+                old_files = (self.vectors_file, self.hashes_file)
+                new_gen = self.generation + 1
+                with open(os.path.join(self.path, f"vectors.{new_gen}.f16"), "wb") as f:
+                    f.write(kept_vectors.tobytes())
+                with open(os.path.join(self.path, f"hashes.{new_gen}.bin"), "wb") as f:
+                    f.write(b"".join(h for h, _ in keep))
+
+                # Atomic switch: readers see either the old or the new generation, never a mix
+                self._write_meta(generation=new_gen)
+                self.generation = new_gen
+                for old in old_files:
+                    os.remove(old)
+
+                self.index, self.rows, self._matrix = {}, 0, None
+                self._refresh()
+                return self.rows
+            finally:
+                handle.close()
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_embedding_store(model_name):
+    """Shared store instance per embedder model name."""
+    with _STORES_LOCK:
+        if model_name not in _STORES:
+            _STORES[model_name] = EmbeddingStore(model_name)
+        return _STORES[model_name]
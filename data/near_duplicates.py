@@ -0,0 +1,169 @@
+# data/near_duplicates.py
+import hashlib
+import re
+import zlib
+import numpy as np
+from utils.config_loader import CONFIG
+
+_cfg = CONFIG.get("near_duplicates", {})
+
+# Hash family for the MinHash permutations: multiply-shift, i.e. the top 32
+# bits of (a * x + b) mod 2^64 with a random odd a (uint64 arithmetic wraps)
+_SHIFT = np.uint64(32)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def article_key(article):
+    """Short stable id of an article (text + timestamp), used as its cluster id."""
+    text = f"{article.get('title', '')}. {article.get('description', '')}|{article.get('datetime', 0)}"
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+
+
+def shingles(text, k=2):
+    """crc32 hashes of the word k-grams of the normalized text."""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64))
+
+
+class MinHashLSH:
+    """
+    MinHash signatures with LSH banding for near-duplicate detection.
+    - Each document is reduced to num_perm minimum hash values; the fraction of
+      equal values estimates the Jaccard similarity of the shingle sets.
+    - Signatures are cut into `bands` bands; only documents sharing a band
+      bucket are compared, so clustering stays near-linear in N.
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.6, shingle_size=2, seed=7):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    def signatures(self, texts):
+        """(N x num_perm) MinHash matrix; rows of texts without words are all-max (never match)."""
+        sets = [shingles(t, self.shingle_size) for t in texts]
+        sigs = np.full((len(texts), self.num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+        filled = [i for i, s in enumerate(sets) if len(s)]
+        if not filled:
+            return sigs
+
+        # All shingles in one pass: hash, then take each document's minimum
+        values = np.concatenate([sets[i] for i in filled])
+        offsets = np.cumsum([0] + [len(sets[i]) for i in filled[:-1]])
+        hashed = (self._a[:, None] * values[None, :] + self._b[:, None]) >> _SHIFT
+        sigs[filled] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        return sigs
+
+    def candidate_pairs(self, sigs):
+        """Index pairs (i < j) that share at least one band bucket."""
+        pairs = set()
+        for b in range(self.bands):
+            band = np.ascontiguousarray(sigs[:, b * self.rows:(b + 1) * self.rows])
+            _, bucket = np.unique(band.view(np.dtype((np.void, band.dtype.itemsize * self.rows))), return_inverse=True)
+            order = np.argsort(bucket.ravel(), kind="stable")
+            sorted_buckets = bucket.ravel()[order]
+            bounds = np.flatnonzero(np.diff(sorted_buckets)) + 1
+            for group in np.split(order, bounds):
+                if len(group) > 1:
+                    pairs.update((int(i), int(j)) for n, i in enumerate(group) for j in group[n + 1:])
+        return pairs
+
+    def cluster(self, texts):
+        """
+        Cluster label per text: the index of its cluster's first member.
+        Candidate pairs are kept when their estimated Jaccard similarity
+        reaches the threshold, then joined transitively (union-find).
+        """
+        sigs = self.signatures(texts)
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        empty = sigs[:, 0] == np.iinfo(np.uint64).max
+        for i, j in self.candidate_pairs(sigs):
+            if empty[i] or empty[j]:
+                continue
+            if np.mean(sigs[i] == sigs[j]) >= self.threshold:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+        return [find(i) for i in range(len(texts))]
+
+
+LSH = MinHashLSH(
+    num_perm=_cfg.get("num_perm", 64),
+    bands=_cfg.get("bands", 16),
+    threshold=_cfg.get("threshold", 0.6),
+    shingle_size=_cfg.get("shingle_size", 2)
+)
+DUPLICATE_WEIGHT = _cfg.get("duplicate_weight", 0.25)
+
+
+def tag_clusters(articles, lsh=None):
+    """
+    Marks near-duplicate articles (syndicated rewrites of one story) at ingestion.
+    Every article gets 'cluster' (the id of its representative); the earliest
+    article of each cluster is the representative and gets 'cluster_rep'.
+    Returns the number of clusters.
+    """
+    if not _cfg.get("enabled", True):
+        # Untagged articles are scored one by one, as before
+        return len(articles)
+    if not articles:
+        return 0
+
+    labels = (lsh or LSH).cluster([f"{a.get('title', '')}. {a.get('description', '')}" for a in articles])
+    members = {}
+    for i, label in enumerate(labels):
+        members.setdefault(label, []).append(i)
+
+    for group in members.values():
+        rep = min(group, key=lambda i: articles[i].get("datetime", 0))
+        key = article_key(articles[rep])
+        for i in group:
+            articles[i]["cluster"] = key
+            articles[i]["cluster_rep"] = i == rep
+    return len(members)
+
+
+def representatives(articles, duplicate_weight=None):
+    """
+    Splits articles into the ones to score and the ones that inherit a score.
+    Returns (rep_indices, owner, weights):
+    - rep_indices: positions of one article per cluster (its tagged
+      representative if present, else its first member)
+    - owner: for every article, the position in rep_indices whose score it takes
+    - weights: 1.0 for representatives, duplicate_weight for the others
+      (0 counts each story once; a backfill window that holds only
+      duplicates then falls back to their unweighted mean)
+    Untagged articles are their own cluster, so plain lists are unchanged.
+    """
+    if duplicate_weight is None:
+        duplicate_weight = DUPLICATE_WEIGHT
+
+    slot = {}
+    for i, art in enumerate(articles):
+        key = art.get("cluster", ("untagged", i))
+        if key not in slot or art.get("cluster_rep"):
+            slot[key] = i
+    rep_indices = list(dict.fromkeys(slot.values()))
+    position = {i: n for n, i in enumerate(rep_indices)}
+
+    owner = np.array([position[slot[art.get("cluster", ("untagged", i))]] for i, art in enumerate(articles)], dtype=int)
+    weights = np.where(np.isin(np.arange(len(articles)), rep_indices), 1.0, float(duplicate_weight))
+    return rep_indices, owner, weights
@@ -1,67 +1,285 @@
 # data/news_handler.py
 import finnhub
+import math
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import date, datetime, timedelta
+from data.near_duplicates import tag_clusters
+from data.news_store import NEWS_STORE
 from utils.config_loader import CONFIG
+from utils.rate_limiter import FINNHUB_LIMITER
+
+_finnhub_cfg = CONFIG.get("finnhub", {})
+MAX_RETRIES = _finnhub_cfg.get("max_retries", 4)
+BACKOFF_SECONDS = _finnhub_cfg.get("backoff_seconds", 2.0)
+# Finnhub returns at most about this many articles per request; a response
+# this long is treated as truncated and its window is split
+PAGE_CAP = _finnhub_cfg.get("page_cap", 100)
+# Planned windows expect the page cap minus this many Poisson standard
+# deviations of articles, so few of them come back truncated
+WINDOW_SLACK_SIGMAS = _finnhub_cfg.get("window_slack_sigmas", 1.5)
+# A ticker synced more recently than this is served from the store without an API call
+MIN_REFRESH_SECONDS = CONFIG.get("news_store", {}).get("min_refresh_minutes", 15) * 60
+
+# Chunk requests from every ticker/request share this pool and FINNHUB_LIMITER
+NEWS_POOL = ThreadPoolExecutor(max_workers=_finnhub_cfg.get("max_workers", 8), thread_name_prefix="finnhub")
+
+PAGER_STATS = {}
+_stats_lock = threading.Lock()
+# Largest page the API has actually returned (raises the cap if PAGE_CAP is set too low)
+_observed_cap = 0
+
+
+def _retry_delay(error, attempt):
+    """Seconds to back off after a rate-limit/server error (Retry-After wins if sent)."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return BACKOFF_SECONDS * (2 ** attempt)
+
+
+def fetch_chunk(client, ticker, _from, _to):
+    """
+    Fetches one window of company news under the shared rate limiter.
+    HTTP 429 pauses the limiter for every caller and retries with backoff;
+    5xx responses are retried too. Other errors are logged and yield None.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        FINNHUB_LIMITER.acquire()
+        try:
+            return client.company_news(ticker, _from=_from, to=_to) or []
+        except finnhub.FinnhubAPIException as e:
+            retryable = e.status_code == 429 or e.status_code >= 500
+            if not retryable or attempt == MAX_RETRIES:
+                print(f"  [API Error] Failed to fetch chunk {_from}: {e}")
+                return None
+            delay = _retry_delay(e, attempt)
+            if e.status_code == 429:
+                FINNHUB_LIMITER.pause(delay)
+            else:
+                time.sleep(delay)
+        except Exception as e:
+            print(f"  [API Error] Failed to fetch chunk {_from}: {e}")
+            return None
+    return None
+
+
+def page_cap():
+    """Response length treated as truncated: PAGE_CAP, or a longer page seen from the API."""
+    return max(PAGE_CAP, _observed_cap)
+
+
+def window_target(cap=None):
+    """Articles a planned window is sized for: the page cap minus Poisson slack."""
+    cap = cap or page_cap()
+    return max(1.0, cap - WINDOW_SLACK_SIGMAS * math.sqrt(cap))
+
+
+def probe_calls(total, cap=None):
+    """Expected calls of probing `total` articles: one full page, then planned windows for the rest."""
+    cap = cap or page_cap()
+    return 1 + math.ceil(max(0.0, total - cap) / window_target(cap))
+
+
+def plan_windows(start_date, end_date, density):
+    """
+    Splits [start_date, end_date] into equal windows expected to hold about
+    window_target() articles at `density` articles/day.
+    Quiet tickers get one window for the whole range.
+    """
+    total_days = (end_date - start_date).days + 1
+    days = total_days if density <= 0 else max(1, int(window_target() / density))
+    windows = []
+    current = start_date
+    while current <= end_date:
+        last = min(current + timedelta(days=days - 1), end_date)
+        windows.append((current, last))
+        current = last + timedelta(days=1)
+    return windows
+
+
+def split_truncated(lo, hi, chunk):
+    """
+    Windows still to fetch after a truncated response for [lo, hi].
+    Finnhub returns the newest articles first, so every day after the oldest
+    returned article is complete; only [lo, cut] is left, and it is re-planned
+    at the density seen in this response. If the response does not reach past
+    its newest day, that day is saturated and the rest is halved.
+    Returns (windows, saturated_days).
+    """
+    if lo == hi:
+        return [], 1
+    cut = date.fromtimestamp(min(a.get("datetime", 0) for a in chunk))
+    if lo <= cut < hi:
+        return plan_windows(lo, cut, len(chunk) / ((hi - cut).days + 1)), 0
+    hi -= timedelta(days=1)
+    if lo == hi:
+        return [(lo, hi)], 1
+    mid = lo + timedelta(days=(hi - lo).days // 2)
+    return [(lo, mid), (mid + timedelta(days=1), hi)], 1
+
+
+def fetch_window(client, ticker, start_date, end_date, density=None):
+    """
+    Adaptive pager over [start_date, end_date] (inclusive days).
+    - Windows are planned from the ticker's known article density; without
+      one, or when the plan would take more calls than probing, the whole
+      range is requested first and the response is the probe.
+    - A response of page_cap() articles is treated as truncated: its articles
+      are kept and the part of the window it did not reach is split again
+      (see split_truncated), recursively, down to one day.
+    - All windows in flight are fetched concurrently through NEWS_POOL.
+    Returns (raw articles, complete, stats); complete is False if any request failed.
+    """
+    global _observed_cap
+    stats = {"calls": 0, "splits": 0, "articles": 0, "saturated_days": 0}
+    articles, complete = [], True
+    cap = page_cap()
+
+    def submit(window):
+        _from, _to = (d.strftime("%Y-%m-%d") for d in window)
+        return NEWS_POOL.submit(fetch_chunk, client, ticker, _from, _to)
+
+    windows = [(start_date, end_date)]
+    if density is not None:
+        planned = plan_windows(start_date, end_date, density)
+        # The probe's first page is filled to the cap, planned windows only to
+        # window_target(): keep the plan when it is not the costlier option
+        if len(planned) <= probe_calls(density * ((end_date - start_date).days + 1), cap):
+            windows = planned
+    pending = {submit(w): w for w in windows}
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            lo, hi = pending.pop(future)
+            chunk = future.result()
+            stats["calls"] += 1
+            if chunk is None:
+                complete = False
+                continue
+            articles.extend(chunk)
+            if len(chunk) > cap:
+                with _stats_lock:
+                    _observed_cap = max(_observed_cap, len(chunk))
+            if len(chunk) < cap:
+                continue
+            # Truncated: a day over the cap on its own cannot be split further
+            windows, saturated = split_truncated(lo, hi, chunk)
+            stats["splits"] += bool(windows)
+            stats["saturated_days"] += saturated
+            for window in windows:
+                pending[submit(window)] = window
+
+    stats["articles"] = len({(a.get("id"), a.get("headline"), a.get("datetime")) for a in articles})
+    return articles, complete, stats
+
+
+def _record_stats(ticker, stats):
+    if stats["calls"]:
+        print(f"  [News Sync] {ticker}: {stats['calls']} calls, {stats['articles']} articles "
+              f"({stats['new_articles']} new, {stats['splits']} splits, {stats['saturated_days']} saturated days)")
+    with _stats_lock:
+        total = PAGER_STATS.setdefault(ticker, {k: 0 for k in stats})
+        for k, v in stats.items():
+            total[k] += v
+
+
+def pager_stats():
+    """Cumulative pager counters per ticker: API calls, splits, articles received, saturated days."""
+    with _stats_lock:
+        return {t: dict(s) for t, s in PAGER_STATS.items()}
+
+
+def sync_ticker_news(client, ticker, start_date, end_date, store=None):
+    """
+    Brings the stored news for `ticker` up to date and makes sure it reaches back to start_date.
+    - Only the days from the ticker's high-water mark (its newest stored
+      article) onwards are requested, plus any older range not fetched yet.
+    - The covered range only grows over windows that were fetched completely,
+      so a failed chunk is retried on the next sync.
+    Returns this sync's pager stats (calls made, articles received, ...).
+    """
+    ticker = ticker.upper()
+    store = store or NEWS_STORE
+    totals = {"calls": 0, "splits": 0, "articles": 0, "saturated_days": 0, "new_articles": 0}
+
+    def fetch(lo, hi, density):
+        articles, complete, stats = fetch_window(client, ticker, lo, hi, density)
+        stats["new_articles"] = store.put_articles(articles)
+        for k, v in stats.items():
+            totals[k] += v
+        return complete
+
+    with store.ticker_lock(ticker):
+        state = store.get_state(ticker)
+        if state is None:
+            if fetch(start_date, end_date, None):
+                store.set_state(ticker, start_date, end_date)
+            _record_stats(ticker, totals)
+            return totals
+
+        density = store.density(ticker)
+        covered_from, covered_to = state["covered_from"], state["covered_to"]
+        if start_date < covered_from:
+            if fetch(start_date, covered_from - timedelta(days=1), density):
+                covered_from = start_date
+
+        recently_synced = time.time() - state["synced_at"] < MIN_REFRESH_SECONDS
+        if end_date > covered_to or not recently_synced:
+            # Re-ask from the high-water day: articles published later that day may be new
+            since = covered_to
+            if state["high_water"]:
+                since = min(max(since, date.fromtimestamp(state["high_water"])), end_date)
+            if fetch(since, end_date, density):
+                covered_to = max(covered_to, end_date)
+
+        if (covered_from, covered_to) != (state["covered_from"], state["covered_to"]) or not recently_synced:
+            store.set_state(ticker, covered_from, covered_to)
+    _record_stats(ticker, totals)
+    return totals
+
+
+def filter_articles(chunk, ticker, company_name):
+    """Keeps articles tagged with the ticker whose headline or summary names the company."""
+    articles = []
+    for art in chunk:
+        related_ticker = art.get("related", "").upper()
+        # Basic Filtering
+        if any(t.strip() == ticker.upper() for t in related_ticker.split(',')):
+            headline = art.get("headline", "")
+            summary = art.get("summary", "")
+
+            # Content Filter (Simple keyword match)
+            if company_name.lower() in headline.lower() or \
+               company_name.lower() in summary.lower():
+
+                articles.append({
+                    "title": headline,
+                    "description": summary,
+                    "date": date.fromtimestamp(art.get("datetime", 0)).strftime("%Y-%m-%d"),
+                    "datetime": art.get("datetime", 0) # Keep raw TS
+                })
+    return articles
+
 
 def fetch_company_news(ticker, company_name, api_key=CONFIG["finnhub"]["api_key"], max_articles=500):
     """
-    Fetch company news using Finnhub API with Month-by-Month pagination
-    to bypass API truncation limits.
+    Returns one year of company news, newest first.
+    Articles are served from the local news store (data/news_store.db);
+    Finnhub is only asked for the days since the ticker's last sync.
     """
     client = finnhub.Client(api_key)
-    news_articles = []
-    
-    # We want 1 year of data
+
     end_date = date.today()
     start_date = end_date - timedelta(days=365)
-    
-    # Create monthly chunks to ensure we get older data
-    # (APIs often only return the last ~100 items per request)
-    current = start_date
-    while current < end_date:
-        next_month = current + timedelta(days=30)
-        if next_month > end_date:
-            next_month = end_date
-            
-        _from = current.strftime("%Y-%m-%d")
-        _to = next_month.strftime("%Y-%m-%d")
-        
-        # print(f"  [API] Fetching news for {ticker}: {_from} to {_to}")
-        
-        try:
-            # Fetch chunk
-            chunk = client.company_news(ticker, _from=_from, to=_to)
-            
-            # Process chunk immediately
-            for art in chunk:
-                related_ticker = art.get("related", "").upper()
-                # Basic Filtering
-                if any(t.strip() == ticker.upper() for t in related_ticker.split(',')):
-                    headline = art.get("headline", "")
-                    summary = art.get("summary", "")
-                    
-                    # Content Filter (Simple keyword match)
-                    if company_name.lower() in headline.lower() or \
-                       company_name.lower() in summary.lower():
-                        
-                        news_articles.append({
-                            "title": headline,
-                            "description": summary,
-                            "date": date.fromtimestamp(art.get("datetime", 0)).strftime("%Y-%m-%d"),
-                            "datetime": art.get("datetime", 0) # Keep raw TS
-                        })
-            
-            # Rate Limit Protection (Finnhub Free = 60 calls/min)
-            time.sleep(0.5) 
-            
-        except Exception as e:
-            print(f"  [API Error] Failed to fetch chunk {_from}: {e}")
-        
-        # Move to next chunk
-        current = next_month
+    sync_ticker_news(client, ticker, start_date, end_date)
+
+    news_articles = filter_articles(NEWS_STORE.articles(ticker, start_date, end_date), ticker, company_name)
 
-    # Deduplicate (API might return overlapping items)
+    # Deduplicate (syndicated copies share a title)
     # Use a dictionary keyed by title to remove dupes
     unique_articles = {art['title']: art for art in news_articles}.values()
     news_articles = list(unique_articles)
@@ -73,4 +291,6 @@ def fetch_company_news(ticker, company_name, api_key=CONFIG["finnhub"]["api_key"
     if len(news_articles) > max_articles:
         news_articles = news_articles[:max_articles]
 
-    return news_articles
\ No newline at end of file
+    # Group syndicated rewrites so each story is scored once
+    tag_clusters(news_articles)
+    return news_articles
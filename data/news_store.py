@@ -0,0 +1,188 @@
+# data/news_store.py
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+DB_FILE = "data/news_store.db"
+
+ARTICLE_FIELDS = ("id", "datetime", "headline", "summary", "related", "source", "url")
+
+
+def article_id(art):
+    """Finnhub article id, or a hash of headline + timestamp when the id is missing."""
+    if art.get("id"):
+        return str(art["id"])
+    key = f"{art.get('headline', '')}|{art.get('datetime', 0)}"
+    return "h" + hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def related_tickers(art):
+    return {t.strip().upper() for t in (art.get("related") or "").split(",") if t.strip()}
+
+
+def day_start(day):
+    """Local-midnight epoch seconds of a date (Finnhub windows are whole local days)."""
+    return int(time.mktime(day.timetuple()))
+
+
+class NewsStore:
+    """
+    Persistent Finnhub article store (SQLite, WAL mode).
+    - Each article is stored once, keyed by its Finnhub id, and linked to
+      every ticker in its `related` field, so overlapping tickers share rows.
+    - sync_state keeps, per ticker, the date range already fetched and the
+      high-water mark (newest article `datetime`), so a refresh only has to
+      ask Finnhub for the days after the last sync.
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._init_db()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS articles (
+                    id TEXT PRIMARY KEY,
+                    datetime INTEGER,
+                    headline TEXT,
+                    summary TEXT,
+                    related TEXT,
+                    source TEXT,
+                    url TEXT
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS ticker_articles (
+                    ticker TEXT,
+                    article_id TEXT,
+                    datetime INTEGER,
+                    PRIMARY KEY (ticker, article_id)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ticker_time ON ticker_articles (ticker, datetime)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sync_state (
+                    ticker TEXT PRIMARY KEY,
+                    covered_from TEXT,
+                    covered_to TEXT,
+                    high_water INTEGER,
+                    synced_at REAL
+                )"""
+            )
+
+    def ticker_lock(self, ticker):
+        """Serializes syncs of one ticker within this process."""
+        with self._guard:
+            return self._locks.setdefault(ticker.upper(), threading.Lock())
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def put_articles(self, articles):
+        """Inserts raw Finnhub articles (duplicates are ignored). Returns the number of new articles."""
+        rows, links = [], []
+        for art in articles:
+            aid = article_id(art)
+            ts = int(art.get("datetime") or 0)
+            rows.append((aid, ts, art.get("headline", ""), art.get("summary", ""),
+                         art.get("related", ""), art.get("source", ""), art.get("url", "")))
+            links.extend((t, aid, ts) for t in related_tickers(art))
+
+        conn = self._conn()
+        with conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            added = conn.total_changes - before
+            conn.executemany("INSERT OR IGNORE INTO ticker_articles VALUES (?, ?, ?)", links)
+        return added
+
+    def articles(self, ticker, start: date, end: date):
+        """Stored articles linked to `ticker` published on start..end (inclusive), newest first."""
+        rows = self._conn().execute(
+            f"""SELECT {', '.join('a.' + f for f in ARTICLE_FIELDS)}
+                FROM ticker_articles t JOIN articles a ON a.id = t.article_id
+                WHERE t.ticker = ? AND t.datetime >= ? AND t.datetime < ?
+                ORDER BY t.datetime DESC""",
+            (ticker.upper(), day_start(start), day_start(end + timedelta(days=1)))
+        ).fetchall()
+        return [dict(zip(ARTICLE_FIELDS, row)) for row in rows]
+
+    def get_state(self, ticker):
+        row = self._conn().execute(
+            "SELECT covered_from, covered_to, high_water, synced_at FROM sync_state WHERE ticker = ?",
+            (ticker.upper(),)
+        ).fetchone()
+        if row is None:
+            return None
+        covered_from, covered_to, high_water, synced_at = row
+        return {
+            "covered_from": datetime.strptime(covered_from, "%Y-%m-%d").date(),
+            "covered_to": datetime.strptime(covered_to, "%Y-%m-%d").date(),
+            "high_water": high_water,
+            "synced_at": synced_at
+        }
+
+    def set_state(self, ticker, covered_from: date, covered_to: date):
+        """Records the fetched range; the high-water mark is recomputed from stored articles."""
+        ticker = ticker.upper()
+        conn = self._conn()
+        with conn:
+            high_water = conn.execute(
+                "SELECT MAX(datetime) FROM ticker_articles WHERE ticker = ?", (ticker,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                (ticker, covered_from.strftime("%Y-%m-%d"), covered_to.strftime("%Y-%m-%d"), high_water, time.time())
+            )
+
+    def density(self, ticker):
+        """Stored articles per day over the ticker's fetched range, or None if it was never synced."""
+        state = self.get_state(ticker)
+        if state is None:
+            return None
+        count = self._conn().execute(
+            "SELECT COUNT(*) FROM ticker_articles WHERE ticker = ? AND datetime >= ? AND datetime < ?",
+            (ticker.upper(), day_start(state["covered_from"]), day_start(state["covered_to"] + timedelta(days=1)))
+        ).fetchone()[0]
+        return count / ((state["covered_to"] - state["covered_from"]).days + 1)
+
+    def article_texts(self, start: date):
+        """Scoring texts ("headline. summary") of every stored article published on or after `start`."""
+        rows = self._conn().execute(
+            "SELECT headline, summary FROM articles WHERE datetime >= ?", (day_start(start),)
+        ).fetchall()
+        return [f"{headline}. {summary}" for headline, summary in rows]
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "articles": conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+            "links": conn.execute("SELECT COUNT(*) FROM ticker_articles").fetchone()[0],
+            "tickers": conn.execute("SELECT COUNT(*) FROM sync_state").fetchone()[0]
+        }
+
+
+NEWS_STORE = NewsStore()
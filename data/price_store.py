@@ -0,0 +1,224 @@
+# data/price_store.py
+import json
+import os
+import threading
+from datetime import date, timedelta
+import numpy as np
+import yfinance as yf
+
+STORE_DIR = "data/prices"
+
+# Column order of the on-disk matrix. The Date row holds int64 day numbers
+# (days since epoch) bit-cast to float64 so the whole file stays one dtype.
+COLUMNS = ("Date", "Open", "High", "Low", "Close", "Volume")
+PERIOD_DAYS = {"d": 1, "mo": 30, "y": 365}
+
+
+def period_to_days(period: str) -> int:
+    """Converts a yfinance-style period ('5d', '6mo', '1y', '2y') to days."""
+    for suffix in ("mo", "d", "y"):
+        if period.endswith(suffix):
+            return int(period[:-len(suffix)]) * PERIOD_DAYS[suffix]
+    raise ValueError(f"Unsupported period: {period}")
+
+
+class PriceHistory:
+    """
+    Read-only, zero-copy view over a slice of a ticker's price matrix.
+    Columns are exposed as contiguous 1-D NumPy arrays.
+    """
+
+    def __init__(self, ticker, data):
+        self.ticker = ticker
+        self.data = data
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    @property
+    def dates(self):
+        return self.data[0].view("int64").view("datetime64[D]")
+
+    @property
+    def open(self):
+        return self.data[1]
+
+    @property
+    def high(self):
+        return self.data[2]
+
+    @property
+    def low(self):
+        return self.data[3]
+
+    @property
+    def close(self):
+        return self.data[4]
+
+    @property
+    def volume(self):
+        return self.data[5]
+
+    def to_frame(self):
+        """Materializes a pandas DataFrame (copy) for callers that need one."""
+        import pandas as pd
+        return pd.DataFrame(
+            {name: np.array(self.data[i]) for i, name in enumerate(COLUMNS) if i > 0},
+            index=pd.DatetimeIndex(self.dates, name="Date")
+        )
+
+
+class PriceStore:
+    """
+    On-disk OHLCV store with one memory-mappable .npy file per ticker.
+    Each file holds a (len(COLUMNS), n_bars) float64 matrix, so every column
+    is contiguous and can be handed out as a view without copying.
+    Syncing only downloads bars newer than the last stored date. Only
+    completed sessions are stored: today's bar may still be moving.
+    A {ticker}.json sidecar records the earliest start ever requested from
+    the provider, so a ticker listed after that start is not re-downloaded.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, initial_period="2y"):
+        self.store_dir = store_dir
+        self.initial_period = initial_period
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._synced = {}
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _path(self, ticker):
+        return os.path.join(self.store_dir, f"{ticker.upper()}.npy")
+
+    def _meta_path(self, ticker):
+        return os.path.join(self.store_dir, f"{ticker.upper()}.json")
+
+    def _read_meta(self, ticker):
+        try:
+            with open(self._meta_path(ticker), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _lock(self, ticker):
+        with self._guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def load(self, ticker):
+        """Memory-maps the stored matrix (read-only), or returns None."""
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def _write(self, ticker, matrix, meta):
+        # np.save appends '.npy' to names without it, so keep the suffix on the temp file
+        tmp_path = self._path(ticker)[:-4] + ".tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(matrix))
+        os.replace(tmp_path, self._path(ticker))
+
+        tmp_meta = self._meta_path(ticker) + ".tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, self._meta_path(ticker))
+
+    @staticmethod
+    def _download(ticker, start):
+        """Daily bars from `start` up to yesterday; today's bar is left out until the session is over."""
+        df = yf.Ticker(ticker).history(start=start.strftime("%Y-%m-%d"))
+        if df is None or df.empty:
+            return None
+
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        days = index.values.astype("datetime64[D]").astype("int64")
+        complete = days < np.datetime64(date.today(), "D").astype("int64")
+        if not complete.any():
+            return None
+        matrix = np.empty((len(COLUMNS), int(complete.sum())), dtype="float64")
+        matrix[0] = days[complete].view("float64")
+        for i, name in enumerate(COLUMNS[1:], start=1):
+            matrix[i] = df[name].to_numpy(dtype="float64")[complete]
+        return matrix
+
+    def _reload(self, ticker, start):
+        """Replaces the stored history with a full download from `start`."""
+        fresh = self._download(ticker, start)
+        if fresh is not None:
+            self._write(ticker, fresh, {"requested_from": start.isoformat(), "first_available": self._first_day(fresh).isoformat()})
+
+    def sync(self, ticker, start: date = None):
+        """
+        Brings the stored history up to date and makes sure it reaches back to `start`.
+        Only bars from the last stored date onwards are downloaded; the overlapping
+        bar is re-fetched so a split/dividend re-adjustment triggers a full reload.
+        """
+        ticker = ticker.upper()
+        today = date.today()
+
+        with self._lock(ticker):
+            if self._synced.get(ticker) == (today, start):
+                return
+            stored = self.load(ticker)
+            meta = self._read_meta(ticker)
+
+            if stored is None or self._needs_reload(stored, meta, start):
+                self._reload(ticker, start or today - timedelta(days=period_to_days(self.initial_period)))
+                self._synced[ticker] = (today, start)
+                return
+
+            last_day = self._last_day(stored)
+            last_complete = np.busday_offset(np.datetime64(today, "D"), -1, roll="backward").astype(date)
+            # Stores written before the sidecar existed may end in a partial bar:
+            # replace it rather than compare against it
+            trusted = stored if meta else stored[:, :-1]
+            if last_day < last_complete or not meta:
+                new_bars = self._download(ticker, last_day)
+                if new_bars is not None:
+                    overlap = new_bars[0].view("int64") == stored[0, -1:].view("int64")[0]
+                    if meta and overlap.any() and not np.isclose(new_bars[4][overlap][0], stored[4, -1], rtol=1e-3):
+                        # Adjusted prices changed (split/dividend): reload from scratch
+                        self._reload(ticker, date.fromisoformat(meta["requested_from"]))
+                    else:
+                        if meta:
+                            new_bars = new_bars[:, ~overlap]
+                        else:
+                            meta = {"requested_from": self._first_day(stored).isoformat(),
+                                    "first_available": self._first_day(stored).isoformat()}
+                        if new_bars.shape[1] or trusted is not stored:
+                            self._write(ticker, np.concatenate([trusted, new_bars], axis=1), meta)
+
+            self._synced[ticker] = (today, start)
+
+    def _needs_reload(self, stored, meta, start):
+        """True if `start` lies before the range already requested from the provider."""
+        if start is None:
+            return False
+        if meta:
+            return start < date.fromisoformat(meta["requested_from"])
+        return self._first_day(stored) > start + timedelta(days=7)
+
+    @staticmethod
+    def _first_day(matrix):
+        return matrix[0, :1].view("int64").view("datetime64[D]")[0].astype(date)
+
+    @staticmethod
+    def _last_day(matrix):
+        return matrix[0, -1:].view("int64").view("datetime64[D]")[0].astype(date)
+
+    def history(self, ticker, period="1y", sync=True):
+        """Returns a PriceHistory view covering the requested period."""
+        ticker = ticker.upper()
+        start = date.today() - timedelta(days=period_to_days(period))
+        if sync:
+            self.sync(ticker, start)
+
+        matrix = self.load(ticker)
+        if matrix is None:
+            return PriceHistory(ticker, np.empty((len(COLUMNS), 0), dtype="float64"))
+
+        dates = matrix[0].view("int64").view("datetime64[D]")
+        first = np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        return PriceHistory(ticker, matrix[:, first:])
+
+
+PRICE_STORE = PriceStore()
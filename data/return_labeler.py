@@ -0,0 +1,86 @@
+# data/return_labeler.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import numpy as np
+import pandas as pd
+
+from data.price_store import PRICE_STORE
+from data.training_store import TRAINING_STORE
+from utils.config_loader import CONFIG
+
+HOLDING_PERIOD = CONFIG.get("backfill", {}).get("holding_period", 14)
+
+
+def forward_returns(bar_dates, opens, row_dates, holding_period=HOLDING_PERIOD):
+    """
+    Vectorized as-of join of analysis dates against one ticker's bars.
+    Uses the same entry/exit rule as the backfill (get_trading_dates): entry is
+    the open one bar after the first bar following the analysis day, exit is
+    holding_period bars later. Returns NaN where the exit bar does not exist yet.
+    """
+    start_idx = np.searchsorted(bar_dates, row_dates, side="right")
+    entry_idx = start_idx + 1
+    exit_idx = entry_idx + holding_period
+
+    out = np.full(len(row_dates), np.nan)
+    ok = exit_idx < len(bar_dates)
+    buy = opens[entry_idx[ok]]
+    sell = opens[exit_idx[ok]]
+    out[ok] = (sell - buy) / buy
+    return out
+
+
+def label_unlabeled_rows(holding_period=HOLDING_PERIOD, tickers=None, max_workers=8, store=TRAINING_STORE):
+    """
+    Fills target_return for every stored row that has none.
+    Price panels for all involved tickers are loaded in bulk (in parallel),
+    returns are computed per ticker with one searchsorted, and the labels are
+    written back as partial upsert rows. Returns (rows_labeled, rows_pending).
+    """
+    t0 = time.perf_counter()
+    df = store.load(columns=["target_return"], tickers=tickers)
+    df = df[df["target_return"].isna()]
+    if df.empty:
+        print("[Labeler] No unlabeled rows.")
+        return 0, 0
+
+    row_days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")
+    df = df.assign(_day=row_days)
+    groups = dict(tuple(df.groupby("ticker", sort=False)))
+
+    # 1. Load every price panel once, reaching back to the oldest unlabeled row
+    oldest = row_days.min().astype(date)
+    period = f"{(date.today() - oldest).days + 7}d"
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        panels = dict(zip(groups, pool.map(lambda t: PRICE_STORE.history(t, period=period), groups)))
+
+    # 2. Vectorized as-of join per ticker
+    labeled = []
+    for ticker, group in groups.items():
+        hist = panels[ticker]
+        if not len(hist):
+            continue
+        returns = forward_returns(hist.dates, hist.open, group["_day"].to_numpy(), holding_period)
+        done = ~np.isnan(returns)
+        if done.any():
+            labeled.append(pd.DataFrame({
+                "date": group["date"].to_numpy()[done],
+                "ticker": ticker,
+                "target_return": returns[done]
+            }))
+
+    # 3. Partial rows: only target_return is set, the scores are left as stored
+    written = 0
+    if labeled:
+        written = store.append(pd.concat(labeled, ignore_index=True).to_dict("records"))
+
+    pending = len(df) - written
+    print(f"[Labeler] Labeled {written} rows ({pending} still inside the holding period) "
+          f"in {time.perf_counter() - t0:.2f}s")
+    return written, pending
+
+
+if __name__ == "__main__":
+    # Run from the project root: python -m data.return_labeler
+    label_unlabeled_rows()
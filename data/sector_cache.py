@@ -0,0 +1,140 @@
+# data/sector_cache.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yfinance as yf
+from data.reference_data import sector_tickers_map, sector_etf_map
+from data.price_store import PRICE_STORE
+from utils.config_loader import CONFIG
+
+CACHE_FILE = "data/sector_cache.json"
+
+
+class SectorCache:
+    """
+    Process-wide, sector-level snapshot cache.
+    - Peer P/E snapshots (keyed by sector from sector_tickers_map) are persisted
+      to CACHE_FILE and served until they are older than the TTL.
+    - Stale snapshots are still served while a background refresh runs
+      (stale-while-revalidate); only a cold sector blocks the caller.
+    - Peer lookups run on a bounded thread pool.
+    - Sector ETF histories are served from the shared on-disk price store.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE, ttl_hours=24, max_workers=8):
+        self.cache_file = cache_file
+        self.ttl = ttl_hours * 3600
+        self.snapshots = self._load()
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._sector_locks = {}
+        self._refreshing = set()
+        # Peer fetches run on the bounded pool; refresh orchestration gets its own
+        # thread so a waiting refresh can never starve the pool it submits to.
+        self._fetch_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sector-fetch")
+        self._refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sector-refresh")
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, ValueError):
+            return {}
+
+    def _save(self):
+        # Refreshes of different sectors save concurrently: serialize the
+        # dump + replace so they never share the tmp file
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self.snapshots)
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                f.write(data)
+            os.replace(tmp_file, self.cache_file)
+
+    def _is_fresh(self, fetched_at):
+        return (time.time() - fetched_at) < self.ttl
+
+    # ------------------------------------------------------------------
+    # Peer P/E snapshots
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fetch_pe(ticker):
+        try:
+            pe = yf.Ticker(ticker).info.get("trailingPE")
+            return pe if pe and pe > 0 else None
+        except Exception:
+            return None
+
+    def refresh(self, sector):
+        """Fetches all peer P/Es for a sector in parallel and stores the snapshot."""
+        with self._lock:
+            sector_lock = self._sector_locks.setdefault(sector, threading.Lock())
+
+        with sector_lock:
+            # Another caller may have filled the sector while we waited for the lock
+            current = self.snapshots.get(sector)
+            if current is not None and self._is_fresh(current["fetched_at"]):
+                with self._lock:
+                    self._refreshing.discard(sector)
+                return current
+
+            tickers = sector_tickers_map.get(sector, [])
+            previous = self.snapshots.get(sector, {}).get("pes", {})
+            fetched = dict(zip(tickers, self._fetch_pool.map(self._fetch_pe, tickers)))
+
+            # Keep the last known value for peers whose fetch failed this time
+            pes = {t: (fetched[t] if fetched[t] is not None else previous.get(t)) for t in tickers}
+            snapshot = {"fetched_at": time.time(), "pes": pes}
+
+            with self._lock:
+                self.snapshots[sector] = snapshot
+                self._refreshing.discard(sector)
+            self._save()
+            return snapshot
+
+    def refresh_async(self, sector):
+        """Schedules a background refresh unless one is already queued."""
+        with self._lock:
+            if sector in self._refreshing:
+                return
+            self._refreshing.add(sector)
+        self._refresh_pool.submit(self.refresh, sector)
+
+    def get_peer_pes(self, sector) -> list:
+        """Returns the valid trailing P/E ratios of the sector's peers."""
+        if sector not in sector_tickers_map:
+            return []
+
+        snapshot = self.snapshots.get(sector)
+        if snapshot is None:
+            snapshot = self.refresh(sector)
+        elif not self._is_fresh(snapshot["fetched_at"]):
+            self.refresh_async(sector)
+
+        return [pe for pe in snapshot["pes"].values() if pe and pe > 0]
+
+    # ------------------------------------------------------------------
+    # Sector ETF history
+    # ------------------------------------------------------------------
+
+    def get_etf_history(self, sector, period="1y"):
+        """PriceHistory of the sector ETF (SPY when unmapped), shared across requests."""
+        return PRICE_STORE.history(sector_etf_map.get(sector, "SPY"), period)
+
+
+_cache_cfg = CONFIG.get("sector_cache", {})
+SECTOR_CACHE = SectorCache(
+    ttl_hours=_cache_cfg.get("ttl_hours", 24),
+    max_workers=_cache_cfg.get("max_workers", 8)
+)
@@ -0,0 +1,221 @@
+# data/semantic_cache.py
+import threading
+import numpy as np
+from data.embedding_store import get_embedding_store
+from data.sentiment_cache import SENTIMENT_CACHE, content_id
+from utils.config_loader import CONFIG
+
+_cfg = CONFIG.get("semantic_cache", {})
+
+
+def cache_entry(result, text=None):
+    """LLM result -> the entry format of the sentiment cache."""
+    return {
+        "headline": text,
+        "score": result.get("sentiment_score", 0),
+        "confidence": result.get("confidence", 0),
+        "label": result.get("sentiment_label", "Neutral")
+    }
+
+
+class SemanticStats:
+    """
+    Hit rate of the semantic tier and, on audited hits, agreement between the
+    reused result and a fresh LLM score for the same article. An audit whose
+    LLM call failed is counted as inconclusive and left out of the agreement.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.audits = 0
+        self.inconclusive_audits = 0
+        self.label_agreements = 0
+        self.diffs = []
+
+    def record_lookups(self, lookups, hits):
+        with self._lock:
+            self.lookups += lookups
+            self.hits += hits
+
+    def record_audit(self, cached, fresh):
+        with self._lock:
+            if fresh is None:
+                self.inconclusive_audits += 1
+                return
+            self.audits += 1
+            self.label_agreements += cached["label"] == fresh["label"]
+            self.diffs.append(abs(cached["score"] * cached["confidence"] - fresh["score"] * fresh["confidence"]))
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": (self.hits / self.lookups) if self.lookups else 0.0,
+                "audits": self.audits,
+                "inconclusive_audits": self.inconclusive_audits,
+                "label_agreement": (self.label_agreements / self.audits) if self.audits else None,
+                "mean_abs_diff_vs_llm": float(np.mean(self.diffs)) if self.diffs else None
+            }
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour tier in front of the LLM for one embedder model.
+    - Holds the MPNet embeddings (L2-normalized) of articles the LLM has
+      already scored, in a flat in-memory matrix; a lookup is one inner
+      product against all rows, so the best match is the highest cosine.
+    - A miss in the exact (MD5) cache whose best match reaches `threshold`
+      reuses that article's LLM result.
+    - `audit_rate` of the hits are still sent to the LLM, and the fresh
+      score is compared with the reused one (SemanticStats).
+    - The index is seeded from the sentiment cache joined with the
+      embedding store (both are keyed by the MD5 of the same text) and holds
+      at most max_entries rows; the oldest rows are overwritten first.
+    """
+
+    def __init__(self, model_name, threshold=0.95, audit_rate=0.05, max_entries=50000, seed=None):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.max_entries = max_entries
+        self.stats = SemanticStats()
+
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+        self._vectors = None
+        self._entries = []
+        self._ids = {}
+        self._next = 0
+        self._size = 0
+        self._warmed = False
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _grow(self, dim):
+        """Doubles the index matrix (up to max_entries) when it is full."""
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if self._size < capacity or capacity == self.max_entries:
+            return
+        grown = np.empty((min(self.max_entries, max(1024, 2 * capacity)), dim), dtype=np.float32)
+        if capacity:
+            grown[:capacity] = self._vectors
+        self._entries.extend([None] * (len(grown) - capacity))
+        self._vectors = grown
+
+    def _insert(self, keys, vectors, entries):
+        """Adds rows (caller holds the lock); an already indexed key is skipped."""
+        vectors = self._normalize(vectors)
+        for key, vector, entry in zip(keys, vectors, entries):
+            if key in self._ids:
+                continue
+            self._grow(len(vector))
+            slot = self._next
+            old = self._entries[slot]
+            if old is not None:
+                self._ids.pop(old[0], None)
+            self._vectors[slot] = vector
+            self._entries[slot] = (key, entry)
+            self._ids[key] = slot
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def warm(self):
+        """Seeds the index with the most recent LLM results that have a stored embedding."""
+        with self._lock:
+            if self._warmed:
+                return
+            self._warmed = True
+            recent = SENTIMENT_CACHE.recent(self.max_entries)
+            if not recent:
+                return
+            store = get_embedding_store(self.model_name)
+            rows = store.get([bytes.fromhex(cid) for cid, _ in recent])
+            found = [(cid, entry, rows[bytes.fromhex(cid)]) for cid, entry in recent if bytes.fromhex(cid) in rows]
+            if not found:
+                return
+            matrix = store.matrix()
+            # Oldest first, so the newest entries are the last to be overwritten
+            found.reverse()
+            self._insert(
+                [cid for cid, _, _ in found],
+                np.asarray(matrix[[row for _, _, row in found]], dtype=np.float32),
+                [entry for _, entry, _ in found]
+            )
+        print(f"[Semantic Cache] Indexed {self._size} LLM results for {self.model_name}")
+
+    def __len__(self):
+        return self._size
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def lookup(self, vectors):
+        """
+        Best match of every query embedding.
+        Returns a list of (entry, similarity, audit): entry is None below the
+        threshold; audit marks hits that should still get a fresh LLM score.
+        """
+        self.warm()
+        queries = self._normalize(vectors)
+        entries, sims = [None] * len(queries), np.zeros(len(queries))
+        with self._lock:
+            if self._size and len(queries):
+                scores = queries @ self._vectors[:self._size].T
+                best = np.argmax(scores, axis=1)
+                sims = scores[np.arange(len(queries)), best]
+                entries = [self._entries[j][1] if sim >= self.threshold else None for j, sim in zip(best, sims)]
+            audit = self._rng.random(len(queries)) < self.audit_rate
+
+        results = [(entry, float(sim), bool(entry is not None and a)) for entry, sim, a in zip(entries, sims, audit)]
+        self.stats.record_lookups(len(results), sum(entry is not None for entry in entries))
+        return results
+
+    def add(self, texts, vectors, results):
+        """Indexes freshly LLM-scored articles (texts are the sentiment-cache keys)."""
+        if not texts:
+            return
+        with self._lock:
+            self._insert([content_id(t) for t in texts], vectors, [cache_entry(r, t) for t, r in zip(texts, results)])
+
+    def record_audit(self, cached_entry, fresh_result):
+        """Compares a reused entry with a fresh LLM result (None: the LLM call failed)."""
+        self.stats.record_audit(cached_entry, None if fresh_result is None else cache_entry(fresh_result))
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def semantic_cache_enabled():
+    return _cfg.get("enabled", False)
+
+
+def get_semantic_cache(model_name):
+    """Shared semantic cache per embedder model name."""
+    with _CACHES_LOCK:
+        if model_name not in _CACHES:
+            _CACHES[model_name] = SemanticCache(
+                model_name,
+                threshold=_cfg.get("threshold", 0.95),
+                audit_rate=_cfg.get("audit_rate", 0.05),
+                max_entries=_cfg.get("max_entries", 50000)
+            )
+        return _CACHES[model_name]
+
+
+def semantic_cache_stats():
+    """Stats of every semantic cache in use, keyed by model name."""
+    with _CACHES_LOCK:
+        return {name: {"entries": len(cache), **cache.stats.as_dict()} for name, cache in _CACHES.items()}
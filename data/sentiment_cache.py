@@ -1,47 +1,261 @@
 # data/sentiment_cache.py
+import atexit
+import hashlib
 import json
 import os
-import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DB_FILE = "data/sentiment_cache.db"
+LEGACY_CACHE_FILE = "data/sentiment_cache.json"
+
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def content_id(text):
+    """MD5 of the article text (title + description), used as the cache key."""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    LLM sentiment cache backed by SQLite in WAL mode.
+    - An in-process LRU answers repeated lookups without touching disk.
+    - Writes are buffered and flushed by a background thread in batched
+      transactions (write-behind); buffered entries are visible to readers
+      in this process immediately.
+    - WAL + busy timeout make it safe for the API server and backfill_data.py
+      to read and write the same database concurrently.
+    """
+
+    def __init__(self, db_file=DB_FILE, lru_size=20000, flush_interval=1.0, flush_batch=256):
+        self.db_file = db_file
+        self.lru_size = lru_size
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self._local = threading.local()
+        self._lru = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._pending = {}
+        self._inflight = {}
+        self._pending_cond = threading.Condition()
+        self._writer = None
+        self._closed = False
+
+        self._init_db()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sentiment (
+                    id TEXT PRIMARY KEY,
+                    headline TEXT,
+                    score REAL,
+                    confidence REAL,
+                    label TEXT,
+                    updated_at REAL
+                )"""
+            )
+        self._import_legacy_json()
+
+    def _import_legacy_json(self):
+        """One-time import of the old sentiment_cache.json into an empty database."""
+        if not os.path.exists(LEGACY_CACHE_FILE) or os.path.getsize(LEGACY_CACHE_FILE) == 0:
+            return
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM sentiment LIMIT 1").fetchone():
+            return
+        try:
+            with open(LEGACY_CACHE_FILE, "r") as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, ValueError):
+            return
+
+        # The old analyzer cached failed generations as confidence 0.0; leave
+        # those out so the articles are scored again
+        now = time.time()
+        rows = [
+            (cid, e.get("headline"), e.get("score", 0), e.get("confidence", 0), e.get("label", "Neutral"), now)
+            for cid, e in legacy.items()
+            if e.get("confidence")
+        ]
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO sentiment VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    # ------------------------------------------------------------------
+    # LRU
+    # ------------------------------------------------------------------
+
+    def _lru_get(self, cid):
+        with self._lru_lock:
+            entry = self._lru.get(cid)
+            if entry is not None:
+                self._lru.move_to_end(cid)
+            return entry
 
-CACHE_FILE = "data/sentiment_cache.json"
+    def _lru_put(self, cid, entry):
+        with self._lru_lock:
+            self._lru[cid] = entry
+            self._lru.move_to_end(cid)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
 
-def load_cache():
-    """Loads the existing cache from disk."""
-    if not os.path.exists(CACHE_FILE):
-        return {}
-    try:
-        with open(CACHE_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, ValueError):
-        return {}
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_many(self, texts):
+        """Returns a list aligned with `texts`: the cached entry or None."""
+        ids = [content_id(t) for t in texts]
+        found = {}
+        missing = []
+
+        for cid in set(ids):
+            entry = self._lru_get(cid)
+            if entry is None:
+                with self._pending_cond:
+                    entry = self._pending.get(cid) or self._inflight.get(cid)
+            if entry is not None:
+                found[cid] = entry
+            else:
+                missing.append(cid)
+
+        conn = self._conn()
+        for i in range(0, len(missing), _SQL_CHUNK):
+            chunk = missing[i:i + _SQL_CHUNK]
+            rows = conn.execute(
+                f"SELECT id, headline, score, confidence, label FROM sentiment WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for cid, headline, score, confidence, label in rows:
+                entry = {"headline": headline, "score": score, "confidence": confidence, "label": label}
+                found[cid] = entry
+                self._lru_put(cid, entry)
+
+        return [found.get(cid) for cid in ids]
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def recent(self, limit):
+        """The `limit` most recently written entries as (id, entry) pairs, newest first."""
+        self.flush()
+        rows = self._conn().execute(
+            "SELECT id, headline, score, confidence, label FROM sentiment ORDER BY updated_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [
+            (cid, {"headline": headline, "score": score, "confidence": confidence, "label": label})
+            for cid, headline, score, confidence, label in rows
+        ]
+
+    def put_many(self, items):
+        """
+        Buffers (text, sentiment_result) pairs for write-behind.
+        sentiment_result should be: {"sentiment_score": float, "confidence": float, "sentiment_label": str}
+        """
+        with self._pending_cond:
+            for text, result in items:
+                cid = content_id(text)
+                entry = {
+                    "headline": text,
+                    "score": result.get("sentiment_score", 0),
+                    "confidence": result.get("confidence", 0),
+                    "label": result.get("sentiment_label", "Neutral")
+                }
+                self._pending[cid] = entry
+                self._lru_put(cid, entry)
+
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="sentiment-cache-writer", daemon=True)
+                self._writer.start()
+            if len(self._pending) >= self.flush_batch:
+                self._pending_cond.notify()
+
+    def put(self, text, sentiment_result):
+        self.put_many([(text, sentiment_result)])
+
+    def flush(self):
+        """Writes all buffered entries in a single transaction."""
+        with self._pending_cond:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            # Keep the batch visible to readers until it is committed
+            self._inflight.update(batch)
+
+        now = time.time()
+        rows = [(cid, e["headline"], e["score"], e["confidence"], e["label"], now) for cid, e in batch.items()]
+        conn = self._conn()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            with self._pending_cond:
+                for cid in batch:
+                    self._inflight.pop(cid, None)
+
+    def _writer_loop(self):
+        while not self._closed:
+            with self._pending_cond:
+                self._pending_cond.wait(timeout=self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"[Cache Error] {e}")
+
+    def close(self):
+        """Flushes outstanding writes; called automatically at interpreter exit."""
+        self._closed = True
+        with self._pending_cond:
+            self._pending_cond.notify()
+        self.flush()
+
+
+SENTIMENT_CACHE = SentimentCache()
 
-def save_cache(cache_data):
-    """Saves the updated cache to disk."""
-    with open(CACHE_FILE, "w") as f:
-        json.dump(cache_data, f, indent=4)
 
 def get_cached_sentiment(text):
     """
     Returns the cached score and confidence if found, else None.
     Uses an MD5 hash of the text (title + description) as the unique key.
     """
-    cache = load_cache()
-    content_id = hashlib.md5(text.encode("utf-8")).hexdigest()
-    
-    return cache.get(content_id)
+    return SENTIMENT_CACHE.get(text)
+
+
+def get_many_cached_sentiments(texts):
+    """Batched lookup; returns a list aligned with `texts` (None for misses)."""
+    return SENTIMENT_CACHE.get_many(texts)
+
 
 def update_cache(text, sentiment_result):
     """
     Saves a new analysis result to the cache.
-    sentiment_result should be: {"score": float, "confidence": float, "label": str}
+    sentiment_result should be: {"sentiment_score": float, "confidence": float, "sentiment_label": str}
     """
-    cache = load_cache()
-    content_id = hashlib.md5(text.encode("utf-8")).hexdigest()
-    
-    cache[content_id] = {
-        "headline": text,
-        "score": sentiment_result.get('sentiment_score', 0),
-        "confidence": sentiment_result.get('confidence', 0),
-        "label": sentiment_result.get('sentiment_label', "Neutral")
-    }
-    save_cache(cache)
\ No newline at end of file
+    SENTIMENT_CACHE.put(text, sentiment_result)
+
+
+def update_cache_many(items):
+    """Batched write of (text, sentiment_result) pairs."""
+    SENTIMENT_CACHE.put_many(items)
@@ -1,14 +1,13 @@
 # data/training_manager.py
-import os
-import pandas as pd
 from datetime import datetime
+from data.training_store import TRAINING_STORE, COMPONENT_COLUMNS
 
-DATA_FILE = "data/training_data.csv"
-
-def log_training_example(ticker, fund_score, mpnet_score, llm_score, current_price):
+def log_training_example(ticker, fund_score, mpnet_score, llm_score, current_price, components=None):
     """
-    Saves a single analysis snapshot to a CSV file.
+    Saves a single analysis snapshot to the training store.
     This creates the dataset for future regression training.
+    `components` holds the fundamental sub-scores (E, V, M, A, C, S) so the
+    weight search can re-weight them.
     """
     
     # 1. Define the row structure
@@ -21,17 +20,9 @@ def log_training_example(ticker, fund_score, mpnet_score, llm_score, current_pri
         "price_at_analysis": current_price,
         "target_return": None
     }
+    for col in COMPONENT_COLUMNS:
+        new_row[col] = (components or {}).get(col)
     
-    if os.path.exists(DATA_FILE):
-        df = pd.read_csv(DATA_FILE)
-    else:
-        df = pd.DataFrame(columns=new_row.keys())
-        
-    mask = (df['date'] == new_row['date']) & (df['ticker'] == new_row['ticker'])
-    if not df[mask].empty:
-        df.loc[mask, ["fund_score", "mpnet_score", "llm_score", "price_at_analysis"]] = \
-            [fund_score, mpnet_score, llm_score, current_price]
-    else:
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        
-    df.to_csv(DATA_FILE, index=False)
\ No newline at end of file
+    # 2. Append only; a repeat analysis of the same (date, ticker) overrides the
+    # scores when the store resolves upserts, and keeps any label already set
+    TRAINING_STORE.append([new_row])
@@ -0,0 +1,252 @@
+# data/training_store.py
+import csv
+import fcntl
+import glob
+import io
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "data/training"
+LEGACY_FILE = "data/training_data.csv"
+
+# Store schema. Partitions written with an older header are rewritten to this
+# one the next time they are appended to or compacted.
+COMPONENT_COLUMNS = ["E", "V", "M", "A", "C", "S"]
+COLUMNS = [
+    "date", "ticker",
+    "fund_score", *COMPONENT_COLUMNS, "mpnet_score", "llm_score", "macro_score",
+    "price_at_analysis", "target_return"
+]
+KEY = ["date", "ticker"]
+
+
+def resolve_upserts(df):
+    """
+    Collapses rows sharing a (date, ticker) key into one.
+    Later rows win column by column, and empty cells never overwrite values,
+    so a partial row (e.g. only target_return) updates just its own columns.
+    """
+    if df.empty or not df.duplicated(KEY).any():
+        return df
+    return df.groupby(KEY, as_index=False, sort=False).last()
+
+
+class TrainingStore:
+    """
+    Append-only training-row store partitioned by ticker and month:
+    data/training/<TICKER>/<YYYY-MM>.csv
+    - Appending writes only the new lines to the affected partitions.
+    - Re-logging a (date, ticker) appends another row; readers resolve the
+      duplicates (last write wins per column) and compact() makes it permanent.
+    - load() reads only the partitions and columns it is asked for.
+    - Writers across processes serialize on an fcntl.flock file lock, so the
+      store is POSIX-only.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.lock_file = os.path.join(store_dir, ".lock")
+        self._lock = threading.Lock()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Partitions
+    # ------------------------------------------------------------------
+
+    def _partition_path(self, ticker, month):
+        return os.path.join(self.store_dir, ticker.upper(), f"{month}.csv")
+
+    def partitions(self, tickers=None, start=None, end=None):
+        """Partition files, optionally limited to tickers and a 'YYYY-MM-DD' date range."""
+        if tickers is None:
+            paths = glob.glob(os.path.join(self.store_dir, "*", "*.csv"))
+        else:
+            paths = [p for t in tickers for p in glob.glob(os.path.join(self.store_dir, t.upper(), "*.csv"))]
+
+        selected = []
+        for path in sorted(paths):
+            month = os.path.basename(path)[:-4]
+            if start is not None and month < start[:7]:
+                continue
+            if end is not None and month > end[:7]:
+                continue
+            selected.append(path)
+        return selected
+
+    def _file_lock(self):
+        handle = open(self.lock_file, "a")
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    @staticmethod
+    def _header(path):
+        with open(path, "r", newline="") as f:
+            return next(csv.reader(f), [])
+
+    @staticmethod
+    def _read_partitions(paths, usecols=None, with_partition=False):
+        """
+        Parses many partitions with one read_csv per distinct header: the file
+        bodies are concatenated and parsed together, which is far cheaper than
+        one parser call per small file. With with_partition, a '_partition'
+        column holds each row's index into `paths`.
+        """
+        groups = {}
+        for i, path in enumerate(paths):
+            with open(path, "r", newline="") as f:
+                header = f.readline()
+                body = f.read()
+            lines = [line for line in body.split("\n") if line.strip()]
+            if not lines:
+                continue
+            bodies, counts = groups.setdefault(header, ([], []))
+            bodies.append("\n".join(lines) + "\n")
+            counts.append((i, len(lines)))
+
+        frames = []
+        for header, (bodies, counts) in groups.items():
+            df = pd.read_csv(io.StringIO(header + "".join(bodies)), usecols=usecols)
+            if with_partition:
+                df["_partition"] = np.repeat([i for i, _ in counts], [n for _, n in counts])
+            frames.append(df)
+        return frames
+
+    @staticmethod
+    def _write_partition(path, records):
+        """Atomically replaces a partition with `records` (lists in COLUMNS order)."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(records)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _to_records(df):
+        df = df.reindex(columns=COLUMNS).astype(object)
+        return df.where(df.notna(), "").values.tolist()
+
+    def _rewrite(self, path, df):
+        df = resolve_upserts(df).sort_values(KEY)
+        self._write_partition(path, self._to_records(df))
+        return len(df)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def append(self, rows):
+        """Appends row dicts (keyed by COLUMNS) to their ticker/month partitions."""
+        groups = {}
+        for row in rows:
+            groups.setdefault((row["ticker"].upper(), row["date"][:7]), []).append(row)
+        if not groups:
+            return 0
+
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                for (ticker, month), group in groups.items():
+                    path = self._partition_path(ticker, month)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                    if os.path.exists(path) and self._header(path) != COLUMNS:
+                        # Older schema: fold the new rows in with one rewrite
+                        old = pd.read_csv(path)
+                        self._rewrite(path, pd.concat([old, pd.DataFrame(group)], ignore_index=True))
+                        continue
+
+                    new_file = not os.path.exists(path)
+                    with open(path, "a", newline="") as f:
+                        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+                        if new_file:
+                            writer.writeheader()
+                        writer.writerows(group)
+            finally:
+                handle.close()
+        return len(rows)
+
+    def load(self, columns=None, tickers=None, start=None, end=None, labeled_only=False):
+        """
+        Reads training rows as one DataFrame sorted by (date, ticker).
+        Only the requested columns (plus the key) are parsed, and only the
+        partitions that can hold the requested tickers/dates are opened.
+        """
+        wanted = None
+        if columns is not None:
+            wanted = set(KEY) | set(columns)
+            if labeled_only:
+                wanted.add("target_return")
+
+        usecols = (lambda c: c in wanted) if wanted is not None else None
+        frames = self._read_partitions(self.partitions(tickers, start, end), usecols)
+
+        if not frames:
+            return pd.DataFrame(columns=[c for c in COLUMNS if wanted is None or c in wanted])
+
+        df = resolve_upserts(pd.concat(frames, ignore_index=True))
+        if start is not None:
+            df = df[df["date"] >= start]
+        if end is not None:
+            df = df[df["date"] <= end]
+        if labeled_only:
+            df = df[df["target_return"].notna()]
+        if columns is not None:
+            keep = list(dict.fromkeys(KEY + list(columns)))
+            df = df[[c for c in keep if c in df.columns]]
+        return df.sort_values(KEY).reset_index(drop=True)
+
+    def compact(self, tickers=None):
+        """
+        Rewrites partitions with one row per (date, ticker) in the current
+        schema. Returns the number of rows kept.
+        """
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                paths = self.partitions(tickers)
+                frames = self._read_partitions(paths, with_partition=True)
+                if not frames:
+                    return 0
+                df = pd.concat(frames, ignore_index=True)
+
+                # Only partitions with repeated keys or an older header are rewritten
+                stale = set(df.loc[df.duplicated(KEY, keep=False), "_partition"])
+                stale |= {i for i, path in enumerate(paths) if self._header(path) != COLUMNS}
+                kept = len(df) - int(df.duplicated(KEY).sum())
+                if not stale:
+                    return kept
+
+                # Resolve all stale partitions in one pass; a key never spans partitions
+                rows = resolve_upserts(df[df["_partition"].isin(stale)])
+                rows = rows.sort_values(["_partition"] + KEY)
+                parts = rows["_partition"].to_numpy()
+                records = self._to_records(rows)
+                bounds = np.flatnonzero(np.diff(parts)) + 1
+                for lo, hi in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(parts)]))):
+                    self._write_partition(paths[parts[lo]], records[lo:hi])
+                return kept
+            finally:
+                handle.close()
+
+    def is_empty(self):
+        return not self.partitions()
+
+    def import_legacy_csv(self, legacy_file=LEGACY_FILE):
+        """Copies the old single-file training CSV into the store (once, when the store is empty)."""
+        if not self.is_empty() or not os.path.exists(legacy_file):
+            return 0
+        try:
+            df = pd.read_csv(legacy_file)
+        except pd.errors.EmptyDataError:
+            return 0
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        count = self.append(rows)
+        print(f"[Training Store] Imported {count} rows from {legacy_file}")
+        return count
+
+
+TRAINING_STORE = TrainingStore()
+TRAINING_STORE.import_legacy_csv()
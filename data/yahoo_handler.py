@@ -1,6 +1,6 @@
 # data/yahoo_handler.py
-import yfinance as yf
 import sys, os, contextlib
+from data.analysis_context import AnalysisContext
 
 @contextlib.contextmanager
 def suppress_stdout_stderr():
@@ -13,16 +13,17 @@ def suppress_stdout_stderr():
             sys.stdout, sys.stderr = old_out, old_err
 
 
-def get_stock_info(ticker, period="1y"):
+def get_stock_info(ticker, period="1y", ctx: AnalysisContext = None):
     """
     Returns:
     - info: dictionary of stock information
-    - hist: historical price data as DataFrame
+    - hist: historical price data as a PriceHistory (NumPy views from the local price store)
+    Both are read through the request's AnalysisContext when one is given.
     """
+    ctx = ctx or AnalysisContext()
     with suppress_stdout_stderr():
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        hist = stock.history(period=period)
+        info = ctx.info(ticker)
+        hist = ctx.history(ticker, period=period)
     return info, hist
 
 
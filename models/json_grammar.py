@@ -0,0 +1,137 @@
+# models/json_grammar.py
+import json
+import math
+import threading
+from llama_cpp import LlamaGrammar
+
+
+def decimal_enum(lo, hi, places=2):
+    """Schema for a number in [lo, hi] printed with at most `places` decimals."""
+    scale = 10 ** places
+    return {"enum": [n / scale for n in range(round(lo * scale), round(hi * scale) + 1)]}
+
+
+# Output schemas for the LLM prompts. Property order is the generation order.
+# Numbers are enums so their printed length (and token count) is bounded.
+SENTIMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "rationale": {"type": "string", "maxLength": 160},
+        "sentiment_label": {"enum": ["Bullish", "Bearish", "Neutral"]},
+        "sentiment_score": decimal_enum(-1.0, 1.0)
+    },
+    # The prompts do not ask for a confidence; results default it to 1.0
+    "required": ["rationale", "sentiment_label", "sentiment_score"]
+}
+
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendation": {"enum": ["Buy", "Hold", "Sell"]},
+        "score": decimal_enum(-1.0, 1.0),
+        "rationale": {"type": "string", "maxLength": 400}
+    },
+    "required": ["recommendation", "score", "rationale"]
+}
+
+# Longest unbounded number llama.cpp's JSON grammar allows: sign, 16 integral
+# digits, ".", 16 decimals, "e-", 16 exponent digits
+_NUMBER_CHARS = 52
+# The grammar allows at most one space between JSON tokens
+_SPACE = 1
+
+_GRAMMARS = {}
+_GRAMMAR_LOCK = threading.Lock()
+
+
+def array_schema(item_schema, n_items):
+    """Schema for a JSON array of exactly n_items objects."""
+    return {"type": "array", "items": item_schema, "minItems": n_items, "maxItems": n_items}
+
+
+def _length_bounds(schema):
+    """
+    (fixed_chars, text_chars): upper bounds on the serialized length of any JSON
+    the schema allows, split into structure/literals/numbers and free-text
+    string contents.
+    """
+    if "enum" in schema:
+        return max(len(json.dumps(v)) for v in schema["enum"]) + _SPACE, 0
+
+    kind = schema.get("type")
+    if kind == "string":
+        return 2 + _SPACE, schema.get("maxLength", 256)
+    if kind in ("number", "integer"):
+        return _NUMBER_CHARS + _SPACE, 0
+    if kind == "object":
+        props = schema["properties"]
+        fixed, text = 2 + 2 * _SPACE + (len(props) - 1) * (1 + _SPACE), 0
+        for key, value in props.items():
+            value_fixed, value_text = _length_bounds(value)
+            fixed += len(json.dumps(key)) + 2 * _SPACE + 1 + value_fixed
+            text += value_text
+        return fixed, text
+    if kind == "array":
+        n = schema.get("maxItems", 1)
+        item_fixed, item_text = _length_bounds(schema["items"])
+        return 2 + 2 * _SPACE + n * item_fixed + max(n - 1, 0) * (1 + _SPACE), n * item_text
+    raise ValueError(f"Unsupported schema: {schema}")
+
+
+def max_chars_for_schema(schema):
+    """Upper bound on the serialized length of any JSON the schema allows (escapes count as one char)."""
+    return sum(_length_bounds(schema))
+
+
+def max_tokens_for_schema(schema, chars_per_token=2.0, margin=8):
+    """
+    Token budget for a grammar-constrained completion of the schema.
+    Structure, keys, enum literals and numbers are budgeted at one token per
+    character, which no output can exceed. Free-text strings are budgeted at
+    `chars_per_token`, an average for English prose, plus `margin` tokens:
+    an unusually token-dense rationale can still be cut off, and is then
+    counted as a parse failure.
+    """
+    fixed, text = _length_bounds(schema)
+    return fixed + int(math.ceil(text / chars_per_token)) + margin
+
+
+def build_grammar(schema):
+    """Compiles (and caches) a llama.cpp GBNF grammar for the schema."""
+    key = json.dumps(schema, sort_keys=True)
+    with _GRAMMAR_LOCK:
+        grammar = _GRAMMARS.get(key)
+        if grammar is None:
+            grammar = LlamaGrammar.from_json_schema(json.dumps(schema), verbose=False)
+            _GRAMMARS[key] = grammar
+        return grammar
+
+
+class LLMMetrics:
+    """Per-prompt-kind counters: calls, completion tokens and parse failures."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+    def record(self, kind, completion_tokens=0, items=1, parse_failed=False):
+        with self._lock:
+            m = self._kinds.setdefault(kind, {"calls": 0, "items": 0, "completion_tokens": 0, "parse_failures": 0})
+            m["calls"] += 1
+            m["items"] += items
+            m["completion_tokens"] += completion_tokens
+            m["parse_failures"] += int(parse_failed)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                kind: {
+                    **m,
+                    "tokens_per_item": m["completion_tokens"] / m["items"] if m["items"] else 0.0,
+                    "parse_failure_rate": m["parse_failures"] / m["calls"] if m["calls"] else 0.0
+                }
+                for kind, m in self._kinds.items()
+            }
+
+
+LLM_METRICS = LLMMetrics()
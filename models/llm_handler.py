@@ -6,6 +6,24 @@ import contextlib
 import warnings
 from llama_cpp import Llama
 from utils.config_loader import CONFIG
+from models.prefix_cache import get_prefix_cache
+from models.json_grammar import RECOMMENDATION_SCHEMA, build_grammar, max_tokens_for_schema, LLM_METRICS
+
+# Fixed system context shared by every recommendation prompt
+# We specifically ask for a float score between -1.0 and 1.0
+RECOMMENDATION_PREFIX = """
+    You are a senior financial analyst. Analyze the data snapshot below and provide an investment recommendation.
+    
+    Based strictly on the data, provide a score between -1.0 (Strong Sell) and 1.0 (Strong Buy).
+    
+    RESPONSE FORMAT (JSON ONLY):
+    {
+        "recommendation": "Buy" | "Hold" | "Sell",
+        "score": (float between -1.0 and 1.0),
+        "rationale": "A concise 3-sentence explanation citing specific metrics from the data."
+    }
+    """
+RECOMMENDATION_MAX_TOKENS = max_tokens_for_schema(RECOMMENDATION_SCHEMA)
 
 def load_llm():
     """
@@ -32,7 +50,7 @@ def load_llm():
         with suppress_stderr():
             llm = Llama(
                 model_path=model_path,
-                n_ctx=2048,
+                n_ctx=CONFIG["llm"].get("n_ctx", 2048),
                 n_threads=8,
                 n_gpu_layers=35,
                 verbose=False
@@ -52,11 +70,12 @@ def get_llm_recommendation(llm, ticker, info, fundamentals, final_score, news_se
         # Return neutral default if LLM fails (score, analysis)
         return 0.0, "LLM not loaded."
 
-    # 1. Construct the Context String
-    # Serializing the data so the LLM can "read" the math.
-    system_context = f"""
-    You are a senior financial analyst. Analyze the provided data for {company_name} ({ticker}) and provide an investment recommendation.
-    
+    # 1. Construct the Prompt
+    # The role and response format are fixed and come first, so their KV state is
+    # evaluated once and reused; only the per-ticker data snapshot is evaluated per call.
+    data_snapshot = f"""
+    COMPANY: {company_name} ({ticker})
+
     DATA SNAPSHOT:
     1. Fundamental Score (0 to 1): {fundamentals.get('E', 0):.2f} (Growth) | {fundamentals.get('V', 0):.2f} (Valuation)
     2. Macroeconomic Score (0 to 1): {macro_score:.2f} (Higher is better environment)
@@ -65,54 +84,35 @@ def get_llm_recommendation(llm, ticker, info, fundamentals, final_score, news_se
     Current Price: {info.get('currentPrice', 'N/A')}
     P/E Ratio: {info.get('trailingPE', 'N/A')}
     Sector: {info.get('sector', 'Unknown')}
-    """
-
-    # 2. The Prompt
-    # We specifically ask for a float score between -1.0 and 1.0
-    prompt = f"""
-    {system_context}
-    
-    Based strictly on the data above, provide a score between -1.0 (Strong Sell) and 1.0 (Strong Buy).
-    
-    RESPONSE FORMAT (JSON ONLY):
-    {{
-        "recommendation": "Buy" | "Hold" | "Sell",
-        "score": (float between -1.0 and 1.0),
-        "rationale": "A concise 3-sentence explanation citing specific metrics from the data."
-    }}
     
     JSON Response:
     """
 
-    # 3. Generate
+    # 2. Generate (grammar-constrained to RECOMMENDATION_SCHEMA, so no stop tokens or patching)
     try:
-        output = llm(
-            prompt, 
-            max_tokens=256, 
-            stop=["}", "\n\n"], 
+        output = get_prefix_cache(llm, RECOMMENDATION_PREFIX)(
+            data_snapshot, 
+            max_tokens=RECOMMENDATION_MAX_TOKENS, 
+            grammar=build_grammar(RECOMMENDATION_SCHEMA),
             echo=False,
             temperature=0.2 # Low temp for consistent formatting
         )
-        
-        # 4. Parse Response
-        text_output = output['choices'][0]['text'].strip()
-        
-        # Robustness: Ensure we close the JSON if the LLM cut off early
-        if not text_output.endswith("}"): 
-            text_output += "}"
-            
-        # Clean up potential preamble
-        start_idx = text_output.find("{")
-        if start_idx != -1:
-            text_output = text_output[start_idx:]
-            
-        result = json.loads(text_output)
-        
-        # Map result to (score, analysis_text)
-        score = float(result.get("score", 0.0))
-        analysis_text = result.get("rationale") or result.get("analysis") or result.get("recommendation") or "No analysis generated."
-        return score, analysis_text
-
     except Exception as e:
         print(f"LLM Generation Error: {e}")
-        return 0.0, "Error generating LLM insight."
\ No newline at end of file
+        return 0.0, "Error generating LLM insight."
+
+    # 3. Parse Response
+    tokens = output.get('usage', {}).get('completion_tokens', 0)
+    try:
+        result = json.loads(output['choices'][0]['text'])
+    except (json.JSONDecodeError, TypeError) as e:
+        print(f"LLM Parse Error: {e}")
+        LLM_METRICS.record("recommendation", tokens, parse_failed=True)
+        return 0.0, "Error generating LLM insight."
+
+    LLM_METRICS.record("recommendation", tokens)
+
+    # Map result to (score, analysis_text)
+    score = max(-1.0, min(1.0, float(result.get("score", 0.0))))
+    analysis_text = result.get("rationale") or result.get("recommendation") or "No analysis generated."
+    return score, analysis_text
@@ -1,9 +1,68 @@
 # models/mpnet_embedder.py
+import numpy as np
 from sentence_transformers import SentenceTransformer
+from utils.config_loader import CONFIG
 
-def get_embedder(model_path="sentence-transformers/all-mpnet-base-v2"):
+DEFAULT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+def get_embedder(model_path=DEFAULT_MODEL_NAME):
     """
     Load MPNet embedding model for news/article text embeddings.
     Downloads automatically from Hugging Face if not present locally.
     """
-    return SentenceTransformer(model_path)
+    embedder = SentenceTransformer(model_path)
+    # Keys the on-disk embedding store, so vectors from different models never mix
+    embedder.model_name = model_path
+    return embedder
+
+def token_lengths(embedder, texts):
+    """Token count of each text after the embedder's own truncation."""
+    encoded = embedder.tokenizer(
+        texts, add_special_tokens=True, truncation=True, max_length=embedder.max_seq_length
+    )
+    return np.array([len(ids) for ids in encoded["input_ids"]])
+
+def plan_batches(lengths, max_batch_tokens, max_batch_size):
+    """
+    Groups text indices into length buckets.
+    Texts are sorted by token length so each batch pads to a similar length, and
+    a batch is closed once (batch size x longest text) would exceed max_batch_tokens,
+    which bounds the padded activation memory of every forward pass.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    batches, current, longest = [], [], 0
+    for idx in order:
+        length = max(int(lengths[idx]), 1)
+        longest_if_added = max(longest, length)
+        if current and ((len(current) + 1) * longest_if_added > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, longest_if_added = [], length
+        current.append(int(idx))
+        longest = longest_if_added
+    if current:
+        batches.append(current)
+    return batches
+
+def iter_encode_batches(embedder, texts, max_batch_tokens=None, max_batch_size=None):
+    """Yields (original_indices, embeddings) one length bucket at a time."""
+    cfg = CONFIG.get("mpnet", {})
+    max_batch_tokens = max_batch_tokens or cfg.get("max_batch_tokens", 8192)
+    max_batch_size = max_batch_size or cfg.get("max_batch_size", 64)
+
+    for batch in plan_batches(token_lengths(embedder, texts), max_batch_tokens, max_batch_size):
+        vectors = embedder.encode(
+            [texts[i] for i in batch], batch_size=len(batch), show_progress_bar=False
+        )
+        yield batch, vectors
+
+def encode_batched(embedder, texts, max_batch_tokens=None, max_batch_size=None):
+    """Embeds texts in bounded, length-bucketed batches; rows follow the input order."""
+    if not texts:
+        return np.zeros((0, embedder.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    out = None
+    for batch, vectors in iter_encode_batches(embedder, texts, max_batch_tokens, max_batch_size):
+        if out is None:
+            out = np.empty((len(texts), vectors.shape[1]), dtype=vectors.dtype)
+        out[batch] = vectors
+    return out
@@ -0,0 +1,103 @@
+# models/prefix_cache.py
+import threading
+from utils.executors import LLM_EXECUTOR
+
+# One lock per Llama instance: the model (and its KV cache) is not thread-safe
+_LLM_LOCKS = {}
+_CACHES = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def llm_lock(llm):
+    with _REGISTRY_LOCK:
+        return _LLM_LOCKS.setdefault(id(llm), threading.RLock())
+
+
+def _common_prefix_len(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PrefixCache:
+    """
+    Evaluates a fixed prompt prefix once and reuses its KV state.
+    llama.cpp already skips tokens shared with the previous prompt, but any
+    other prompt run in between (e.g. a recommendation between two headlines)
+    evicts that prefix. This keeps a saved llama state of the evaluated prefix
+    and restores it whenever the model's context no longer starts with it, so
+    every call only pays prompt evaluation for its own suffix.
+    """
+
+    def __init__(self, llm, prefix):
+        self.llm = llm
+        self.prefix = prefix
+        self.prefix_tokens = llm.tokenize(prefix.encode("utf-8"), add_bos=True)
+        self.state = None
+        self.lock = llm_lock(llm)
+        self.stats = {"calls": 0, "prompt_tokens": 0, "evaluated_tokens": 0, "reused_tokens": 0, "restores": 0}
+
+    def _context_tokens(self):
+        """Tokens currently held in the KV cache (input_ids is the whole n_ctx buffer)."""
+        return list(self.llm.input_ids[:self.llm.n_tokens])
+
+    def _ensure_prefix(self):
+        n = len(self.prefix_tokens)
+        current = self._context_tokens()
+        if len(current) >= n and current[:n] == self.prefix_tokens:
+            return
+        if self.state is None:
+            self.llm.reset()
+            self.llm.eval(self.prefix_tokens)
+            self.state = self.llm.save_state()
+        else:
+            self.llm.load_state(self.state)
+            self.stats["restores"] += 1
+
+    def __call__(self, suffix, **kwargs):
+        """
+        Runs a completion for prefix + suffix; kwargs are passed to the Llama call.
+        The work is queued on the single LLM thread, whichever thread calls it.
+        """
+        return LLM_EXECUTOR.run(self._complete, suffix, **kwargs)
+
+    def _complete(self, suffix, **kwargs):
+        suffix_tokens = self.llm.tokenize(suffix.encode("utf-8"), add_bos=False)
+        tokens = self.prefix_tokens + suffix_tokens
+
+        with self.lock:
+            self._ensure_prefix()
+            reused = _common_prefix_len(self._context_tokens(), tokens)
+            response = self.llm(tokens, **kwargs)
+
+            self.stats["calls"] += 1
+            self.stats["prompt_tokens"] += len(tokens)
+            self.stats["reused_tokens"] += reused
+            self.stats["evaluated_tokens"] += len(tokens) - reused
+        return response
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+        calls = max(stats["calls"], 1)
+        return {
+            **stats,
+            "prefix_tokens": len(self.prefix_tokens),
+            "saved_tokens_per_call": stats["reused_tokens"] / calls,
+            "evaluated_tokens_per_call": stats["evaluated_tokens"] / calls
+        }
+
+
+def get_prefix_cache(llm, prefix):
+    """Returns the shared PrefixCache for this model and prefix."""
+    key = (id(llm), prefix)
+    with _REGISTRY_LOCK:
+        cache = _CACHES.get(key)
+    if cache is None:
+        cache = PrefixCache(llm, prefix)
+        with _REGISTRY_LOCK:
+            cache = _CACHES.setdefault(key, cache)
+    return cache
@@ -0,0 +1,63 @@
+# scripts/bench_mpnet_batching.py
+import sys
+import os
+import time
+import resource
+import argparse
+import multiprocessing as mp
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+
+def _run_config(args):
+    """Runs one configuration in a fresh process so peak RSS is not shared between runs."""
+    texts, mode, value = args
+    from models import mpnet_embedder
+
+    embedder = mpnet_embedder.get_embedder()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.perf_counter()
+    if mode == "naive":
+        embedder.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    elif mode == "batch_size":
+        mpnet_embedder.encode_batched(embedder, texts, max_batch_tokens=10**9, max_batch_size=value)
+    else:
+        mpnet_embedder.encode_batched(embedder, texts, max_batch_tokens=value, max_batch_size=10**6)
+    elapsed = time.perf_counter() - t0
+
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux
+    return elapsed, rss_before / 1024, rss_peak / 1024
+
+
+def run_benchmark(n_texts):
+    from data.phrasebank_loader import load_phrasebank
+
+    sentences = load_phrasebank()["sentence"].tolist()
+    # Mix short headlines with long, description-like texts, as in real news fetches
+    texts = []
+    for i in range(n_texts):
+        s = sentences[i % len(sentences)]
+        texts.append(s if i % 3 else ". ".join(sentences[i:i + 6]))
+
+    configs = [("naive", len(texts))]
+    configs += [("batch_size", b) for b in (8, 16, 32, 64, 128)]
+    configs += [("token_budget", t) for t in (2048, 4096, 8192, 16384)]
+
+    print(f"--- MPNet batching benchmark: {len(texts)} texts on CPU ---")
+    print(f"{'mode':>12} {'value':>7} {'seconds':>8} {'texts/s':>8} {'peak RSS MB':>12} {'delta MB':>9}")
+    ctx = mp.get_context("spawn")
+    for mode, value in configs:
+        with ctx.Pool(1) as pool:
+            elapsed, rss_before, rss_peak = pool.apply(_run_config, ((texts, mode, value),))
+        print(f"{mode:>12} {value:>7} {elapsed:>8.2f} {len(texts) / elapsed:>8.1f} "
+              f"{rss_peak:>12.0f} {rss_peak - rss_before:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput/RSS of MPNet embedding across batch settings.")
+    parser.add_argument("--n", type=int, default=600, help="Number of texts to embed")
+    args = parser.parse_args()
+    run_benchmark(args.n)
@@ -0,0 +1,61 @@
+# scripts/bench_prefix_cache.py
+import sys
+import os
+import time
+import argparse
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+from analysis.llm_sentiment import SINGLE_PROMPT_HEADER, article_text
+from data.phrasebank_loader import load_phrasebank
+from models import llm_handler
+from models.prefix_cache import PrefixCache
+
+
+def run_benchmark(n_articles):
+    llm = llm_handler.load_llm()
+    if llm is None:
+        print("❌ LLM not loaded; set LLAMA_MODEL_PATH.")
+        return
+
+    sentences = load_phrasebank()["sentence"].head(n_articles).tolist()
+    suffixes = [f"{article_text({'title': s})}\n\n### Response:\n" for s in sentences]
+    # A different prompt between articles, as happens when recommendations
+    # and headline scoring share the model
+    interleaved = "Summarize the state of the US economy in one word:"
+
+    # Baseline: full prompt evaluation for every article
+    baseline_tokens = 0
+    t0 = time.perf_counter()
+    for suffix in suffixes:
+        llm(interleaved, max_tokens=1)
+        tokens = llm.tokenize((SINGLE_PROMPT_HEADER + suffix).encode("utf-8"))
+        baseline_tokens += len(tokens)
+        llm(tokens, max_tokens=1, temperature=0.1)
+    baseline_time = time.perf_counter() - t0
+
+    # Prefix cache: the instruction block's KV state is restored instead of re-evaluated
+    cache = PrefixCache(llm, SINGLE_PROMPT_HEADER)
+    t0 = time.perf_counter()
+    for suffix in suffixes:
+        llm(interleaved, max_tokens=1)
+        cache(suffix, max_tokens=1, temperature=0.1)
+    cached_time = time.perf_counter() - t0
+
+    summary = cache.summary()
+    print(f"\n--- Prefix Cache Benchmark ({n_articles} articles) ---")
+    print(f"Prefix tokens:                     {summary['prefix_tokens']}")
+    print(f"Baseline prompt-eval tokens/art:   {baseline_tokens / n_articles:.1f}")
+    print(f"Cached prompt-eval tokens/art:     {summary['evaluated_tokens_per_call']:.1f}")
+    print(f"Prompt-eval tokens saved/art:      {summary['saved_tokens_per_call']:.1f}")
+    print(f"State restores:                    {summary['restores']}")
+    print(f"Baseline time:                     {baseline_time:.2f}s")
+    print(f"Cached time:                       {cached_time:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure prompt-eval tokens saved by the LLM prefix cache.")
+    parser.add_argument("--n", type=int, default=50, help="Number of headlines to score")
+    args = parser.parse_args()
+    run_benchmark(args.n)
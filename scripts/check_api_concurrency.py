@@ -0,0 +1,110 @@
+# scripts/check_api_concurrency.py
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+import requests
+
+
+def run_analyses(base_url, symbols, results):
+    """Fires one /analyze request per symbol, all at once."""
+    def one(symbol):
+        t0 = time.perf_counter()
+        try:
+            status = requests.get(f"{base_url}/analyze/{symbol}", timeout=900).status_code
+        except requests.RequestException as e:
+            status = str(e)
+        results.append((symbol, status, time.perf_counter() - t0))
+
+    threads = [threading.Thread(target=one, args=(s,)) for s in symbols]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def probe(base_url, path, stop, latencies, interval):
+    """Hits a cheap endpoint in a loop and records its latency."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            requests.get(f"{base_url}{path}", timeout=60)
+        except requests.RequestException:
+            pass
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(interval)
+
+
+def probe_for(base_url, paths, interval, seconds=None, until=None):
+    """Probes every path in parallel for `seconds` (or until `until` is set)."""
+    stop = until or threading.Event()
+    latencies = {p: [] for p in paths}
+    probes = [threading.Thread(target=probe, args=(base_url, p, stop, latencies[p], interval)) for p in paths]
+    for t in probes:
+        t.start()
+    if seconds is not None:
+        time.sleep(seconds)
+        stop.set()
+    return probes, latencies
+
+
+def p95_ms(values):
+    return float(np.percentile(np.array(values) * 1000, 95)) if values else float("nan")
+
+
+def check(base_url, symbols, paths, interval, max_extra_ms, baseline_seconds):
+    print(f"--- Concurrency check against {base_url} ---")
+
+    # These endpoints hit yfinance/FRED, so judge them against their own idle latency
+    print(f"Measuring idle latency of {', '.join(paths)} for {baseline_seconds:.0f}s...")
+    probes, idle = probe_for(base_url, paths, interval, seconds=baseline_seconds)
+    for t in probes:
+        t.join()
+
+    print(f"Running {len(symbols)} concurrent /analyze calls: {', '.join(symbols)}")
+    analyses = []
+    stop = threading.Event()
+    probes, loaded = probe_for(base_url, paths, interval, until=stop)
+
+    t0 = time.perf_counter()
+    for t in run_analyses(base_url, symbols, analyses):
+        t.join()
+    stop.set()
+    for t in probes:
+        t.join()
+
+    print(f"\nAnalyses finished in {time.perf_counter() - t0:.1f}s")
+    for symbol, status, elapsed in sorted(analyses):
+        print(f"  /analyze/{symbol:<6} status {status}  {elapsed:.1f}s")
+
+    ok = True
+    print(f"\n{'endpoint':<20} {'probes':>6} {'idle p95':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for path, values in loaded.items():
+        if not values:
+            print(f"{path:<20} no probe completed")
+            ok = False
+            continue
+        ms = np.array(values) * 1000
+        idle_p95, p95 = p95_ms(idle[path]), np.percentile(ms, 95)
+        print(f"{path:<20} {len(ms):>6} {idle_p95:>9.1f} {np.percentile(ms, 50):>8.1f} {p95:>8.1f} {ms.max():>8.1f}")
+        ok &= p95 <= idle_p95 + max_extra_ms
+
+    print("\n✅ Cheap endpoints stayed responsive." if ok else f"\n❌ p95 latency more than {max_extra_ms:.0f} ms above idle.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Checks that cheap API endpoints stay responsive while /analyze calls run. "
+                    "Start the server first: uvicorn api.api_main:app"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    # More analyses than the API has I/O workers, so a shared pool would starve the probes
+    parser.add_argument("--symbols", nargs="+", default=["AAPL", "MSFT", "NVDA", "JPM", "GOOG", "AMZN", "META", "TSLA", "XOM", "UNH"])
+    parser.add_argument("--paths", nargs="+", default=["/macro", "/fundamentals/AAPL"])
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between probes")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0, help="Idle probing before the load starts")
+    parser.add_argument("--max-extra-ms", type=float, default=250.0, help="Allowed p95 increase over idle")
+    args = parser.parse_args()
+
+    sys.exit(0 if check(args.url.rstrip("/"), args.symbols, args.paths, args.interval, args.max_extra_ms, args.baseline_seconds) else 1)
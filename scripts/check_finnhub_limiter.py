@@ -0,0 +1,156 @@
+# scripts/check_finnhub_limiter.py
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+import finnhub
+from data import news_handler
+from data.news_store import NewsStore
+from utils.rate_limiter import TokenBucket
+
+# By default the stub publishes ARTICLES_PER_DAY stories on every NEWS_EVERY-th day
+ARTICLES_PER_DAY = 3
+NEWS_EVERY = 5
+
+
+def articles_on(symbol, day):
+    """Number of stub stories for `symbol` on `day`; StubFinnhub.profiles overrides the default."""
+    profile = StubFinnhub.profiles.get(symbol)
+    if profile is not None:
+        return profile(day)
+    return ARTICLES_PER_DAY if day.toordinal() % NEWS_EVERY == 0 else 0
+
+
+def stub_article_count(symbol, first, last):
+    return sum(articles_on(symbol, first + timedelta(days=n)) for n in range((last - first).days + 1))
+
+
+class StubFinnhub(BaseHTTPRequestHandler):
+    """
+    Minimal /company-news endpoint with a sliding-window quota.
+    Requests over the quota get HTTP 429 with a Retry-After header, and
+    responses are cut to the newest `page_cap` articles like the real API.
+    """
+    quota = 60
+    window = 60.0
+    calls = deque()
+    lock = threading.Lock()
+    stats = {"ok": 0, "rejected": 0}
+    # Extra tickers tagged in every article's `related` field
+    co_tagged = []
+    # symbol -> f(day) giving the number of stories that day
+    profiles = {}
+    page_cap = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        now = time.monotonic()
+        with self.lock:
+            while self.calls and now - self.calls[0] >= self.window:
+                self.calls.popleft()
+            if len(self.calls) >= self.quota:
+                self.stats["rejected"] += 1
+                retry_after = self.window - (now - self.calls[0])
+                return self._send(429, {"error": "API limit reached."}, {"Retry-After": f"{retry_after:.2f}"})
+            self.calls.append(now)
+            self.stats["ok"] += 1
+
+        symbol = params["symbol"]
+        related = ",".join([symbol] + [t for t in self.co_tagged if t != symbol])
+        first = datetime.strptime(params["from"], "%Y-%m-%d").date()
+        last = datetime.strptime(params["to"], "%Y-%m-%d").date()
+        articles = []
+        for n in range((last - first).days, -1, -1):
+            day = first + timedelta(days=n)
+            count = articles_on(symbol, day)
+            for i in range(count - 1, -1, -1):
+                articles.append({
+                    "headline": f"{symbol} story {day} #{i}",
+                    "summary": f"News about {symbol}.",
+                    "related": related,
+                    "datetime": int(datetime(day.year, day.month, day.day).timestamp()) + 60 * i
+                })
+        self._send(200, articles[:self.page_cap])
+
+
+def run_check(tickers, quota, window, burst, page_cap):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFinnhub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubFinnhub.quota, StubFinnhub.window = quota, window
+    # A small page forces the pager into many requests per ticker, well past the quota
+    StubFinnhub.page_cap = news_handler.PAGE_CAP = page_cap
+
+    # Point the client at the stub and size the shared limiter to the stub's quota
+    finnhub.Client.API_URL = f"http://127.0.0.1:{server.server_port}"
+    news_handler.FINNHUB_LIMITER = limiter = TokenBucket(rate_per_minute=quota * 60.0 / window, burst=burst)
+    # Empty throwaway news store, so every chunk is really requested
+    news_handler.NEWS_STORE = NewsStore(os.path.join(tempfile.mkdtemp(), "news_store.db"))
+
+    print(f"--- Finnhub limiter check: {len(tickers)} tickers, quota {quota}/{window:.0f}s, burst {burst}, page cap {page_cap} ---")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(tickers)) as pool:
+        results = dict(zip(tickers, pool.map(lambda t: news_handler.fetch_company_news(t, t, api_key="stub"), tickers)))
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+
+    today = date.today()
+    calls = StubFinnhub.stats["ok"]
+    # Floor imposed by the quota alone (calls beyond the first window must wait)
+    floor = max(0.0, (calls - quota) / quota * window)
+
+    print(f"Wall time:          {elapsed:.2f}s (quota floor {floor:.2f}s, old fixed sleeps {calls * 0.5:.1f}s)")
+    print(f"Accepted calls:     {calls}")
+    print(f"429 responses:      {StubFinnhub.stats['rejected']}")
+    print(f"Limiter:            {limiter.stats()}")
+
+    ok = True
+    for ticker, articles in results.items():
+        expected = stub_article_count(ticker, today - timedelta(days=365), today)
+        complete = len(articles) == expected
+        ok &= complete
+        print(f"  {ticker:<6} {len(articles):>4} / {expected} articles {'✅' if complete else '❌'}")
+    # The check is only meaningful if the quota was actually hit and recovered from
+    throttled = StubFinnhub.stats["rejected"] > 0
+    if not throttled:
+        print("\n❌ No 429 was returned: the run did not exercise the limiter's backoff.")
+    print("\n✅ All chunks recovered." if ok else "\n❌ Articles were lost.")
+    return ok and throttled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs fetch_company_news against a local rate-limited Finnhub stub.")
+    parser.add_argument("--tickers", nargs="+", default=["AAPL", "MSFT", "NVDA", "AMZN", "META", "JPM"])
+    parser.add_argument("--quota", type=int, default=10, help="Stub calls allowed per window")
+    parser.add_argument("--window", type=float, default=2.0, help="Stub quota window in seconds")
+    # Larger than the stub quota, so the first burst is answered with 429s
+    parser.add_argument("--burst", type=int, default=20, help="Limiter burst size")
+    parser.add_argument("--page-cap", type=int, default=20, help="Articles per stub response")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_check(args.tickers, args.quota, args.window, args.burst, args.page_cap) else 1)
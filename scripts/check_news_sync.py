@@ -0,0 +1,78 @@
+# scripts/check_news_sync.py
+import sys
+import os
+import time
+import argparse
+import tempfile
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+import finnhub
+from data import news_handler
+from data.news_store import NewsStore
+from check_finnhub_limiter import StubFinnhub
+
+
+def calls_for(fn):
+    """Runs fn and returns (result, Finnhub calls it made)."""
+    before = StubFinnhub.stats["ok"]
+    result = fn()
+    return result, StubFinnhub.stats["ok"] - before
+
+
+def run_check(tickers):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFinnhub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubFinnhub.quota, StubFinnhub.window = 10_000, 60.0
+    StubFinnhub.co_tagged = list(tickers)
+    finnhub.Client.API_URL = f"http://127.0.0.1:{server.server_port}"
+
+    store = news_handler.NEWS_STORE = NewsStore(os.path.join(tempfile.mkdtemp(), "news_store.db"))
+    fetch = lambda t: news_handler.fetch_company_news(t, t, api_key="stub")
+    lead = tickers[0]
+    today = date.today()
+    ok = True
+
+    print(f"--- News store sync check ({', '.join(tickers)}) ---")
+
+    # 1. Cold: the whole year is requested
+    cold, calls = calls_for(lambda: fetch(lead))
+    print(f"Cold sync {lead}:      {calls:>3} calls, {len(cold)} articles")
+
+    # 2. Warm, within min_refresh_minutes: served from disk
+    warm, calls = calls_for(lambda: fetch(lead))
+    print(f"Warm read {lead}:      {calls:>3} calls, {len(warm)} articles")
+    ok &= calls == 0 and len(warm) == len(cold)
+
+    # 3. Refresh after the interval: only the days since the high-water mark
+    news_handler.MIN_REFRESH_SECONDS = 0
+    t0 = time.perf_counter()
+    fresh, calls = calls_for(lambda: fetch(lead))
+    print(f"Refresh {lead}:        {calls:>3} calls, {len(fresh)} articles ({time.perf_counter() - t0:.2f}s)")
+    ok &= calls == 1 and len(fresh) == len(cold)
+
+    # 4. Co-tagged tickers already have the lead's articles linked, stored once
+    for ticker in tickers[1:]:
+        shared = store.articles(ticker, today - timedelta(days=365), today)
+        _, calls = calls_for(lambda: fetch(ticker))
+        print(f"Sync {ticker:<6}         {calls:>3} calls, {len(shared)} articles already shared from {lead}")
+        ok &= len(shared) > 0
+
+    stats = store.stats()
+    print(f"\nStore: {stats['articles']} articles, {stats['links']} ticker links, {stats['tickers']} tickers")
+    server.shutdown()
+
+    print("\n✅ Incremental sync behaves as expected." if ok else "\n❌ Unexpected API calls or article counts.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks incremental news-store syncs against a local Finnhub stub.")
+    parser.add_argument("--tickers", nargs="+", default=["AAPL", "MSFT"])
+    args = parser.parse_args()
+
+    sys.exit(0 if run_check([t.upper() for t in args.tickers]) else 1)
@@ -0,0 +1,57 @@
+# scripts/compact_embeddings.py
+import sys
+import os
+import argparse
+from datetime import date, timedelta
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+from data.embedding_store import get_embedding_store, text_hash
+from data.news_store import NEWS_STORE
+from data.semantic_cache import semantic_cache_enabled, get_semantic_cache
+from data.sentiment_cache import SENTIMENT_CACHE
+from models.mpnet_embedder import DEFAULT_MODEL_NAME
+
+
+def keep_hashes(model_name, days):
+    """
+    Embeddings still worth keeping:
+    - every article in the news store published within the last `days` days
+    - the sentiment-cache entries the semantic cache warms its index from
+    """
+    keep = {text_hash(t) for t in NEWS_STORE.article_texts(date.today() - timedelta(days=days))}
+    if semantic_cache_enabled():
+        # Sentiment-cache ids are the hex MD5 of the same text as the store's hashes
+        warm_set = SENTIMENT_CACHE.recent(get_semantic_cache(model_name).max_entries)
+        keep.update(bytes.fromhex(cid) for cid, _ in warm_set)
+    return keep
+
+
+def run(model_name, days, dry_run):
+    store = get_embedding_store(model_name)
+    before = store.rows
+    size = os.path.getsize(store.vectors_file) if os.path.exists(store.vectors_file) else 0
+    keep = keep_hashes(model_name, days)
+    kept = len(keep & set(store.index))
+
+    print(f"--- Embedding store compaction: {model_name} ---")
+    print(f"Rows stored:        {before} ({size / 1e6:.1f} MB)")
+    print(f"Rows to keep:       {kept} (news of the last {days} days{', semantic cache warm set' if semantic_cache_enabled() else ''})")
+    if dry_run:
+        print("Dry run: nothing written.")
+        return
+
+    after = store.compact(keep)
+    new_size = os.path.getsize(store.vectors_file) if os.path.exists(store.vectors_file) else 0
+    print(f"Rows after:         {after} ({new_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drops embeddings of texts that are no longer needed from the embedding store.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Embedder model whose store is compacted")
+    parser.add_argument("--days", type=int, default=400, help="Keep embeddings of news published within this many days")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be kept")
+    args = parser.parse_args()
+
+    run(args.model, args.days, args.dry_run)
@@ -0,0 +1,72 @@
+# scripts/eval_cascade.py
+import sys
+import os
+import argparse
+import numpy as np
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+from analysis.mpnet_sentiment import mpnet_analyzer
+from analysis.llm_sentiment import LLMSentimentAnalyzer
+from analysis.cascade import mpnet_uncertainty
+from data.news_handler import fetch_company_news
+from data.sentiment_cache import get_many_cached_sentiments, update_cache
+from models import clf_handler, mpnet_embedder, llm_handler
+
+
+def evaluate(ticker, company_name, max_articles, entropy_grid, margin_grid):
+    print("--- Loading Models ---")
+    clf = clf_handler.load_trained_clf()
+    embedder = mpnet_embedder.get_embedder()
+    llm_analyzer = LLMSentimentAnalyzer(llm_handler.load_llm())
+
+    news = fetch_company_news(ticker, company_name, max_articles=max_articles)
+    if not news:
+        print("No news found.")
+        return
+    print(f"Scoring {len(news)} articles with MPNet and LLaMA (full, cached where possible)...")
+
+    label_map = {0: "Negative", 1: "Neutral", 2: "Positive"}
+    mpnet_results = mpnet_analyzer(news, clf, embedder, label_map)
+    mpnet_scores = np.array([r["sentiment_score"] for r in mpnet_results])
+
+    # Full LLM scoring is the reference
+    text_keys = [f"{a.get('title','')}. {a.get('description','')}" for a in news]
+    llm_scores = np.empty(len(news))
+    for i, (article, key, cached) in enumerate(zip(news, text_keys, get_many_cached_sentiments(text_keys))):
+        if cached is None:
+            res = llm_analyzer.analyze_single_article(article)
+            if not res.get("error"):
+                update_cache(key, res)
+            cached = {"score": res["sentiment_score"], "confidence": res.get("confidence", 1.0)}
+        llm_scores[i] = cached["score"] * cached["confidence"]
+
+    entropy, margin = mpnet_uncertainty([r["raw_probabilities"] for r in mpnet_results])
+    full_score = llm_scores.mean()
+
+    print(f"\nFull LLM score: {full_score:.4f}\n")
+    print(f"{'max_entropy':>11} {'min_margin':>10} {'escalated':>9} {'rate':>6} {'cascade':>8} {'diff':>7}")
+    for max_entropy in entropy_grid:
+        for min_margin in margin_grid:
+            escalate = (entropy > max_entropy) | (margin < min_margin)
+            cascade_scores = np.where(escalate, llm_scores, mpnet_scores)
+            cascade_score = cascade_scores.mean()
+            print(f"{max_entropy:>11.2f} {min_margin:>10.2f} {escalate.sum():>9d} {escalate.mean():>6.1%} "
+                  f"{cascade_score:>8.4f} {cascade_score - full_score:>+7.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cascade LLM gating against full LLM scoring.")
+    parser.add_argument("ticker")
+    parser.add_argument("company_name")
+    parser.add_argument("--max-articles", type=int, default=200)
+    args = parser.parse_args()
+
+    evaluate(
+        args.ticker.upper(),
+        args.company_name,
+        args.max_articles,
+        entropy_grid=[0.4, 0.5, 0.6, 0.7, 0.8],
+        margin_grid=[0.1, 0.2, 0.3, 0.4]
+    )
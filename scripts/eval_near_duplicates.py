@@ -0,0 +1,79 @@
+# scripts/eval_near_duplicates.py
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+from data.phrasebank_loader import load_phrasebank
+from data.near_duplicates import MinHashLSH, LSH
+
+PREFIXES = ["", "UPDATE 1-", "Reuters - ", "BRIEF-", "(Bloomberg) "]
+SUFFIXES = ["", " - report", " shares react", " (updated)"]
+
+
+def rewrite(sentence, rng):
+    """A syndicated-style copy: wire prefix/suffix and one word dropped or changed."""
+    words = sentence.split()
+    if len(words) > 6:
+        i = rng.integers(1, len(words) - 1)
+        if rng.random() < 0.5:
+            del words[i]
+        else:
+            words[i] = rng.choice(["sharply", "reportedly", "also", "now", "further"])
+    return f"{rng.choice(PREFIXES)}{' '.join(words)}{rng.choice(SUFFIXES)}"
+
+
+def build_corpus(n_stories, max_copies, seed):
+    """Phrasebank sentences as stories, each with 0..max_copies rewritten copies."""
+    rng = np.random.default_rng(seed)
+    sentences = load_phrasebank()["sentence"].drop_duplicates().sample(n_stories, random_state=seed).tolist()
+    texts, story = [], []
+    for s_id, sentence in enumerate(sentences):
+        texts.append(sentence)
+        story.append(s_id)
+        for _ in range(rng.integers(0, max_copies + 1)):
+            texts.append(rewrite(sentence, rng))
+            story.append(s_id)
+    return texts, np.array(story)
+
+
+def pair_scores(labels, story):
+    """Pairwise precision/recall of predicted clusters against the true stories."""
+    labels = np.asarray(labels)
+    same_pred = labels[:, None] == labels[None, :]
+    same_true = story[:, None] == story[None, :]
+    upper = np.triu(np.ones_like(same_pred, dtype=bool), k=1)
+    tp = (same_pred & same_true & upper).sum()
+    precision = tp / max((same_pred & upper).sum(), 1)
+    recall = tp / max((same_true & upper).sum(), 1)
+    return precision, recall
+
+
+def run_eval(n_stories, max_copies, thresholds, seed):
+    texts, story = build_corpus(n_stories, max_copies, seed)
+    print(f"--- Near-duplicate evaluation: {len(texts)} articles, {n_stories} stories ---")
+    print(f"{'threshold':>9} {'clusters':>9} {'precision':>10} {'recall':>8} {'model calls saved':>18} {'time ms':>8}")
+
+    for threshold in thresholds:
+        lsh = MinHashLSH(num_perm=LSH.num_perm, bands=LSH.bands, threshold=threshold, shingle_size=LSH.shingle_size)
+        t0 = time.perf_counter()
+        labels = lsh.cluster(texts)
+        elapsed = (time.perf_counter() - t0) * 1000
+        precision, recall = pair_scores(labels, story)
+        clusters = len(set(labels))
+        print(f"{threshold:>9.2f} {clusters:>9} {precision:>10.3f} {recall:>8.3f} {1 - clusters / len(texts):>17.1%} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures MinHash/LSH near-duplicate clustering on rewritten phrasebank sentences.")
+    parser.add_argument("--stories", type=int, default=500)
+    parser.add_argument("--max-copies", type=int, default=3)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_eval(args.stories, args.max_copies, args.thresholds, args.seed)
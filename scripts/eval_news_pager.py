@@ -0,0 +1,92 @@
+# scripts/eval_news_pager.py
+import sys
+import os
+import argparse
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+import finnhub
+from data import news_handler
+from utils.rate_limiter import TokenBucket
+from check_finnhub_limiter import StubFinnhub, articles_on
+
+# Synthetic news flow per ticker (stories per day)
+PROFILES = {
+    "QUIET": lambda day: 1 if day.toordinal() % 9 == 0 else 0,
+    "STEADY": lambda day: 3,
+    # Busy name with an earnings/news burst that overflows a 30-day window
+    "BUSY": lambda day: 40 if day.month == (date.today().month % 12) + 1 else 6,
+}
+
+
+def fixed_chunks(client, ticker, start, end, days=30):
+    """The previous strategy: consecutive 30-day windows, whatever the ticker's news flow."""
+    articles, calls = [], 0
+    current = start
+    while current <= end:
+        last = min(current + timedelta(days=days - 1), end)
+        chunk = news_handler.fetch_chunk(client, ticker, current.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d"))
+        calls += 1
+        articles.extend(chunk or [])
+        current = last + timedelta(days=1)
+    return articles, calls
+
+
+def recoverable(ticker, start, end, page_cap):
+    """Articles any pager can get: a single day beyond the cap is cut by the API itself."""
+    return sum(min(articles_on(ticker, start + timedelta(days=n)), page_cap) for n in range((end - start).days + 1))
+
+
+def unique_count(articles):
+    return len({(a["headline"], a["datetime"]) for a in articles})
+
+
+def run_eval(page_cap):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFinnhub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubFinnhub.quota, StubFinnhub.window = 10_000, 60.0
+    StubFinnhub.profiles, StubFinnhub.page_cap = PROFILES, page_cap
+    finnhub.Client.API_URL = f"http://127.0.0.1:{server.server_port}"
+    news_handler.FINNHUB_LIMITER = TokenBucket(rate_per_minute=60_000, burst=1000)
+    news_handler.PAGE_CAP = page_cap
+
+    client = finnhub.Client("stub")
+    end = date.today()
+    start = end - timedelta(days=365)
+
+    print(f"--- News pager evaluation (page cap {page_cap}, one year per ticker) ---")
+    print(f"{'ticker':<8} {'truth':>6} | {'fixed calls':>11} {'found':>6} | {'cold calls':>10} {'found':>6} | {'warm calls':>10} {'found':>6}")
+    ok = True
+    for ticker in PROFILES:
+        truth = recoverable(ticker, start, end, page_cap)
+        fixed, fixed_calls = fixed_chunks(client, ticker, start, end)
+
+        # Cold: no density known, the whole range is the probe
+        cold, _, cold_stats = news_handler.fetch_window(client, ticker, start, end)
+        # Warm: density known from a previous sync, windows are planned up front
+        warm, _, warm_stats = news_handler.fetch_window(client, ticker, start, end, density=truth / 366)
+
+        ok &= unique_count(cold) == truth and unique_count(warm) == truth
+        # Knowing the density must never cost more calls than probing
+        ok &= warm_stats["calls"] <= cold_stats["calls"]
+        print(
+            f"{ticker:<8} {truth:>6} | {fixed_calls:>11} {unique_count(fixed):>6} | "
+            f"{cold_stats['calls']:>10} {unique_count(cold):>6} | {warm_stats['calls']:>10} {unique_count(warm):>6}"
+        )
+
+    server.shutdown()
+    print("\n✅ Adaptive pager recovered every article; warm never used more calls than cold."
+          if ok else "\n❌ Adaptive pager missed articles or warm used more calls than cold.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares fixed 30-day news chunks with the adaptive pager on a Finnhub stub.")
+    parser.add_argument("--page-cap", type=int, default=100, help="Articles per stub response")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_eval(args.page_cap) else 1)
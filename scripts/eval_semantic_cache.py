@@ -0,0 +1,69 @@
+# scripts/eval_semantic_cache.py
+import sys
+import os
+import argparse
+import numpy as np
+
+# Ensure the project root is in the python path
+sys.path.append(os.getcwd())
+
+from analysis.mpnet_sentiment import article_embeddings
+from analysis.llm_sentiment import LLMSentimentAnalyzer
+from data.news_handler import fetch_company_news
+from data.sentiment_cache import get_many_cached_sentiments, update_cache
+from models import mpnet_embedder, llm_handler
+
+
+def evaluate(ticker, company_name, max_articles, thresholds):
+    print("--- Loading Models ---")
+    embedder = mpnet_embedder.get_embedder()
+    llm_analyzer = LLMSentimentAnalyzer(llm_handler.load_llm())
+
+    news = fetch_company_news(ticker, company_name, max_articles=max_articles)
+    if not news:
+        print("No news found.")
+        return
+    news = sorted(news, key=lambda a: a.get("datetime", 0))
+    print(f"Scoring {len(news)} articles with LLaMA (cached where possible)...")
+
+    # Full LLM scoring is the reference
+    text_keys = [f"{a.get('title','')}. {a.get('description','')}" for a in news]
+    llm_scores, labels = np.empty(len(news)), []
+    for i, (article, key, cached) in enumerate(zip(news, text_keys, get_many_cached_sentiments(text_keys))):
+        if cached is None:
+            res = llm_analyzer.analyze_single_article(article)
+            if not res.get("error"):
+                update_cache(key, res)
+            cached = {"score": res["sentiment_score"], "confidence": res.get("confidence", 1.0), "label": res.get("sentiment_label", "Neutral")}
+        llm_scores[i] = cached["score"] * cached["confidence"]
+        labels.append(cached["label"])
+    labels = np.array(labels)
+
+    # Articles arrive in time order: each one can only match the ones before it
+    vectors = np.asarray(article_embeddings(text_keys, embedder), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    sims = vectors @ vectors.T
+    sims[np.triu_indices(len(news))] = -1.0
+    best = sims.argmax(axis=1)
+    best_sim = sims[np.arange(len(news)), best]
+
+    print(f"\n{'threshold':>9} {'hits':>6} {'hit rate':>9} {'label agree':>12} {'mean |diff|':>12} {'score':>8} {'diff':>7}")
+    full_score = llm_scores.mean()
+    for threshold in thresholds:
+        hit = best_sim >= threshold
+        reused = np.where(hit, llm_scores[best], llm_scores)
+        agree = (labels[best][hit] == labels[hit]).mean() if hit.any() else float("nan")
+        abs_diff = np.abs(llm_scores[best][hit] - llm_scores[hit]).mean() if hit.any() else float("nan")
+        print(f"{threshold:>9.2f} {hit.sum():>6d} {hit.mean():>9.1%} {agree:>12.1%} {abs_diff:>12.4f} "
+              f"{reused.mean():>8.4f} {reused.mean() - full_score:>+7.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures semantic cache hit rate and agreement with fresh LLM scores.")
+    parser.add_argument("ticker")
+    parser.add_argument("company_name")
+    parser.add_argument("--max-articles", type=int, default=200)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.85, 0.9, 0.93, 0.95, 0.97, 0.99])
+    args = parser.parse_args()
+
+    evaluate(args.ticker.upper(), args.company_name, args.max_articles, args.thresholds)
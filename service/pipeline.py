@@ -0,0 +1,84 @@
+# service/pipeline.py
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class PipelineExecutor:
+    """
+    Small dependency-aware executor for the analysis pipeline.
+    Each stage is started on a thread pool as soon as all of its dependencies
+    have finished, and receives their results as keyword arguments.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add_stage(self, name, fn, deps=()):
+        """
+        Registers a stage. `fn` is called with one keyword argument per
+        dependency, named after the dependency stage.
+        """
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = {"fn": fn, "deps": tuple(deps)}
+        return self
+
+    def run(self):
+        """
+        Executes all stages and returns (results, timings).
+        Timings are seconds relative to the start of the run.
+        The first stage failure cancels everything not yet started and is re-raised.
+        """
+        results = {}
+        timings = {}
+        t0 = time.perf_counter()
+
+        def _timed(name, fn, kwargs):
+            start = time.perf_counter() - t0
+            try:
+                return fn(**kwargs)
+            finally:
+                end = time.perf_counter() - t0
+                timings[name] = {"start": round(start, 4), "end": round(end, 4), "duration": round(end - start, 4)}
+
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                # Launch every stage whose dependencies are satisfied
+                for name in [n for n, s in pending.items() if all(d in results for d in s["deps"])]:
+                    stage = pending.pop(name)
+                    kwargs = {d: results[d] for d in stage["deps"]}
+                    running[pool.submit(_timed, name, stage["fn"], kwargs)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        results[name] = fut.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        timings["_total"] = round(time.perf_counter() - t0, 4)
+        return results, timings
+
+    def critical_path(self, timings):
+        """
+        Walks back from the last stage to finish, always following the
+        dependency that finished latest. Returns stage names in execution order.
+        """
+        stage_timings = {n: t for n, t in timings.items() if n in self.stages}
+        if not stage_timings:
+            return []
+
+        current = max(stage_timings, key=lambda n: stage_timings[n]["end"])
+        path = [current]
+        while self.stages[current]["deps"]:
+            current = max(self.stages[current]["deps"], key=lambda d: stage_timings[d]["end"])
+            path.append(current)
+        return list(reversed(path))
@@ -1,12 +1,23 @@
+import time
+import threading
 import yfinance as yf
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List
 from analysis.fundamentals import get_fundamentals
-from analysis.score_calculator import get_hybrid_sentiment, calculate_final_score, get_recommendation_label, calculate_fundamental_score
+from analysis.macro import get_macro_info, calc_macro_score
+from analysis.score_calculator import (
+    get_hybrid_sentiment, calculate_final_score, get_recommendation_label, calculate_fundamental_score,
+    calculate_final_scores, get_recommendation_labels, component_matrix
+)
 from data.news_handler import fetch_company_news
 from data.yahoo_handler import get_stock_info
+from data.analysis_context import AnalysisContext
+from data.reference_data import sector_tickers_map
+from data.sector_cache import SECTOR_CACHE
 from utils.helpers import extract_company_name
 from models import llm_handler
 from data.training_manager import log_training_example
+from service.pipeline import PipelineExecutor
 
 class StockAnalysisService:
     """
@@ -24,6 +35,8 @@ class StockAnalysisService:
         self.llm = self.models.get("llm")
         self.clf = self.models.get("clf")
         self.embedder = self.models.get("embedder")
+        # Screen workers may all reach score_news first; load the models once
+        self._model_lock = threading.Lock()
         
         if self.llm is None:
             self.llm = llm_handler.load_llm()
@@ -32,22 +45,31 @@ class StockAnalysisService:
     # HELPER METHODS (API Endpoint Support)
     # ----------------------------------------------------------------------
 
-    def get_fundamentals_only(self, ticker: str) -> Dict[str, float]:
+    def get_fundamentals_only(self, ticker: str, ctx: AnalysisContext = None) -> Dict[str, float]:
         """Fetches and returns the calculated fundamental metrics only."""
-        return get_fundamentals(ticker.upper())
+        return get_fundamentals(ticker.upper(), ctx=ctx)
 
-    def get_sentiment_result(self, ticker: str) -> Dict[str, Any]:
+    def get_macro_data(self) -> Dict[str, Any]:
+        """Fetches macro indicators from FRED and the derived macro score."""
+        indicators = get_macro_info()
+        return {"indicators": indicators, "score": float(calc_macro_score(indicators))}
+
+    def get_sentiment_result(self, ticker: str, ctx: AnalysisContext = None) -> Dict[str, Any]:
         """Calculates and returns the hybrid news sentiment result using injected models."""
-        
-        if self.clf is None or self.embedder is None:
-            from models import clf_handler, mpnet_embedder
-            self.clf = clf_handler.load_trained_clf()
-            self.embedder = mpnet_embedder.get_embedder()
-        
-        info, _ = get_stock_info(ticker.upper())
+        info, _ = get_stock_info(ticker.upper(), ctx=ctx)
         company_name = extract_company_name(info.get("longName", ticker))
         raw_news = fetch_company_news(ticker, company_name)
-        
+        return self.score_news(ticker, raw_news)
+
+    def score_news(self, ticker: str, raw_news: list) -> Dict[str, Any]:
+        """Runs the hybrid sentiment models over already-fetched news."""
+        if self.clf is None or self.embedder is None:
+            with self._model_lock:
+                if self.clf is None or self.embedder is None:
+                    from models import clf_handler, mpnet_embedder
+                    self.clf = clf_handler.load_trained_clf()
+                    self.embedder = mpnet_embedder.get_embedder()
+
         if not raw_news:
              return {
                 "mpnet_score": 0.0,
@@ -73,15 +95,12 @@ class StockAnalysisService:
 
     def get_score_data(self, ticker: str) -> Dict[str, Any]:
         """Calculates and returns the final score and components, excluding the LLM."""
-        fundamentals_dict = self.get_fundamentals_only(ticker)
+        ctx = AnalysisContext()
+        fundamentals_dict = self.get_fundamentals_only(ticker, ctx)
         macro_data = self.get_macro_data()
-        sentiment_result = self.get_sentiment_result(ticker)
+        sentiment_result = self.get_sentiment_result(ticker, ctx)
         
-        final_score = calculate_final_score(
-            fundamentals_dict, 
-            sentiment_result["combined_score"], 
-            macro_data["score"]
-        )
+        final_score = calculate_final_score(fundamentals_dict, sentiment_result["combined_score"])
         
         fundamental_score = calculate_fundamental_score(fundamentals_dict)
         
@@ -97,36 +116,164 @@ class StockAnalysisService:
             }
         }
         
+    # ----------------------------------------------------------------------
+    # UNIVERSE SCREENING
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def screen_universe(sector: str = None, tickers: List[str] = None) -> List[str]:
+        """Resolves a screen request to a ticker list (explicit tickers win over a sector)."""
+        if tickers:
+            return list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        if sector not in sector_tickers_map:
+            raise ValueError(f"Unknown sector '{sector}'. Known sectors: {', '.join(sector_tickers_map)}")
+        return list(sector_tickers_map[sector])
+
+    def _screen_ticker(self, ticker: str, with_sentiment: bool) -> Dict[str, Any]:
+        """Fundamentals (+ news sentiment) of one screen member; no LLM recommendation."""
+        ctx = AnalysisContext()
+        fundamentals_dict = self.get_fundamentals_only(ticker, ctx)
+        sentiment = self.get_sentiment_result(ticker, ctx) if with_sentiment else None
+        return {
+            "ticker": ticker,
+            "sector": fundamentals_dict.get("sector"),
+            "fundamentals": fundamentals_dict,
+            "sentiment_score": float(sentiment["combined_score"]) if sentiment else 0.0,
+            "num_articles": sentiment["num_articles"] if sentiment else 0
+        }
+
+    def screen(self, sector: str = None, tickers: List[str] = None, max_concurrency: int = 4,
+               with_sentiment: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Scores a universe (a reference_data sector or a ticker list) and yields
+        one record per ticker as soon as it completes, with its rank among the
+        tickers finished so far, followed by a final summary with the full ranking.
+        - Sector peers and the sector ETF are warmed once up front, so members
+          share them through the sector cache instead of refetching.
+        - At most max_concurrency tickers are analyzed at the same time.
+        """
+        universe = self.screen_universe(sector, tickers)
+        start = time.perf_counter()
+
+        # 1. Shared sector-level data
+        if sector in sector_tickers_map:
+            SECTOR_CACHE.get_peer_pes(sector)
+            SECTOR_CACHE.get_etf_history(sector, period="1y")
+
+        # 2. Bounded fan-out; rows stream back in completion order
+        done = []
+        pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="screen")
+        try:
+            futures = {pool.submit(self._screen_ticker, t, with_sentiment): t for t in universe}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    yield {"type": "error", "ticker": ticker, "error": str(e)}
+                    continue
+
+                row["final_score"] = float(calculate_final_score(row["fundamentals"], row["sentiment_score"]))
+                row["recommendation"] = get_recommendation_label(row["final_score"])
+                done.append(row)
+                rank = 1 + sum(r["final_score"] > row["final_score"] for r in done)
+                yield {
+                    "type": "result",
+                    **row,
+                    "rank": rank,
+                    "completed": len(done),
+                    "total": len(universe)
+                }
+        except GeneratorExit:
+            # Consumer went away (e.g. client disconnect): drop the tickers not started yet
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+        # 3. Final ranking, scored in one vectorized pass
+        ranking = []
+        if done:
+            scores = calculate_final_scores(
+                component_matrix([r["fundamentals"] for r in done]), [r["sentiment_score"] for r in done]
+            )
+            labels = get_recommendation_labels(scores)
+            order = sorted(range(len(done)), key=lambda i: -scores[i])
+            ranking = [
+                {"rank": n + 1, "ticker": done[i]["ticker"], "final_score": float(scores[i]), "recommendation": str(labels[i])}
+                for n, i in enumerate(order)
+            ]
+        yield {
+            "type": "summary",
+            "sector": sector,
+            "total": len(universe),
+            "scored": len(done),
+            "failed": len(universe) - len(done),
+            "elapsed": time.perf_counter() - start,
+            "ranking": ranking
+        }
+
     # ----------------------------------------------------------------------
     # MAIN PIPELINE METHOD
     # ----------------------------------------------------------------------
 
+    def _safe_macro_data(self) -> Dict[str, Any]:
+        """Macro data for the pipeline; falls back to a neutral score if FRED is unavailable."""
+        try:
+            return self.get_macro_data()
+        except Exception as e:
+            print(f"[Macro Error] {e}")
+            return {"indicators": {}, "score": 0.5}
+
     def analyze_stock(self, ticker: str) -> Dict[str, Any]:
         """
         Performs a full analysis and generates all scores/recommendations.
+        Independent fetches (info, fundamentals, macro) run concurrently and
+        sentiment scoring starts as soon as the news stage returns.
         """
         ticker = ticker.upper()
+        # One context per request: info/history are fetched once and shared by all stages
+        ctx = AnalysisContext()
 
-        info, _ = get_stock_info(ticker)
+        pipeline = PipelineExecutor(max_workers=4)
+        pipeline.add_stage("info", lambda: get_stock_info(ticker, ctx=ctx)[0])
+        pipeline.add_stage("fundamentals", lambda: self.get_fundamentals_only(ticker, ctx))
+        pipeline.add_stage("macro", self._safe_macro_data)
+        pipeline.add_stage(
+            "news",
+            lambda info: fetch_company_news(ticker, extract_company_name(info.get("longName", ticker))),
+            deps=["info"]
+        )
+        pipeline.add_stage("sentiment", lambda news: self.score_news(ticker, news), deps=["news"])
+        pipeline.add_stage(
+            "final_score",
+            # FIX 3: Get final score (single float)
+            lambda fundamentals, sentiment: calculate_final_score(fundamentals, sentiment["combined_score"]),
+            deps=["fundamentals", "sentiment"]
+        )
+        pipeline.add_stage(
+            "llm_recommendation",
+            lambda info, fundamentals, sentiment, macro, final_score: llm_handler.get_llm_recommendation(
+                self.llm, ticker, info, fundamentals, final_score, sentiment["combined_score"],
+                macro_score=macro["score"],
+                company_name=extract_company_name(info.get("longName", ticker))
+            ),
+            deps=["info", "fundamentals", "sentiment", "macro", "final_score"]
+        )
+
+        results, timings = pipeline.run()
+
+        info = results["info"]
         company_name = extract_company_name(info.get("longName", ticker))
         sector = info.get("sector", "Unknown")
+        fundamentals_dict = results["fundamentals"]
+        sentiment_data = results["sentiment"]
+        macro_data = results["macro"]
+        final_score = results["final_score"]
+        llm_score, llm_analysis = results["llm_recommendation"]
 
-        fundamentals_dict = self.get_fundamentals_only(ticker)
-        sentiment_data = self.get_sentiment_result(ticker)
-        
         news_sentiment = sentiment_data["combined_score"]
         raw_news = sentiment_data["raw_news"]
 
-        # FIX 3: Get final score (single float)
-        final_score = calculate_final_score(
-            fundamentals_dict, 
-            news_sentiment, 
-        )
-
-        llm_score, llm_analysis = llm_handler.get_llm_recommendation(
-            self.llm, ticker, info, fundamentals_dict, final_score, news_sentiment, company_name
-        )
-
         # FIX 4: Get fundamental score using specific function
         f_score_val = calculate_fundamental_score(fundamentals_dict)
 
@@ -136,7 +283,8 @@ class StockAnalysisService:
             fund_score=f_score_val,
             mpnet_score=sentiment_data["mpnet_score"],
             llm_score=sentiment_data.get("llm_score", 0), # Use safer .get()
-            current_price=info.get("currentPrice", 0)
+            current_price=info.get("currentPrice", 0),
+            components=fundamentals_dict
         )
 
         final_combined_score = 0.8 * final_score + 0.2 * llm_score
@@ -154,6 +302,7 @@ class StockAnalysisService:
             
             "fundamentals": fundamentals_dict,
             "sentiment": sentiment_data,
+            "macro": macro_data,
             
             "llm_score": llm_score,
 
@@ -165,5 +314,11 @@ class StockAnalysisService:
                 "current_price": info.get("currentPrice"),
                 "market_cap": info.get("marketCap"),
                 "pe_ratio": info.get("trailingPE")
+            },
+            "timings": {
+                "stages": {n: t for n, t in timings.items() if n != "_total"},
+                "total": timings["_total"],
+                "critical_path": pipeline.critical_path(timings),
+                "yahoo_fetches": ctx.fetch_count
             }
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,87 @@
+# utils/executors.py
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.config_loader import CONFIG
+
+
+class LLMQueueFull(RuntimeError):
+    """Raised when too many LLM jobs are already waiting for the model."""
+
+
+class LLMExecutor:
+    """
+    Single-slot executor for the non-thread-safe Llama instance.
+    - All model work runs on one dedicated thread, in submission order.
+    - At most max_pending jobs may wait; further submissions fail fast with
+      LLMQueueFull instead of piling up behind a long generation.
+    - Calls made from the LLM thread itself run inline, so nested model
+      calls cannot deadlock on the single slot.
+    """
+
+    def __init__(self, max_pending=64):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread_id = None
+
+    def _wrap(self, fn, args, kwargs):
+        self._thread_id = threading.get_ident()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise LLMQueueFull(f"LLM queue is full ({self._max_pending} jobs waiting)")
+        with self._lock:
+            self._pending += 1
+        return self._pool.submit(self._wrap, fn, args, kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """Runs fn on the LLM thread and waits for its result."""
+        if threading.get_ident() == self._thread_id:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+
+_exec_cfg = CONFIG.get("executors", {})
+
+# Short network-bound service calls (yfinance, Finnhub, FRED) from the API
+IO_POOL = ThreadPoolExecutor(max_workers=_exec_cfg.get("io_workers", 8), thread_name_prefix="api-io")
+# Whole pipelines (/analyze, /screen, /sentiment, /score) hold their worker for
+# the full run, including the wait for the LLM; kept apart so they can never
+# take every I/O worker from the cheap endpoints
+ANALYSIS_POOL = ThreadPoolExecutor(max_workers=_exec_cfg.get("analysis_workers", 4), thread_name_prefix="api-analysis")
+LLM_EXECUTOR = LLMExecutor(max_pending=_exec_cfg.get("llm_max_pending", 64))
+
+
+async def run_io(fn, *args, **kwargs):
+    """Awaits a blocking call on the I/O pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IO_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def run_analysis(fn, *args, **kwargs):
+    """Awaits a long-running pipeline call on the analysis pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ANALYSIS_POOL, functools.partial(fn, *args, **kwargs))
+
+
+def executor_stats():
+    return {
+        "io_workers": IO_POOL._max_workers,
+        "analysis_workers": ANALYSIS_POOL._max_workers,
+        "llm_pending": LLM_EXECUTOR.pending
+    }
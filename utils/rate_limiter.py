@@ -0,0 +1,68 @@
+# utils/rate_limiter.py
+import threading
+import time
+from utils.config_loader import CONFIG
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every caller of one API.
+    - Tokens refill continuously at `rate_per_minute`; up to `burst` can be
+      spent at once, so a short fan-out is not serialized.
+    - acquire() blocks until a token is available.
+    - pause() stops all callers for a while (e.g. after an HTTP 429), since a
+      rate-limit response means the quota is exhausted for everyone.
+    """
+
+    def __init__(self, rate_per_minute=60, burst=10):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        self.acquired = 0
+
+    def _refill(self, now):
+        if now <= self._updated:
+            return
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Takes one token, sleeping as long as needed. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.acquired += 1
+                    self.waited += waited
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Blocks all acquirers for `seconds` and drains the bucket."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = max(now, self._paused_until)
+
+    def stats(self):
+        with self._lock:
+            return {"acquired": self.acquired, "waited_seconds": round(self.waited, 3), "tokens": round(self._tokens, 2)}
+
+
+_finnhub_cfg = CONFIG.get("finnhub", {})
+
+# One bucket per process for the Finnhub quota (free tier: 60 calls/min)
+FINNHUB_LIMITER = TokenBucket(
+    rate_per_minute=_finnhub_cfg.get("calls_per_minute", 60),
+    burst=_finnhub_cfg.get("burst", 15)
+)
@@ -0,0 +1,171 @@
+# utils/segment_log.py
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def _to_ts(value):
+    """Accepts a datetime or a 'YYYYmmdd_HHMMSS' string and returns the string form."""
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime(TS_FORMAT)
+
+
+class SegmentLog:
+    """
+    Append-only JSONL log split into time-ordered segments.
+    - append() only enqueues; a background thread writes one line per entry.
+    - The active segment is rotated when it exceeds max_bytes or max_age_hours;
+      closed segments are gzip-compressed when `compress` is set.
+    - Segment file names start with their creation timestamp, so readers can
+      skip whole segments outside a requested time range.
+    Entries are expected to carry a 'timestamp' in TS_FORMAT.
+    """
+
+    def __init__(self, log_dir, max_bytes=50 * 1024 * 1024, max_age_hours=24, compress=True):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age_hours * 3600
+        self.compress = compress
+
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._file = None
+        self._opened_at = 0
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, entry: dict):
+        """Queues an entry for the writer thread (never blocks on disk I/O)."""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="segment-log-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+        self._queue.put(entry)
+
+    def _open_segment(self):
+        name = f"segment-{datetime.now().strftime(TS_FORMAT + '_%f')}.jsonl"
+        self._file = open(os.path.join(self.log_dir, name), "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        if self.compress:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+
+    def _should_rotate(self):
+        return self._file.tell() >= self.max_bytes or (time.time() - self._opened_at) >= self.max_age
+
+    def _writer_loop(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                self._close_segment()
+                self._queue.task_done()
+                return
+            try:
+                if self._file is None:
+                    self._open_segment()
+                elif self._should_rotate():
+                    self._close_segment()
+                    self._open_segment()
+                self._file.write(json.dumps(entry, default=float) + "\n")
+                # Flush once the backlog is drained so readers see complete lines
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                print(f"[Log Error] {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued entry has been written."""
+        self._queue.join()
+
+    def close(self):
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def segments(self):
+        """Returns [(start_ts, path)] sorted oldest first."""
+        paths = glob.glob(os.path.join(self.log_dir, "segment-*.jsonl*"))
+        segs = [(os.path.basename(p)[len("segment-"):][:15], p) for p in paths]
+        return sorted(segs)
+
+    def iter_entries(self, ticker=None, start=None, end=None):
+        """
+        Lazily yields entries, oldest first, optionally filtered by ticker and
+        by timestamp range (inclusive; datetimes or TS_FORMAT strings).
+        """
+        start, end = _to_ts(start), _to_ts(end)
+        ticker_marker = f'"ticker": "{ticker}"' if ticker else None
+        segs = self.segments()
+
+        for i, (seg_start, path) in enumerate(segs):
+            if end and seg_start > end:
+                break
+            next_start = segs[i + 1][0] if i + 1 < len(segs) else None
+            if start and next_start and next_start < start:
+                continue
+
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    # Cheap substring test before paying for json.loads
+                    if ticker_marker and ticker_marker not in line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # partially written last line
+                    ts = entry.get("timestamp", "")
+                    if (start and ts < start) or (end and ts > end):
+                        continue
+                    if ticker and entry.get("ticker") != ticker:
+                        continue
+                    yield entry
+
+    def import_legacy_json(self, legacy_file):
+        """Converts an old list-of-entries JSON log into a compressed segment (once)."""
+        if self.segments() or not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, "r") as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, ValueError):
+            return
+        if not isinstance(entries, list) or not entries:
+            return
+
+        first_ts = entries[0].get("timestamp", datetime.now().strftime(TS_FORMAT))
+        path = os.path.join(self.log_dir, f"segment-{first_ts}_000000.jsonl.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=float) + "\n")